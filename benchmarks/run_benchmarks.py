@@ -0,0 +1,241 @@
+"""Benchmarks of the fetch, parse, merge and render stages of the reader, against a local synthetic feed server.
+
+Every stage reports its wall time and its peak Python allocation (measured with tracemalloc in a second, untimed run,
+so the tracing overhead does not skew the timings). Results are saved as JSON so runs can be compared:
+
+    python benchmarks/run_benchmarks.py --feeds 200 --entries 50 --latency 0.05
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/bench-20240101-120000.json
+"""
+import os
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # Render without a display
+
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feedparser
+import PySide6
+from PySide6.QtCore import QSize
+from PySide6.QtWidgets import (QApplication,
+                               QListView,
+                               QAbstractItemView)
+
+import main
+import rss_core
+from synthetic_feed_server import SyntheticFeedServer
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def measure(name, function, results, trace_memory=True):
+    """Time function(), then run it again under tracemalloc for its peak allocation; returns the first result."""
+    start = time.perf_counter()
+    value = function()
+    wall = time.perf_counter() - start
+    results[name] = {'wall_s': round(wall, 4)}
+    if trace_memory:
+        tracemalloc.start()
+        function()
+        results[name]['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        tracemalloc.stop()
+    print(f"{name:>14}: {wall:8.3f} s" + (f"  {results[name]['peak_mb']:8.2f} MB" if trace_memory else ''))
+    return value
+
+def process_peak_rss_mb():
+    """Peak resident memory of the process, where the platform exposes it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10, 2)
+
+def new_refresher(feeds, state_dir, engine):
+    """A core FeedRefresher with its own cache/ store/ breaker/ schedule files in state_dir (no Qt involved)."""
+    store = rss_core.EntryStore(os.path.join(state_dir, 'entries.db'))
+    return rss_core.FeedRefresher(feeds,
+                                  rss_core.FeedCache(store),
+                                  store,
+                                  rss_core.FeedHealth(os.path.join(state_dir, 'feed_health.json')),
+                                  rss_core.FeedScheduler(os.path.join(state_dir, 'feed_schedule.json')),
+                                  rss_core.Settings(os.path.join(state_dir, 'settings.json')),
+                                  engine=engine)
+
+def run_refresh(feeds, state_dir, engine):
+    """One complete, non-streaming refresh; returns the sorted records."""
+    refresher = new_refresher(feeds, state_dir, engine)
+    entries = refresher.run()
+    refresher.store.connection.close()
+    return entries
+
+def synthetic_entries(count):
+    """count records shaped like the ones a refresh returns, newest first."""
+    return [rss_core.EntryRecord(rss_core.stable_id("http://example.com/feed", f"entry{index}"),
+                                 f"Feed {index % 50}",
+                                 f"Entry {index}",
+                                 f"http://example.com/entry{index}",
+                                 1700000000 - index * 60,
+                                 (f"Preview of entry {index} " * 8)[:200])
+            for index in range(count)]
+
+def render(entries, app):
+    """Build a view over entries offscreen, load them through the RenderScheduler, paint the first screen and lay out
+    every row; returns the render_finished summary of the load."""
+    model = main.FeedEntriesModel()
+    view = QListView()
+    view.setModel(model)
+    view.setItemDelegate(main.FeedEntryDelegate(view))
+    view.setSpacing(25)
+    view.setResizeMode(QListView.Adjust)
+    view.setLayoutMode(QListView.Batched)
+    view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+    view.resize(QSize(1200, 800))
+    view.show()
+    render_scheduler = main.RenderScheduler(model, view)
+    render_stats = []
+    render_scheduler.render_finished.connect(render_stats.append)
+    render_scheduler.set_entries(entries)
+    app.processEvents()
+    view.grab()  # First paint
+    while render_scheduler.is_rendering():
+        app.processEvents()
+    # Let the batched layout finish (it lays out the rows over several event loop iterations), then scroll down
+    previous_maximum = None
+    while view.verticalScrollBar().maximum() != previous_maximum:
+        previous_maximum = view.verticalScrollBar().maximum()
+        for _ in range(10):
+            app.processEvents()
+    view.scrollToBottom()
+    view.grab()
+    view.close()
+    view.deleteLater()
+    app.processEvents()
+    return render_stats[0]
+
+def compare(current, previous_file):
+    """Print the wall time/ peak memory ratios of every stage against a previous result file."""
+    with open(previous_file, 'r') as file:
+        previous = json.load(file)
+    print(f"\nCompared to {previous_file}:")
+    for name, stage in current['stages'].items():
+        old = previous.get('stages', {}).get(name)
+        if not old:
+            continue
+        line = f"{name:>14}: wall x{stage['wall_s'] / old['wall_s']:.2f}" if old.get('wall_s') else f"{name:>14}:"
+        if stage.get('peak_mb') and old.get('peak_mb'):
+            line += f"  peak x{stage['peak_mb'] / old['peak_mb']:.2f}"
+        print(line)
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark fetch, parse, merge and render against generated feeds.")
+    parser.add_argument('--feeds', type=int, default=100)
+    parser.add_argument('--entries', type=int, default=20, help="entries per feed")
+    parser.add_argument('--payload', type=int, default=500, help="characters of description per entry")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds the server waits before responding")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests failing with HTTP 500")
+    parser.add_argument('--top-n', type=int, default=200, help="entries kept by the top_n merge stage")
+    parser.add_argument('--render-entries', type=int, default=5000, help="entries rendered by the render stage")
+    parser.add_argument('--record-entries', type=int, default=100000,
+                        help="entries held by the records stage (memory per displayed entry)")
+    parser.add_argument('--engine', choices=['threads', 'asyncio'], default='threads')
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc runs")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/bench-<timestamp>.json)")
+    parser.add_argument('--compare', help="previous result file to compare against")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    feed_server = SyntheticFeedServer(args.feeds, args.entries, args.payload, args.latency, args.error_rate).start()
+    feeds = feed_server.feed_urls()
+    engine = rss_core.AsyncFetchEngine() if args.engine == 'asyncio' else None
+    trace_memory = not args.no_memory
+    work_dir = tempfile.mkdtemp(prefix='rss_bench_')
+    stages = {}
+
+    try:
+        print(f"{args.feeds} feeds x {args.entries} entries, {args.payload} B payload, "
+              f"{args.latency * 1000:.0f} ms latency, {args.error_rate:.0%} errors, {args.engine} engine")
+
+        def download():
+            with ThreadPoolExecutor() as executor:
+                return list(executor.map(lambda url: rss_core.http_get(url).body, feeds.values()))
+        bodies = measure('download', download, stages, trace_memory)
+        stages['download']['bytes'] = sum(len(body) for body in bodies)
+
+        measure('parse', lambda: [feedparser.parse(body) for body in bodies], stages, trace_memory)
+        measure('parse_fast',
+                lambda: [rss_core.parse_body(body, {}, url, 'fast') for body, url in zip(bodies, feeds.values())],
+                stages,
+                trace_memory)
+
+        def cold_refresh():
+            state_dir = tempfile.mkdtemp(dir=work_dir)
+            return run_refresh(feeds, state_dir, engine)
+        entries = measure('refresh_cold', cold_refresh, stages, trace_memory)
+        stages['refresh_cold']['entries'] = len(entries)
+
+        warm_dir = tempfile.mkdtemp(dir=work_dir)
+        run_refresh(feeds, warm_dir, engine)
+        measure('refresh_warm', lambda: run_refresh(feeds, warm_dir, engine), stages, trace_memory)
+
+        streams = {}
+        for record in entries:
+            streams.setdefault(record.feed, []).append(record)
+        measure('sort', lambda: rss_core.merge_newest(streams.values()), stages, trace_memory)
+        measure('top_n', lambda: rss_core.merge_newest(streams.values(), args.top_n), stages, trace_memory)
+        stages['top_n']['entries'] = args.top_n
+
+        def merge():
+            model = main.FeedEntriesModel()
+            by_feed = {}
+            for record in entries:
+                by_feed.setdefault(record.feed, []).append(record)
+            for feed_name, records in by_feed.items():
+                model.merge_delta(rss_core.FeedDelta(feed_name, records, [], new=len(records)))
+            model.set_entries(entries)
+        measure('merge', merge, stages, trace_memory)
+
+        render_entries = synthetic_entries(args.render_entries)
+        render_stats = measure('render', lambda: render(render_entries, app), stages, trace_memory)
+        stages['render']['entries'] = len(render_entries)
+        stages['render']['max_frame_ms'] = render_stats['max_frame_ms']
+        print(f"{'':>14}  longest event loop frame {render_stats['max_frame_ms']} ms")
+
+        measure('records', lambda: synthetic_entries(args.record_entries), stages, trace_memory)
+        stages['records']['entries'] = args.record_entries
+        if trace_memory:
+            stages['records']['bytes_per_entry'] = round(stages['records']['peak_mb'] * 2 ** 20 / args.record_entries)
+            print(f"{'':>14}  {stages['records']['bytes_per_entry']} B per entry")
+    finally:
+        feed_server.stop()
+        if engine is not None:
+            engine.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+              'environment': {'python': platform.python_version(),
+                              'platform': platform.platform(),
+                              'feedparser': feedparser.__version__,
+                              'pyside6': PySide6.__version__},
+              'server_requests': feed_server.requests,
+              'process_peak_rss_mb': process_peak_rss_mb(),
+              'stages': stages}
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(result, file, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,166 @@
+"""Local HTTP server serving generated RSS 2.0/ Atom feeds, used by run_benchmarks.py.
+
+Feed n is served at /feed/<n>.xml; even feeds are RSS 2.0, odd feeds are Atom. The content of a feed is
+deterministic, so ETag/ If-None-Match work across refreshes. Run it standalone to point the reader at it:
+
+    python benchmarks/synthetic_feed_server.py --feeds 200 --entries 50 --port 8765
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import (BaseHTTPRequestHandler,
+                         ThreadingHTTPServer)
+from xml.sax.saxutils import escape
+
+BASE_TIME = 1700000000  # Fixed epoch so the generated feeds do not change between runs
+
+def generate_rss(feed_index, entries, payload_size):
+    items = []
+    for entry_index in range(entries):
+        published = BASE_TIME - (feed_index * 37 + entry_index * 3600)
+        items.append(f"""<item>
+<title>Feed {feed_index} entry {entry_index}</title>
+<link>http://example.com/feed{feed_index}/entry{entry_index}</link>
+<guid>feed{feed_index}-entry{entry_index}</guid>
+<pubDate>{formatdate(published)}</pubDate>
+<description>{escape(payload(feed_index, entry_index, payload_size))}</description>
+</item>""")
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel>
+<title>Synthetic feed {feed_index}</title>
+<link>http://example.com/feed{feed_index}</link>
+<description>Generated feed</description>
+{''.join(items)}
+</channel></rss>""".encode()
+
+def generate_atom(feed_index, entries, payload_size):
+    items = []
+    for entry_index in range(entries):
+        published = time.strftime('%Y-%m-%dT%H:%M:%SZ',
+                                  time.gmtime(BASE_TIME - (feed_index * 37 + entry_index * 3600)))
+        items.append(f"""<entry>
+<title>Feed {feed_index} entry {entry_index}</title>
+<link href="http://example.com/feed{feed_index}/entry{entry_index}"/>
+<id>urn:feed{feed_index}:entry{entry_index}</id>
+<updated>{published}</updated>
+<published>{published}</published>
+<summary>{escape(payload(feed_index, entry_index, payload_size))}</summary>
+</entry>""")
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<title>Synthetic feed {feed_index}</title>
+<id>urn:feed{feed_index}</id>
+<updated>{time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(BASE_TIME))}</updated>
+{''.join(items)}
+</feed>""".encode()
+
+def payload(feed_index, entry_index, payload_size):
+    """Deterministic pseudo text of payload_size characters."""
+    words = random.Random(feed_index * 100003 + entry_index).choices(['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'feed',
+                                                                      'reader', 'entry', 'update', 'news'],
+                                                                     k=payload_size // 5 + 1)
+    return ' '.join(words)[:payload_size]
+
+class SyntheticFeedServer:
+    """Threaded HTTP server generating feeds on demand, with optional latency and error injection."""
+
+    def __init__(self, feeds=100, entries=20, payload_size=500, latency=0.0, error_rate=0.0, port=0):
+        self.feeds = feeds
+        self.entries = entries
+        self.payload_size = payload_size
+        self.latency = latency  # seconds added before every response
+        self.error_rate = error_rate  # share of requests answered with HTTP 500
+        self.requests = 0
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def feed_urls(self):
+        """{feed name: url} of every served feed, in the format of rss_feeds.json."""
+        return {f"Feed {index}": f"http://127.0.0.1:{self.port}/feed/{index}.xml" for index in range(self.feeds)}
+
+    def body(self, feed_index):
+        """Generated body and ETag of a feed (cached, so repeated requests are cheap for the server)."""
+        with self._lock:
+            if feed_index not in self._bodies:
+                generate = generate_rss if feed_index % 2 == 0 else generate_atom
+                body = generate(feed_index, self.entries, self.payload_size)
+                self._bodies[feed_index] = body, f'"{hashlib.md5(body).hexdigest()}"'
+            return self._bodies[feed_index]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    fail = server._random.random() < server.error_rate
+                if server.latency:
+                    time.sleep(server.latency)
+                try:
+                    feed_index = int(self.path.rsplit('/', 1)[-1].split('.')[0])
+                except ValueError:
+                    feed_index = -1
+                if fail or not 0 <= feed_index < server.feeds:
+                    self.send_response(500 if fail else 404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body, etag = server.body(feed_index)
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/rss+xml' if feed_index % 2 == 0
+                                 else 'application/atom+xml')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='SyntheticFeedServer', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve generated RSS/ Atom feeds for benchmarking.")
+    parser.add_argument('--feeds', type=int, default=100)
+    parser.add_argument('--entries', type=int, default=20, help="entries per feed")
+    parser.add_argument('--payload', type=int, default=500, help="characters of description per entry")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests failing with HTTP 500")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    feed_server = SyntheticFeedServer(args.feeds, args.entries, args.payload, args.latency, args.error_rate, args.port)
+    print(f"Serving {args.feeds} feeds at http://127.0.0.1:{feed_server.port}/feed/<n>.xml (Ctrl+C to stop)")
+    try:
+        feed_server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        feed_server.stop()
@@ -1,29 +1,61 @@
 import sys
 import os
 import json
-import feedparser
-import webbrowser
-import re
+import time
+import bisect
 import ctypes
+import threading
+import multiprocessing
+import webbrowser
+
+if __name__ == "__main__" and '--headless' in sys.argv:
+    # No window: run the core refresh loop (same as python -m rss_core), dispatched before Qt is even imported
+    multiprocessing.freeze_support()
+    from rss_core.cli import main
+    sys.exit(main([arg for arg in sys.argv[1:] if arg != '--headless']))
+
 from PySide6.QtCore import (Qt,
                             Signal,
                             QTimer,
-                            QThread)
-from PySide6.QtGui import QIcon
+                            QThread,
+                            QObject,
+                            QFileSystemWatcher,
+                            QEvent,
+                            QPointF,
+                            QRectF,
+                            QSize,
+                            QModelIndex,
+                            QAbstractListModel)
+from PySide6.QtGui import (QIcon,
+                           QPen,
+                           QFont,
+                           QColor,
+                           QPainter,
+                           QFontMetrics,
+                           QTextDocument)
 from PySide6.QtWidgets import (QApplication,
                                QWidget,
                                QLabel,
-                               QScrollArea,
+                               QListView,
                                QMainWindow,
                                QPushButton,
                                QMessageBox,
                                QHBoxLayout,
-                               QFrame,
-                               QVBoxLayout)
-from concurrent.futures import (ThreadPoolExecutor,
-                                as_completed)
+                               QVBoxLayout,
+                               QAbstractItemView,
+                               QStyledItemDelegate,
+                               QDialog,
+                               QScrollArea,
+                               QFileDialog,
+                               QHeaderView,
+                               QTableWidget,
+                               QTableWidgetItem)
 from datetime import datetime
 from ctypes import wintypes
+from rss_core import (FEED_PHASES,
+                      FeedReader,
+                      boostrap_rss_feeds,
+                      load_rss_feeds)
 
 # Constants for taskbar flashing
 FLASHW_TRAY = 0x2
@@ -36,11 +68,13 @@ class FLASHWINFO(ctypes.Structure):
                 ("uCount", wintypes.UINT),
                 ("dwTimeout", wintypes.DWORD)]
 
-# Load user32.dll for the FlashWindowEx function
-user32 = ctypes.windll.user32
+# Load user32.dll for the FlashWindowEx function (Windows only; elsewhere the taskbar is not flashed)
+user32 = ctypes.windll.user32 if sys.platform == 'win32' else None
 
 def flash_taskbar_icon(window_handle):
     """Flashes the taskbar icon when there are unread entries."""
+    if user32 is None:
+        return
     fInfo = FLASHWINFO(
         cbSize=ctypes.sizeof(FLASHWINFO),
         hwnd=window_handle,
@@ -50,37 +84,598 @@ def flash_taskbar_icon(window_handle):
     )
     user32.FlashWindowEx(ctypes.byref(fInfo))
 
-def extract_title(full_text):
-    """Extract the title text from an HTML link within the given text."""
-    match = re.search(r"<a[^>]*>(.*?)</a>", full_text)
-    return match.group(1) if match else None
-
 class FeedFetcher(QThread):
-    finished = Signal(list)  # Signal to emit the fetched entries once the thread finishes
+    """Runs a FeedReader refresh in a worker thread and bridges its callbacks to Qt signals."""
+    feed_fetched = Signal(str, object)  # Emitted with the FeedDelta of each completed feed
+    refresh_complete = Signal()  # Emitted after every feed has been processed
+    diagnostics_ready = Signal(dict)  # Emitted with the refresh_diagnostics summary at the end of every refresh
 
-    def __init__(self, feeds):
+    def __init__(self, reader, feeds=None, generation=0):
         super().__init__()
+        self.reader = reader
         self.feeds = feeds
+        self.generation = generation  # Refresh generation this fetch belongs to (see RefreshCoordinator)
+        self.cancel = threading.Event()  # Set to skip the feeds which are not being fetched yet
+        self.diagnostics = None
 
     def run(self):
-        entries = []
-
-        with ThreadPoolExecutor() as executor:
-            futures = {executor.submit(self.fetch_feed, url): name for name, url in self.feeds.items()}
-            for future in as_completed(futures):
-                feed_name = futures[future]
-                try:
-                    feed = future.result()
-                    for entry in feed.entries:
-                        entries.append((feed_name, entry))
-                except Exception as e:
-                    print(f"Failed to fetch {feed_name}: {e}")
-
-        entries.sort(key=lambda x: x[1].published_parsed, reverse=True)
-        self.finished.emit(entries)  # Emit the signal with fetched entries
-
-    def fetch_feed(self, url):
-        return feedparser.parse(url)
+        try:
+            _, self.diagnostics = self.reader.refresh(self.feeds, on_feed=self.feed_fetched.emit, cancel=self.cancel)
+            self.diagnostics_ready.emit(self.diagnostics)
+        finally:
+            self.refresh_complete.emit()  # Also after a failed refresh, so the next one can start
+
+class RefreshCoordinator(QObject):
+    """Runs at most one FeedFetcher at a time. Refresh requests made while a refresh is running are merged into it:
+    the feeds it is already fetching are dropped and the rest are fetched by a single follow-up refresh.
+    Every refresh is tagged with a generation; cancel() bumps it, so whatever the cancelled refresh still reports is
+    discarded instead of overwriting newer results."""
+    feed_fetched = Signal(str, object)  # FeedDelta of each feed of the current generation
+    refresh_complete = Signal()  # A refresh of the current generation is done
+    diagnostics_ready = Signal(dict)
+    discarded = Signal()  # A cancelled refresh has ended; its results were persisted but not passed on
+
+    def __init__(self, reader, parent=None):
+        super().__init__(parent)
+        self.reader = reader
+        self.generation = 0
+        self.fetcher = None
+        self.pending = {}  # Feeds requested while a refresh was running, fetched by the follow-up refresh
+
+    def is_busy(self):
+        return self.fetcher is not None
+
+    def request(self, feeds=None):
+        """Refresh the given feeds (all by default), or merge them into the refresh which is already running."""
+        feeds = dict(self.reader.feeds if feeds is None else feeds)
+        if self.fetcher is None:
+            self.start(feeds)
+            return
+        in_flight = self.fetcher.feeds if self.fetcher.generation == self.generation else {}
+        self.pending.update({name: url for name, url in feeds.items() if in_flight.get(name) != url})
+
+    def cancel(self):
+        """Skip the remaining feeds of the running refresh and drop the queued requests; returns whether a refresh
+        was running."""
+        self.generation += 1
+        self.pending.clear()
+        if self.fetcher is None:
+            return False
+        self.fetcher.cancel.set()
+        return True
+
+    def shutdown(self):
+        """Cancel the running refresh and wait for its in-flight fetches to finish."""
+        self.cancel()
+        if self.fetcher is not None:
+            self.fetcher.wait()
+            self.fetcher = None
+
+    def start(self, feeds):
+        self.fetcher = FeedFetcher(self.reader, feeds, generation=self.generation)
+        self.fetcher.feed_fetched.connect(self.on_feed_fetched)
+        self.fetcher.diagnostics_ready.connect(self.on_diagnostics_ready)
+        self.fetcher.refresh_complete.connect(self.on_refresh_complete)
+        self.fetcher.start()
+
+    def is_current(self):
+        """Whether the signal being handled comes from the running fetcher of the current generation."""
+        fetcher = self.sender()
+        return fetcher is self.fetcher and fetcher.generation == self.generation
+
+    def on_feed_fetched(self, feed_name, delta):
+        if self.is_current():
+            self.feed_fetched.emit(feed_name, delta)
+
+    def on_diagnostics_ready(self, diagnostics):
+        if self.is_current():
+            self.diagnostics_ready.emit(diagnostics)
+
+    def on_refresh_complete(self):
+        fetcher = self.sender()
+        if fetcher is not self.fetcher:
+            return  # Already waited for by shutdown
+        current = fetcher.generation == self.generation
+        fetcher.wait()  # run() returns right after this signal; the QThread must not be destroyed while running
+        self.fetcher = None
+        # Start the follow-up refresh before reporting, so is_busy() already reflects it
+        if self.pending:
+            feeds, self.pending = self.pending, {}
+            self.start(feeds)
+        if current:
+            self.refresh_complete.emit()
+        else:
+            self.discarded.emit()
+
+class FeedEntriesModel(QAbstractListModel):
+    """List model holding the displayed EntryRecords; only the visible rows get painted."""
+    FeedNameRole = Qt.UserRole + 1
+    TitleRole = Qt.UserRole + 2
+    LinkRole = Qt.UserRole + 3
+    DateRole = Qt.UserRole + 4
+    PreviewRole = Qt.UserRole + 5
+    ReadRole = Qt.UserRole + 6
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []
+        # Rows exposed to the view while a RenderScheduler is still filling it (the entries list is always complete
+        # and sorted); None once every row is shown
+        self.shown_rows = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.shown()
+
+    def shown(self):
+        """Number of rows exposed to the view."""
+        return len(self.entries) if self.shown_rows is None else self.shown_rows
+
+    def show_more(self, count):
+        """Expose up to count more rows to the view; returns the (first, last) exposed row, or None if every row is
+        shown already."""
+        first = self.shown()
+        last = min(first + count, len(self.entries)) - 1
+        if last < first:
+            self.shown_rows = None
+            return None
+        self.beginInsertRows(QModelIndex(), first, last)
+        self.shown_rows = None if last == len(self.entries) - 1 else last + 1
+        self.endInsertRows()
+        return first, last
+
+    def insert_rows(self, row, records):
+        """Insert records at row; rows past the shown ones are inserted without notifying the view."""
+        if self.shown_rows is not None and row >= self.shown_rows:
+            self.entries[row:row] = records
+            return
+        self.beginInsertRows(QModelIndex(), row, row + len(records) - 1)
+        self.entries[row:row] = records
+        if self.shown_rows is not None:
+            self.shown_rows += len(records)
+        self.endInsertRows()
+
+    def remove_rows(self, first_row, last_row):
+        """Remove the rows first_row..last_row, notifying the view of the shown ones."""
+        shown = self.shown()
+        if first_row >= shown:
+            del self.entries[first_row:last_row + 1]
+            return
+        last_shown_row = min(last_row, shown - 1)
+        self.beginRemoveRows(QModelIndex(), first_row, last_shown_row)
+        del self.entries[first_row:last_row + 1]
+        if self.shown_rows is not None:
+            self.shown_rows -= last_shown_row - first_row + 1
+        self.endRemoveRows()
+
+    def row_changed(self, row):
+        if row < self.shown():
+            self.dataChanged.emit(self.index(row), self.index(row))
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.entries[index.row()]
+        if role in (Qt.DisplayRole, self.TitleRole):
+            return record.title
+        if role == self.FeedNameRole:
+            return record.feed
+        if role == self.LinkRole:
+            return record.link
+        if role == self.DateRole:
+            return datetime(*time.gmtime(record.epoch)[:6]).strftime("%Y-%m-%d %H:%M:%S")
+        if role == self.PreviewRole:
+            return record.preview + '<br>...'
+        if role == self.ReadRole:
+            return record.read
+        return None
+
+    @staticmethod
+    def row_key(record):
+        """Stable identity of a displayed record."""
+        return record.id
+
+    @staticmethod
+    def row_content(record):
+        """The displayed fields of a record, used to detect changed rows."""
+        return record.content()
+
+    def set_entries(self, entries, progressive=False):
+        """Diff entries against the displayed rows by stable id; only new, changed and vanished rows are touched.
+        progressive: if the rows cannot be diffed (e.g. the first load), none of them are shown yet and a
+        RenderScheduler exposes them in batches."""
+        new_entries = []
+        new_keys = []
+        seen_keys = set()
+        for record in entries:
+            key = self.row_key(record)
+            if key not in seen_keys:
+                seen_keys.add(key)
+                new_entries.append(record)
+                new_keys.append(key)
+
+        # Remove the vanished rows, one contiguous block at a time starting from the bottom
+        row = len(self.entries) - 1
+        while row >= 0:
+            if self.row_key(self.entries[row]) in seen_keys:
+                row -= 1
+                continue
+            last_row = row
+            while row >= 0 and self.row_key(self.entries[row]) not in seen_keys:
+                row -= 1
+            self.remove_rows(row + 1, last_row)
+
+        # The remaining rows must keep their relative order, otherwise a full reset is cheaper than moving rows
+        old_keys = [self.row_key(record) for record in self.entries]
+        old_key_set = set(old_keys)
+        if not old_keys and progressive or [key for key in new_keys if key in old_key_set] != old_keys:
+            self.beginResetModel()
+            self.entries = new_entries
+            self.shown_rows = 0 if progressive else None
+            self.endResetModel()
+            return
+
+        # Walk the new entries: update the changed rows and insert the new ones in contiguous blocks
+        row = 0
+        position = 0
+        while position < len(new_entries):
+            if new_keys[position] in old_key_set:
+                if self.row_content(self.entries[row]) != self.row_content(new_entries[position]):
+                    self.entries[row] = new_entries[position]
+                    self.row_changed(row)
+                else:
+                    self.entries[row] = new_entries[position]
+                row += 1
+                position += 1
+                continue
+            block_start = position
+            while position < len(new_entries) and new_keys[position] not in old_key_set:
+                position += 1
+            self.insert_rows(row, new_entries[block_start:position])
+            row += position - block_start
+
+    def find_row(self, epoch, key):
+        """Row of the record with the given date and key, found by bisecting on the date; None if not displayed."""
+        row = bisect.bisect_left(self.entries, -epoch, key=lambda x: -x.epoch)
+        while row < len(self.entries) and self.entries[row].epoch == epoch:
+            if self.row_key(self.entries[row]) == key:
+                return row
+            row += 1
+        return None
+
+    def merge_delta(self, delta):
+        """Apply the FeedDelta of a single feed, keeping the whole list sorted by date: only the removed (vanished or
+        replaced) rows and the new/ updated records are touched. Returns the change of the unread count."""
+        unread_change = 0
+        updated = {self.row_key(record): record for record in delta.records}
+
+        # Drop the removed rows; updated records keeping their date replace their row in place instead
+        for epoch, key in delta.removed:
+            row = self.find_row(epoch, key)
+            if row is None:
+                continue
+            record = self.entries[row]
+            unread_change -= not record.read
+            new_record = updated.get(key)
+            if new_record is not None and new_record.epoch == epoch:
+                del updated[key]
+                unread_change += not new_record.read
+                self.entries[row] = new_record
+                self.row_changed(row)
+                continue
+            self.remove_rows(row, row)
+
+        # Insert the new rows; entries landing on the same position are inserted as one block, bottom block first
+        blocks = {}
+        for record in updated.values():
+            position = bisect.bisect_right(self.entries, -record.epoch, key=lambda x: -x.epoch)
+            blocks.setdefault(position, []).append(record)
+            unread_change += not record.read
+        for position in sorted(blocks, reverse=True):
+            self.insert_rows(position, sorted(blocks[position], key=lambda x: x.epoch, reverse=True))
+        return unread_change
+
+    def entry(self, row):
+        """Return the record displayed on row."""
+        return self.entries[row]
+
+    def read_state_changed(self, first_row=0, last_row=None):
+        """Repaint the read/ unread border of the given rows (all rows by default)."""
+        if not self.shown():
+            return
+        last_row = self.shown() - 1 if last_row is None else min(last_row, self.shown() - 1)
+        self.dataChanged.emit(self.index(first_row), self.index(last_row), [self.ReadRole])
+
+class RenderScheduler(QObject):
+    """Fills a list view in time-sliced batches: a zero-interval QTimer exposes the rows of its FeedEntriesModel
+    newest (top, i.e. visible) first, each tick showing as many rows as can be measured within frame_budget seconds,
+    so the view lays them out from the delegate's size cache and the GUI thread keeps repainting and handling input.
+    The time between two ticks is one event loop iteration (a frame); its summary is emitted once a load is done."""
+    frame_budget = 0.008
+    frame_time = 1 / 60
+    max_batch = 1000
+    render_finished = Signal(dict)
+
+    def __init__(self, model, view, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.view = view
+        self.row_cost = 0.001  # Seconds to measure one row, re-estimated after every batch
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.render_batch)
+        self.stats = None
+        self.frames = []
+        self.last_tick = None
+
+    def set_entries(self, entries):
+        """Show a complete, sorted list: diffed into the displayed rows, or loaded in batches if it cannot be."""
+        self.model.set_entries(entries, progressive=True)
+        if self.model.shown_rows is not None and not self.timer.isActive():
+            self.stats = {'entries': 0, 'batches': 0, 'started': time.perf_counter()}
+            self.frames = []
+            self.last_tick = time.perf_counter()
+            self.timer.start()
+
+    def is_rendering(self):
+        return self.timer.isActive()
+
+    def render_batch(self):
+        started = time.perf_counter()
+        self.frames.append(started - self.last_tick)
+        self.last_tick = started
+        shown_rows = self.model.show_more(max(1, min(self.max_batch, int(self.frame_budget / self.row_cost))))
+        if shown_rows is not None:
+            first_row, last_row = shown_rows
+            for row in range(first_row, last_row + 1):
+                self.view.sizeHintForIndex(self.model.index(row))  # Fills the delegate's size cache
+            self.row_cost = max((time.perf_counter() - started) / (last_row - first_row + 1), 1e-6)
+            self.stats['batches'] += 1
+        if self.model.shown_rows is None:
+            self.finish()
+
+    def finish(self):
+        self.timer.stop()
+        frames = sorted(self.frames)
+        self.render_finished.emit({'entries': len(self.model.entries),
+                                   'batches': self.stats['batches'],
+                                   'duration': time.perf_counter() - self.stats['started'],
+                                   'max_frame_ms': round(frames[-1] * 1000, 1) if frames else 0,
+                                   'p95_frame_ms': round(frames[int(len(frames) * 0.95)] * 1000, 1) if frames else 0,
+                                   'slow_frames': sum(1 for frame in frames if frame > self.frame_time)})
+
+class FeedEntryDelegate(QStyledItemDelegate):
+    """Paints one entry card (title link, date and preview) and reports clicks on the title link."""
+    link_activated = Signal(QModelIndex)
+
+    padding = 12  # 2px border + 10px padding
+    line_spacing = 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.date_font = QFont()
+        self.date_font.setPointSize(9)
+        self.size_cache = {}
+
+    def _card_width(self, option):
+        """Width of a card: the viewport width minus the list spacing on both sides."""
+        view = self.parent()
+        return view.viewport().width() - 2 * view.spacing() if view else option.rect.width()
+
+    def _documents(self, option, index):
+        """Build the rich text documents of a card laid out for the current width."""
+        text_width = max(self._card_width(option) - 2 * self.padding, 50)
+
+        title_document = QTextDocument()
+        title_document.setDefaultFont(option.font)
+        title_document.setDocumentMargin(0)
+        title_document.setHtml(f"<b>{index.data(FeedEntriesModel.FeedNameRole)}</b>: "
+                               f"<a href='{index.data(FeedEntriesModel.LinkRole)}'>"
+                               f"{index.data(FeedEntriesModel.TitleRole)}</a>")
+        title_document.setTextWidth(text_width)
+
+        preview_document = QTextDocument()
+        preview_document.setDefaultFont(option.font)
+        preview_document.setDocumentMargin(0)
+        preview_document.setDefaultStyleSheet("body { font-size: 10pt; color: gray; }")
+        preview_document.setHtml(f"<body>{index.data(FeedEntriesModel.PreviewRole)}</body>")
+        preview_document.setTextWidth(text_width)
+
+        return title_document, preview_document
+
+    def sizeHint(self, option, index):
+        card_width = self._card_width(option)
+        cache_key = (card_width,
+                     index.data(FeedEntriesModel.FeedNameRole),
+                     index.data(FeedEntriesModel.TitleRole),
+                     index.data(FeedEntriesModel.PreviewRole))
+        size = self.size_cache.get(cache_key)
+        if size is None:
+            if len(self.size_cache) > 20000:
+                self.size_cache.clear()
+            title_document, preview_document = self._documents(option, index)
+            date_height = QFontMetrics(self.date_font).height()
+            height = (title_document.size().height() + date_height + preview_document.size().height()
+                      + 2 * self.line_spacing + 2 * self.padding)
+            size = QSize(card_width, int(height))
+            self.size_cache[cache_key] = size
+        return size
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # Card background and read/ unread border
+        border_color = "grey" if index.data(FeedEntriesModel.ReadRole) else "blue"
+        card_rect = QRectF(option.rect).adjusted(1, 1, -1, -1)
+        painter.setPen(QPen(QColor(border_color), 2))
+        painter.setBrush(QColor("#f5f5f5"))
+        painter.drawRoundedRect(card_rect, 10, 10)
+
+        title_document, preview_document = self._documents(option, index)
+        x = option.rect.x() + self.padding
+        y = option.rect.y() + self.padding
+
+        painter.translate(x, y)
+        title_document.drawContents(painter)
+        y_offset = title_document.size().height() + self.line_spacing
+
+        painter.setFont(self.date_font)
+        painter.setPen(QColor("#666"))
+        date_height = QFontMetrics(self.date_font).height()
+        painter.drawText(QRectF(0, y_offset, option.rect.width() - 2 * self.padding, date_height),
+                         Qt.AlignLeft | Qt.AlignVCenter,
+                         f"Date: {index.data(FeedEntriesModel.DateRole)}")
+        y_offset += date_height + self.line_spacing
+
+        painter.translate(0, y_offset)
+        preview_document.drawContents(painter)
+        painter.restore()
+
+    def _anchor_at(self, position, option, index):
+        """Return the link under position (viewport coordinates) if it sits on the title of the card."""
+        title_document, _ = self._documents(option, index)
+        local = QPointF(position) - QPointF(option.rect.x() + self.padding, option.rect.y() + self.padding)
+        return title_document.documentLayout().anchorAt(local)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseMove:
+            view = self.parent()
+            if self._anchor_at(event.position(), option, index):
+                view.viewport().setCursor(Qt.PointingHandCursor)
+            else:
+                view.viewport().unsetCursor()
+        elif event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            if self._anchor_at(event.position(), option, index):
+                self.link_activated.emit(index)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+PHASE_COLORS = {'queued': '#dddddd',
+                'dns': '#8dd3c7',
+                'connect': '#ffd92f',
+                'tls': '#bebada',
+                'ttfb': '#fb8072',
+                'download': '#80b1d3',
+                'backoff': '#d9d9d9',
+                'parse': '#fdb462',
+                'process': '#b3de69'}
+
+class WaterfallWidget(QWidget):
+    """Refresh waterfall: one bar per feed, split into its queue wait and fetch phases, on a common time axis."""
+    row_height = 16
+    label_width = 220
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.diagnostics = None
+
+    def set_diagnostics(self, diagnostics):
+        self.diagnostics = diagnostics
+        self.setMinimumHeight((len(diagnostics['feeds']) + 1) * self.row_height)
+        self.update()
+
+    def paintEvent(self, event):
+        if not self.diagnostics or not self.diagnostics['feeds']:
+            return
+        painter = QPainter(self)
+        scale = (self.width() - self.label_width - 10) / max(self.diagnostics['duration'], 1e-6)
+        critical_feed = (self.diagnostics['critical_path'] or {}).get('feed')
+        for row, stats in enumerate(self.diagnostics['feeds']):
+            y = row * self.row_height
+            painter.setPen(QColor('red') if stats['feed'] == critical_feed else QColor('black'))
+            painter.drawText(QRectF(0, y, self.label_width - 5, self.row_height),
+                             Qt.AlignRight | Qt.AlignVCenter, stats['feed'])
+            x = self.label_width
+            painter.setPen(Qt.NoPen)
+            phases = [('queued', stats['start'])] + [(phase, stats.get(phase, 0)) for phase in FEED_PHASES]
+            for phase, seconds in phases:
+                painter.setBrush(QColor(PHASE_COLORS[phase]))
+                painter.drawRect(QRectF(x, y + 2, seconds * scale, self.row_height - 4))
+                x += seconds * scale
+        painter.end()
+
+class DiagnosticsDialog(QDialog):
+    """Per-feed fetch/ parse timings and the waterfall of the last refresh."""
+    columns = ['feed', 'outcome', 'status', 'start', 'dns', 'connect', 'tls', 'ttfb', 'download', 'backoff', 'parse',
+               'process', 'end', 'bytes', 'entries', 'attempts', 'error']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Refresh diagnostics")
+        self.resize(1200, 700)
+        self.diagnostics = None
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel("No refresh done yet.")
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+
+        self.render_label = QLabel("")
+        layout.addWidget(self.render_label)
+
+        self.table = QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels([f"{column} (ms)" if column in FEED_PHASES + ('start', 'end') else column
+                                              for column in self.columns])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.table, 2)
+
+        self.waterfall = WaterfallWidget()
+        waterfall_area = QScrollArea()
+        waterfall_area.setWidgetResizable(True)
+        waterfall_area.setWidget(self.waterfall)
+        layout.addWidget(waterfall_area, 1)
+
+        legend = QLabel("  ".join(f"<span style='background-color: {color}'>&nbsp;{phase}&nbsp;</span>"
+                                  for phase, color in PHASE_COLORS.items()))
+        layout.addWidget(legend)
+
+        save_button = QPushButton("Save as JSON")
+        save_button.clicked.connect(self.save_json)
+        layout.addWidget(save_button)
+
+    def set_diagnostics(self, diagnostics):
+        self.diagnostics = diagnostics
+        totals = diagnostics['totals']
+        critical_path = diagnostics['critical_path']
+        summary = (f"Refresh started at {diagnostics['started_at']} took {diagnostics['duration']:.2f} s "
+                   f"({diagnostics['engine']} engine): {totals['feeds']} feeds, {totals.get('ok', 0)} ok, "
+                   f"{totals.get('not_modified', 0)} not modified, {totals.get('failed', 0)} failed, "
+                   f"{totals.get('skipped', 0)} skipped, {totals.get('parses_skipped', 0)} unchanged (not re-parsed); "
+                   f"{totals['bytes'] / 1024:.0f} KiB, {totals['entries']} entries.")
+        if critical_path:
+            summary += (f"<br>Critical path: <b>{critical_path['feed']}</b> - " +
+                        ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in critical_path['phases']))
+        self.summary_label.setText(summary)
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(diagnostics['feeds']))
+        for row, stats in enumerate(diagnostics['feeds']):
+            for column, key in enumerate(self.columns):
+                value = stats.get(key, '')
+                item = QTableWidgetItem()
+                if isinstance(value, float):
+                    item.setData(Qt.DisplayRole, round(value * 1000, 1))  # milliseconds
+                else:
+                    item.setData(Qt.DisplayRole, value)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+        self.waterfall.set_diagnostics(diagnostics)
+
+    def set_render_stats(self, stats):
+        """Show how the last load of the entry list went (see RenderScheduler)."""
+        self.render_label.setText(f"Last entry list load: {stats['entries']} entries in {stats['batches']} batches, "
+                                  f"{stats['duration']:.2f} s; event loop frames max {stats['max_frame_ms']} ms, "
+                                  f"p95 {stats['p95_frame_ms']} ms, {stats['slow_frames']} over 16.7 ms")
+
+    def save_json(self):
+        if self.diagnostics is None:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save diagnostics", "refresh_diagnostics.json",
+                                                   "JSON (*.json)")
+        if file_path:
+            with open(file_path, "w") as file:
+                json.dump(self.diagnostics, file, indent=2)
 
 def get_running_path(relative_path):
     if '_internal' in os.listdir():
@@ -88,14 +683,8 @@ def get_running_path(relative_path):
     else:
         return relative_path
 
-def boostrap_rss_feeds():
-    if not os.path.isfile('rss_feeds.json'):
-        with open('rss_feeds.json', 'w') as file_out_handle:
-            file_out_handle.write(json.dumps({"New On Steam": "https://store.steampowered.com/feeds/newreleases.xml"},
-                                             indent=2))
-
 class RSSReader(QMainWindow):
-    new_entries_signal = Signal(list)  # Signal to pass the fetched entries to the main thread
+    push_received = Signal(str, object)  # FeedDelta of a WebSub delivery, emitted from the receiver thread
 
     def __init__(self):
         boostrap_rss_feeds()
@@ -105,20 +694,22 @@ class RSSReader(QMainWindow):
         self.resize(1200, 600)
         self.setWindowIcon(QIcon(get_running_path('icon.ico')))
 
-        # Set the file path to store viewed entries
-        self.viewed_entries_file = "viewed_entries.json"
-        self.viewed_entries = self.load_viewed_entries()  # Load viewed entries from file
-
         # Load feeds from JSON
         self.rss_feeds_file = 'rss_feeds.json'
         self.feeds = self.load_rss_feeds()
 
+        # Headless core: settings, stored entries, read state, schedule, breaker and cache; the GUI is a thin client
+        self.reader = FeedReader(feeds=self.feeds)
+        # WebSub deliveries are merged like streamed feeds, in the GUI thread
+        self.push_received.connect(self.merge_feed_entries)
+        self.reader.push_listeners.append(self.push_received.emit)
+
         # Setup main layout
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
         self.main_layout = QVBoxLayout(self.central_widget)
 
-        # Add labels for total/ unread entries and last refresh datetime at the top (outside scroll area)
+        # Add labels for total/ unread entries and last refresh datetime at the top (outside the feed list)
         self.last_refresh_label = QLabel("Last refresh done at: TBA")
         self.total_label = QLabel("Total Entries: 0")
         self.unread_label = QLabel("Unread Entries: 0")
@@ -145,27 +736,59 @@ class RSSReader(QMainWindow):
 
         # Add "Refresh Feeds" button
         self.refresh_button = QPushButton("Refresh Feeds")
-        self.refresh_button.clicked.connect(self.refresh_feeds)
+        self.refresh_button.clicked.connect(lambda: self.refresh_feeds())
         button_layout.addWidget(self.refresh_button)
 
+        # Add "Diagnostics" button (per-feed timings of the last refresh)
+        self.diagnostics_dialog = None
+        self.last_diagnostics = None
+        self.diagnostics_button = QPushButton("Diagnostics")
+        self.diagnostics_button.clicked.connect(self.show_diagnostics)
+        button_layout.addWidget(self.diagnostics_button)
+
         # Add button layout to the main layout
         self.main_layout.addLayout(button_layout)
 
-        # Scroll area for feed display
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.main_layout.addWidget(self.scroll_area)
-
-        # Container widget within scroll area
-        self.feed_container = QWidget()
-        self.feed_layout = QVBoxLayout(self.feed_container)
-        self.feed_layout.setSpacing(50)
-        self.scroll_area.setWidget(self.feed_container)
-
-        # Timer to simulate refresh the RSS feed entries
+        # Virtualized list view for feed display; only the visible entry cards get painted
+        self.feed_model = FeedEntriesModel()
+        self.feed_view = QListView()
+        self.feed_view.setModel(self.feed_model)
+        self.feed_delegate = FeedEntryDelegate(self.feed_view)
+        self.feed_delegate.link_activated.connect(self.on_entry_click)
+        self.feed_view.setItemDelegate(self.feed_delegate)
+        self.feed_view.setSpacing(25)
+        self.feed_view.setResizeMode(QListView.Adjust)
+        self.feed_view.setLayoutMode(QListView.Batched)
+        self.feed_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.feed_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.feed_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.feed_view.setMouseTracking(True)
+        self.main_layout.addWidget(self.feed_view)
+
+        # Large entry lists are loaded into the view in time-sliced batches
+        self.last_render_stats = None
+        self.render_scheduler = RenderScheduler(self.feed_model, self.feed_view, self)
+        self.render_scheduler.render_finished.connect(self.on_render_finished)
+
+        # Refreshes from the timer, the button and the startup are merged into the running one
+        self.refresh_coordinator = RefreshCoordinator(self.reader, self)
+        self.refresh_coordinator.feed_fetched.connect(self.merge_feed_entries)
+        self.refresh_coordinator.refresh_complete.connect(self.on_refresh_complete)
+        self.refresh_coordinator.diagnostics_ready.connect(self.on_diagnostics_ready)
+        self.refresh_coordinator.discarded.connect(self.on_refresh_discarded)
+
+        # Reload the feed list when rss_feeds.json changes; editors may write it a few times in a row
+        self.feeds_watcher = QFileSystemWatcher([os.path.abspath(self.rss_feeds_file)], self)
+        self.feeds_watcher.fileChanged.connect(lambda: self.feeds_reload_timer.start())
+        self.feeds_reload_timer = QTimer(self)
+        self.feeds_reload_timer.setSingleShot(True)
+        self.feeds_reload_timer.setInterval(500)
+        self.feeds_reload_timer.timeout.connect(self.reload_rss_feeds)
+
+        # Timer to refresh the feeds which became due
         self.timer1 = QTimer(self)
-        self.timer1.timeout.connect(self.refresh_feeds)
-        self.timer1.start(30*60*1000)  # Update every 30 minutes
+        self.timer1.timeout.connect(self.refresh_due_feeds)
+        self.timer1.start(self.reader.settings.schedule['check_interval'] * 1000)  # Fetch the feeds that became due
 
         # Timer to flash the taskbar icon if there are unread entries
         self.unread_entries = 0
@@ -173,11 +796,9 @@ class RSSReader(QMainWindow):
         self.timer2.timeout.connect(self.update_unread_entries)
         self.timer2.start(5000)  # Update every 5 seconds
 
-        # Connect the signal to a method that will update the GUI
-        self.new_entries_signal.connect(self.update_feed_entries)
-
-        # Display the feeds
-        self.refresh_feeds()
+        # Display the last known entries right away, then refresh the feeds
+        self.update_feed_entries(self.reader.entries())
+        self.refresh_due_feeds()
 
     def update_unread_entries(self):
         if self.unread_entries > 0:
@@ -186,8 +807,7 @@ class RSSReader(QMainWindow):
     def load_rss_feeds(self):
         """Load RSS feed URLs from a JSON file."""
         try:
-            with open(self.rss_feeds_file, "r") as file:
-                return json.load(file)
+            return load_rss_feeds(self.rss_feeds_file)
         except FileNotFoundError:
             QMessageBox.warning(self, "Warning", f"File {self.rss_feeds_file} not found.")
             return {}
@@ -195,146 +815,131 @@ class RSSReader(QMainWindow):
             QMessageBox.critical(self, "Error", f"Error reading {self.rss_feeds_file}.")
             return {}
 
-    def load_viewed_entries(self):
-        """Load viewed entries from a JSON file."""
-        try:
-            with open(self.viewed_entries_file, "r") as file:
-                return set(json.load(file))
-        except (FileNotFoundError, json.JSONDecodeError):
-            return set()
-
-    def save_viewed_entries(self):
-        """Save viewed entries to a JSON file."""
-        with open(self.viewed_entries_file, "w") as file:
-            json.dump(list(self.viewed_entries), file, indent=2)
-
-    def fetch_feed(self, url):
-        """Fetch and parse a single RSS feed."""
-        return feedparser.parse(url)
+    def reload_rss_feeds(self):
+        """Switch to the edited feed list: the running refresh is cancelled and the due feeds of the new list are
+        refreshed."""
+        path = os.path.abspath(self.rss_feeds_file)
+        if path not in self.feeds_watcher.files() and os.path.exists(path):
+            self.feeds_watcher.addPath(path)  # Replaced (not rewritten) files are no longer watched
+        feeds = self.load_rss_feeds()
+        if feeds == self.feeds:
+            return
+        self.feeds = self.reader.feeds = feeds
+        if not self.refresh_coordinator.cancel():
+            self.update_feed_entries(self.reader.entries())  # Otherwise once the cancelled refresh has ended
+        self.refresh_due_feeds()
+
+    def mark_viewed(self, records):
+        """Mark entries as viewed; the read state is persisted in the background."""
+        self.reader.mark_records_read(records)
+
+    def update_entry_counters(self):
+        """Recount the total/ unread entries and update the labels."""
+        self.unread_entries = self.reader.unread_count(self.feed_model.entries)
+        self.show_entry_counters()
+
+    def show_entry_counters(self):
+        self.total_label.setText(f"Total Entries: {len(self.feed_model.entries)}")
+        self.unread_label.setText(f"Unread Entries: {self.unread_entries}")
 
     def update_feed_entries(self, entries):
-        """Update the feed entries in the GUI."""
-        # Clear existing feed entries
-        for i in reversed(range(self.feed_layout.count())):
-            widget = self.feed_layout.itemAt(i).widget()
-            if widget is not None:
-                widget.deleteLater()
-
-        # Count unread entries and update the labels
-        total_entries = len(entries)
-        self.unread_entries = sum(1 for _, entry in entries if entry.get("title") not in self.viewed_entries)
-
+        """Replace the feed entries in the GUI with a complete, sorted list."""
+        self.render_scheduler.set_entries(entries)
+        self.update_entry_counters()
+
+    def on_render_finished(self, stats):
+        """Keep the event loop frame times of the last entry list load and show them in the diagnostics panel."""
+        self.last_render_stats = stats
+        if self.diagnostics_dialog is not None:
+            self.diagnostics_dialog.set_render_stats(stats)
+
+    def merge_feed_entries(self, feed_name, delta):
+        """Merge the changes of a single feed into the sorted view as soon as the feed arrives; only the new, updated
+        and vanished entries are merged and counted."""
+        if delta:
+            self.unread_entries += self.feed_model.merge_delta(delta)
+            self.show_entry_counters()
+
+    def on_refresh_complete(self):
+        """Called once every feed of a refresh has been processed."""
         self.last_refresh_label.setText(f"Last refresh done at: {datetime.now().strftime("%d-%b-%Y %H:%M:%S")}")
-        self.total_label.setText(f"Total Entries: {total_entries}")
-        self.unread_label.setText(f"Unread Entries: {self.unread_entries}")
 
-        # Display each entry in the GUI
-        for feed_name, entry in entries:
-            border_color = "grey" if entry.title in self.viewed_entries else "blue"
-            self.entry_container = QFrame()
-            self.entry_container.setStyleSheet(f"""
-                        QFrame {{
-                            background-color: #f5f5f5;
-                            border: 2px solid {border_color};
-                            border-radius: 10px;
-                            padding: 10px;
-                        }}
-                    """)
-            self.container_layout = QVBoxLayout(self.entry_container)
-            self.container_layout.setSpacing(1)
-
-            entry_widget = QLabel(f"<b>{feed_name}</b>: <a href='{entry.link}'>{entry.title}</a>")
-            entry_widget.setTextFormat(Qt.RichText)
-            entry_widget.setTextInteractionFlags(Qt.TextBrowserInteraction)
-            entry_widget.setOpenExternalLinks(False)
-
-            entry_widget.linkActivated.connect(
-                lambda _,
-                       title=entry.title,
-                       container=self.entry_container,
-                       link=entry.link:
-                self.on_entry_click(title, container, link))
-
-            self.preview_text = entry.get("summary") or entry.get("description") or "No preview available."
-            self.preview_widget = QLabel(self.preview_text[:200] + '<br>...')
-            self.preview_widget.setWordWrap(True)
-            self.preview_widget.setTextFormat(Qt.RichText)
-            self.preview_widget.setTextInteractionFlags(Qt.TextBrowserInteraction)
-            self.preview_widget.setOpenExternalLinks(False)
-            self.preview_widget.setStyleSheet("font-size: 10pt; color: gray;")
-
-            self.entry_date = datetime(*entry.published_parsed[:6]).strftime("%Y-%m-%d %H:%M:%S")
-            self.date_widget = QLabel(f"Date: {self.entry_date}")
-            self.date_widget.setStyleSheet("font-size: 9pt; color: #666;")
-
-            self.container_layout.addWidget(entry_widget)
-            self.container_layout.addWidget(self.date_widget)
-            self.container_layout.addWidget(self.preview_widget)
-            self.feed_layout.addWidget(self.entry_container)
-
-        # Re-enable buttons after feed is refreshed
-        self.mark_all_button.setDisabled(False)
-        self.refresh_button.setDisabled(False)
-
-    def refresh_feeds(self):
-        """Refresh and display all feeds, sorted by date."""
+        # Re-enable buttons after feed is refreshed, unless a follow-up refresh has started
+        if not self.refresh_coordinator.is_busy():
+            self.mark_all_button.setDisabled(False)
+            self.refresh_button.setDisabled(False)
+
+    def on_refresh_discarded(self):
+        """A cancelled refresh has ended: rebuild the view from the stored entries of the current feed list."""
+        self.update_feed_entries(self.reader.entries())
+        if not self.refresh_coordinator.is_busy():
+            self.mark_all_button.setDisabled(False)
+            self.refresh_button.setDisabled(False)
+
+    def on_diagnostics_ready(self, diagnostics):
+        """Keep the timings of the last refresh and update the diagnostics panel if it is open."""
+        self.last_diagnostics = diagnostics
+        if self.diagnostics_dialog is not None:
+            self.diagnostics_dialog.set_diagnostics(diagnostics)
+
+    def show_diagnostics(self):
+        """Open the diagnostics panel."""
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self)
+            if self.last_diagnostics is not None:
+                self.diagnostics_dialog.set_diagnostics(self.last_diagnostics)
+            if self.last_render_stats is not None:
+                self.diagnostics_dialog.set_render_stats(self.last_render_stats)
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+
+    def refresh_due_feeds(self):
+        """Fetch only the feeds whose next-due time has passed."""
+        due_feeds = self.reader.due_feeds()
+        if due_feeds:
+            self.refresh_feeds(due_feeds)
+
+    def refresh_feeds(self, feeds=None):
+        """Refresh the given feeds (all by default); each feed is merged into the view as soon as it has been fetched.
+        If a refresh is already running, the feeds it is not fetching are refreshed right after it."""
         self.mark_all_button.setDisabled(True)
         self.refresh_button.setDisabled(True)
+        self.refresh_coordinator.request(feeds)
 
-        # Start the FeedFetcher thread
-        self.fetcher_thread = FeedFetcher(self.feeds)
-        self.fetcher_thread.finished.connect(self.new_entries_signal.emit)  # Connect the signal
-        self.fetcher_thread.start()
-
-    def on_entry_click(self, title, entry_container, entry_link):
+    def on_entry_click(self, index):
         """Handle link click to mark the entry as read and update border color."""
-        webbrowser.open(entry_link)
-        if title not in self.viewed_entries:
-            self.viewed_entries.add(title)
-            # Change the border color of the clicked entry container to grey
-            entry_container.setStyleSheet("""
-                QFrame {
-                    background-color: #f5f5f5;
-                    border: 2px solid grey;
-                    border-radius: 10px;
-                    padding: 10px;
-                }
-            """)
-            # Save viewed entries after marking this entry as read
-            self.save_viewed_entries()
+        record = self.feed_model.entry(index.row())
+        webbrowser.open(record.link)
+        if not record.read:
+            self.mark_viewed([record])
+            # Change the border color of the clicked entry to grey
+            self.feed_model.read_state_changed(index.row(), index.row())
 
             self.unread_entries -= 1
             self.unread_label.setText(f"Unread Entries: {self.unread_entries}")
 
     def mark_all_as_read(self):
         """Mark all displayed entries as read and update unread count."""
-        for i in range(self.feed_layout.count()):
-            frame = self.feed_layout.itemAt(i).widget()
-            if isinstance(frame, QFrame):
-                # Access the layout of each frame to find the title label
-                container_layout = frame.layout()
-                title_label = container_layout.itemAt(0).widget()
-                if isinstance(title_label, QLabel):
-                    # Extract the title from the label's HTML content
-                    title_text = extract_title(title_label.text())
-                    self.viewed_entries.add(title_text)
-
-                    # Change the border color of the frame to grey
-                    frame.setStyleSheet("""
-                        QFrame {
-                            background-color: #f5f5f5;
-                            border: 2px solid grey;
-                            border-radius: 10px;
-                            padding: 10px;
-                        }
-                    """)
-
-        # Save viewed entries and update unread count
-        self.save_viewed_entries()
+        self.mark_viewed(self.feed_model.entries)
+        # Change the border color of every entry to grey
+        self.feed_model.read_state_changed()
+
+        # Update unread count
         self.unread_entries = 0
         self.unread_label.setText(f"Unread Entries: {self.unread_entries}")
 
+    def closeEvent(self, event):
+        """Stop the timers and the running refresh, then flush the read state and release the core before the window
+        closes."""
+        self.timer1.stop()
+        self.timer2.stop()
+        self.feeds_reload_timer.stop()
+        self.refresh_coordinator.shutdown()
+        self.reader.close()
+        super().closeEvent(event)
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Parse worker processes of a frozen (PyInstaller) build
     app = QApplication(sys.argv)
     reader = RSSReader()
     reader.show()
@@ -0,0 +1,50 @@
+"""Qt-free core of the RSS feed reader: fetching, parsing, scheduling, storage and read state.
+
+FeedReader is the programmatic API; python -m rss_core runs it headless (see rss_core.cli)."""
+from .cache import FeedCache
+from .entries import (entry_key,
+                      stable_id,
+                      entry_id,
+                      entry_timestamp,
+                      entry_epoch,
+                      merge_newest,
+                      entry_preview,
+                      EntryRecord,
+                      FeedDelta)
+from .store import EntryStore
+from .read_state import ReadStateJournal
+from .transport import (HttpResponse,
+                        RetryableHttpError,
+                        FetchPool,
+                        AsyncFetchEngine,
+                        http_get,
+                        backoff_delay)
+from .health import (CircuitOpenError,
+                     FeedHealth)
+from .scheduler import (FeedScheduler,
+                        parse_skip_rules)
+from .settings import (DEFAULT_FETCH_OPTIONS,
+                       DEFAULT_SCHEDULE_OPTIONS,
+                       DEFAULT_ENGINE_OPTIONS,
+                       DEFAULT_PARSER_OPTIONS,
+                       DEFAULT_WEBSUB_OPTIONS,
+                       Settings,
+                       parse_address,
+                       boostrap_rss_feeds,
+                       load_rss_feeds)
+from .parsing import (ParsePool,
+                      ParseTimeoutError,
+                      UnsupportedFeed,
+                      fast_parse,
+                      parse_body)
+from .refresh import (FEED_PHASES,
+                      FeedRefresher,
+                      RefreshCancelled,
+                      refresh_diagnostics)
+from .websub import (WebSubClient,
+                     LocalHub,
+                     parse_link_header)
+from .reader import FeedReader
+from .api import (TimelineServer,
+                  TimelineSnapshot)
+from .output import AggregatedFeed
@@ -0,0 +1,6 @@
+import sys
+
+from .cli import main
+
+if __name__ == '__main__':  # Not when re-imported by a spawned parse worker process
+    sys.exit(main())
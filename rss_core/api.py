@@ -0,0 +1,175 @@
+"""Local HTTP API serving the aggregated timeline to other machines/ dashboards, so they do not re-poll the feeds.
+
+    GET /timeline?limit=50&before=<cursor>&since=<cursor>&feed=<name>&feed=<name>
+    GET /feeds
+    GET /feed.atom, GET /feed.json (the aggregated feed, see rss_core.output; when published with documents)
+
+Every published timeline is a generation: its entries are serialized to JSON once, and every distinct response is
+built once per generation and then served from memory with an ETag (If-None-Match -> 304 Not Modified).
+"""
+import json
+import time
+import bisect
+import hashlib
+import threading
+import urllib.parse
+from datetime import datetime
+from http.server import (BaseHTTPRequestHandler,
+                         ThreadingHTTPServer)
+
+def make_cursor(key):
+    """Opaque position in the timeline: '<published epoch>-<entry id>' of an entry."""
+    published, row_id = key
+    return f"{published}-{row_id}"
+
+def parse_cursor(cursor):
+    """Inverse of make_cursor; raises ValueError on a malformed cursor."""
+    published, row_id = cursor.split('-', 1)
+    return int(published), int(row_id)
+
+class TimelineSnapshot:
+    """One generation of the timeline: the entries newest first, serialized once, plus its cached responses."""
+    max_cached_responses = 1024
+
+    def __init__(self, generation, entries, published_at, documents=None):
+        self.generation = generation
+        self.published_at = published_at
+        self.documents = documents or {}  # {path: (content type, pre-built body)}
+        records = sorted(entries, key=lambda record: (record.epoch, record.id), reverse=True)
+        # Sort keys negated, so the (newest first) rows are in ascending order for bisect
+        self.keys = [(-record.epoch, -record.id) for record in records]
+        self.cursors = [make_cursor((record.epoch, record.id)) for record in records]
+        self.fragments = [json.dumps({'id': str(record.id),
+                                      'feed': record.feed,
+                                      'title': record.title,
+                                      'link': record.link,
+                                      'published': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(record.epoch)),
+                                      'preview': record.preview,
+                                      'cursor': cursor}).encode()
+                          for record, cursor in zip(records, self.cursors)]
+        self.rows_by_feed = {}
+        for row, record in enumerate(records):
+            self.rows_by_feed.setdefault(record.feed, []).append(row)
+        self.digest = hashlib.blake2b(b'\n'.join(self.fragments), digest_size=8).hexdigest()
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def response(self, path, query):
+        """Return the cached (etag, content type, body) of a request, building it on its first request of this
+        generation."""
+        cache_key = (path, tuple(sorted((name, tuple(values)) for name, values in query.items())))
+        with self._lock:
+            cached = self._responses.get(cache_key)
+        if cached is not None:
+            return cached
+        if path in self.documents:
+            content_type, body = self.documents[path]
+        else:
+            content_type, body = 'application/json', self.timeline(query) if path == '/timeline' else self.feeds()
+        cached = f'"{self.digest}-{hashlib.blake2b(body, digest_size=6).hexdigest()}"', content_type, body
+        with self._lock:
+            if len(self._responses) >= self.max_cached_responses:
+                self._responses.clear()
+            self._responses[cache_key] = cached
+        return cached
+
+    def timeline(self, query):
+        """A page of the timeline, newest first; raises ValueError on invalid parameters."""
+        limit = min(max(int(query.get('limit', ['50'])[0]), 1), 500)
+        feeds = query.get('feed')
+        if feeds:
+            rows = sorted(row for feed_name in set(feeds) for row in self.rows_by_feed.get(feed_name, []))
+        else:
+            rows = range(len(self.keys))
+        keys = [self.keys[row] for row in rows] if feeds else self.keys
+
+        start, end = 0, len(rows)
+        if 'before' in query:
+            published, row_id = parse_cursor(query['before'][0])
+            start = bisect.bisect_right(keys, (-published, -row_id))
+        if 'since' in query:
+            published, row_id = parse_cursor(query['since'][0])
+            end = bisect.bisect_left(keys, (-published, -row_id))
+        page = rows[start:min(end, start + limit)]
+        next_cursor = self.cursors[page[-1]] if start + limit < end else None
+        latest_cursor = self.cursors[rows[0]] if len(rows) else None
+        return b''.join([b'{"generation": ', str(self.generation).encode(),
+                         b', "entries": [', b', '.join(self.fragments[row] for row in page), b']',
+                         b', "next": ', json.dumps(next_cursor).encode(),
+                         b', "latest": ', json.dumps(latest_cursor).encode(), b'}'])
+
+    def feeds(self):
+        """Entry count of every feed in the timeline."""
+        return json.dumps({'generation': self.generation,
+                           'published_at': datetime.fromtimestamp(self.published_at).isoformat(timespec='seconds'),
+                           'feeds': {feed_name: len(rows) for feed_name, rows in sorted(self.rows_by_feed.items())}
+                           }).encode()
+
+class TimelineServer:
+    """Threaded HTTP server answering timeline requests from the latest published snapshot."""
+
+    def __init__(self, host='127.0.0.1', port=8080):
+        self.generation = 0
+        self.snapshot = TimelineSnapshot(0, [], time.time())
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def publish(self, entries, documents=None):
+        """Make entries (EntryRecords) the served timeline, with the optional pre-built documents
+        ({path: (content type, body)}). The serialization happens here, in the caller's thread; an unchanged timeline
+        keeps its generation, so the clients' ETags stay valid."""
+        snapshot = TimelineSnapshot(self.generation + 1, entries, time.time(), documents)
+        if snapshot.digest != self.snapshot.digest:
+            self.generation += 1
+            self.snapshot = snapshot  # Atomic swap; requests in flight finish with the previous snapshot
+        return self.snapshot.generation
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parts = urllib.parse.urlsplit(self.path)
+                snapshot = server.snapshot
+                if parts.path not in ('/timeline', '/feeds') and parts.path not in snapshot.documents:
+                    return self.reply(404, b'{"error": "not found"}')
+                try:
+                    etag, content_type, body = snapshot.response(parts.path, urllib.parse.parse_qs(parts.query))
+                except ValueError as e:
+                    return self.reply(400, json.dumps({'error': str(e)}).encode())
+                if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+                    return self.reply(304, b'', etag=etag)
+                self.reply(200, body, content_type, etag)
+
+            def reply(self, status, body, content_type='application/json', etag=None):
+                self.send_response(status)
+                if etag:
+                    self.send_header('ETag', etag)
+                    self.send_header('Cache-Control', 'no-cache')
+                if body:
+                    self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='TimelineServer', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
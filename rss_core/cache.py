@@ -0,0 +1,47 @@
+"""Conditional GET cache: the validators, the body hash and the channel hints of every feed."""
+import threading
+import feedparser
+
+class FeedCache:
+    """Persistent per-feed validator cache: ETag, Last-Modified, the body hash and the channel hints (scheduling hints,
+    WebSub links) of the last fetch of every feed URL. Its rows live in the database of the EntryStore, which also holds
+    the entries of the feeds; save() only writes the feeds updated since the previous save."""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._feeds = store.load_feed_cache()
+        self._updated = set()
+
+    def save(self):
+        """Write the feeds updated since the last save."""
+        with self._lock:
+            updated = {url: self._feeds[url] for url in self._updated}
+            self._updated = set()
+        if updated:
+            self.store.save_feed_cache(updated)
+
+    def validators(self, url):
+        """Return the (etag, modified) pair to send with the next request for url."""
+        with self._lock:
+            cached = self._feeds.get(url, {})
+            return cached.get('etag'), cached.get('modified')
+
+    def channel(self, url):
+        """Return the channel hints (scheduling hints, WebSub links) of url from the last successful fetch."""
+        with self._lock:
+            return feedparser.FeedParserDict(self._feeds.get(url, {}).get('channel', {}))
+
+    def unchanged(self, url, body_hash):
+        """Whether the last fetched body of url hashed to body_hash."""
+        with self._lock:
+            return bool(body_hash) and self._feeds.get(url, {}).get('body_hash') == body_hash
+
+    def update(self, url, feed):
+        """Store the validators, body hash and channel hints of a freshly parsed feed."""
+        with self._lock:
+            self._feeds[url] = {'etag': feed.get('etag'),
+                                'modified': feed.get('modified'),
+                                'body_hash': feed.get('body_hash'),
+                                'channel': dict(feed.get('feed', {}))}
+            self._updated.add(url)
@@ -0,0 +1,113 @@
+"""Headless CLI/ daemon: refreshes the feeds on their schedule and persists the results, without Qt.
+
+    python -m rss_core --data-dir /srv/rss            # daemon, checks for due feeds every check_interval seconds
+    python -m rss_core --once --all                   # refresh every feed once and exit
+    python -m rss_core --list 20                      # print the 20 newest stored entries
+    python -m rss_core --serve 0.0.0.0:8080           # daemon, also serving the timeline over HTTP (see rss_core.api)
+    python -m rss_core --output-dir /var/www/rss      # daemon, also writing aggregated.atom/ aggregated.json
+"""
+import sys
+import signal
+import argparse
+import threading
+from datetime import datetime
+
+from .api import TimelineServer
+from .output import AggregatedFeed
+from .reader import FeedReader
+from .settings import parse_address
+
+def log(message):
+    print(f"{datetime.now().strftime("%d-%b-%Y %H:%M:%S")} {message}", flush=True)
+
+def print_entries(reader, count):
+    """Print the newest stored entries; unread ones are marked with a *."""
+    for record in reader.entries(count):
+        published = datetime.fromtimestamp(record.epoch)
+        print(f"{' ' if record.read else '*'} {published.strftime("%d-%b-%Y %H:%M")}  [{record.feed}] {record.title}\n"
+              f"    {record.link}")
+
+publish_lock = threading.Lock()  # Refreshes and WebSub pushes publish from different threads
+
+def publish(reader, aggregated_feed, output_dir=None, timeline_server=None):
+    """Update the aggregated feed with the stored timeline, write it (if output_dir is set) and publish the timeline
+    to the HTTP API (if served); returns the stored timeline."""
+    with publish_lock:
+        stored_entries = reader.entries()
+        if aggregated_feed.update(stored_entries) and output_dir:
+            aggregated_feed.write(output_dir)
+        if timeline_server is not None:
+            timeline_server.publish(stored_entries, aggregated_feed.documents())
+    return stored_entries
+
+def run_refresh(reader, feeds, aggregated_feed, output_dir=None, timeline_server=None):
+    """Refresh feeds, publish the timeline if any feed changed and log one line per refresh."""
+    diagnostics = reader.refresh(feeds)[1]
+    totals = diagnostics['totals']
+    if totals['new'] or totals['updated'] or totals['vanished']:
+        publish(reader, aggregated_feed, output_dir, timeline_server)  # Unchanged timelines are already published
+    log(f"Refreshed {totals['feeds']} feeds in {diagnostics['duration']:.1f} s: "
+        + ', '.join(f"{totals.get(outcome, 0)} {outcome}" for outcome in ('ok', 'not_modified', 'failed', 'skipped'))
+        + f" ({totals.get('parses_skipped', 0)} unchanged bodies not re-parsed)"
+        + f"; {totals['new']} new, {totals['updated']} updated, {totals['vanished']} vanished entries")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='rss_core',
+                                     description="Headless RSS feed reader: refreshes the feeds of rss_feeds.json on "
+                                                 "their schedule and stores their entries.")
+    parser.add_argument('--data-dir', default='.',
+                        help="directory of rss_feeds.json, settings.json and the state files (default: the cwd)")
+    parser.add_argument('--once', action='store_true', help="refresh once and exit instead of running as a daemon")
+    parser.add_argument('--all', action='store_true',
+                        help="refresh every feed on the first pass, not only the due ones")
+    parser.add_argument('--list', type=int, metavar='N', help="print the N newest stored entries and exit")
+    parser.add_argument('--serve', metavar='[HOST:]PORT',
+                        help="serve the aggregated timeline over HTTP (GET /timeline, /feeds, /feed.atom, /feed.json) "
+                             "while running")
+    parser.add_argument('--output-dir', help="write the aggregated timeline as aggregated.atom and aggregated.json "
+                                             "(Atom/ JSON Feed) into this directory after every refresh")
+    parser.add_argument('--window', type=int, default=200, help="entries in the aggregated feed (default: 200)")
+    args = parser.parse_args(argv)
+
+    # WebSub pushes are only received by the daemon
+    reader = FeedReader(args.data_dir, websub=not args.once and args.list is None)
+    timeline_server = None
+    aggregated_feed = AggregatedFeed(args.window)
+    try:
+        if args.list is not None:
+            print_entries(reader, args.list)
+            return 0
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        check_interval = reader.settings.schedule['check_interval']
+        if args.serve:
+            timeline_server = TimelineServer(*parse_address(args.serve)).start()
+            log(f"Serving the timeline at {timeline_server.address}/timeline")
+        # Publish the stored timeline right away, so it is available until the first refresh is done
+        publish(reader, aggregated_feed, args.output_dir, timeline_server)
+        if reader.websub is not None:
+            def on_push(feed_name, delta):
+                log(f"Pushed {feed_name}: {delta.new} new, {delta.updated} updated, {delta.vanished} vanished entries")
+                if delta:
+                    publish(reader, aggregated_feed, args.output_dir, timeline_server)
+            reader.push_listeners.append(on_push)
+            log(f"Receiving WebSub pushes at {reader.websub.callback_url}")
+        log(f"Watching {len(reader.feeds)} feeds" + ("" if args.once else f", checking every {check_interval} s"))
+        feeds = reader.feeds if args.all else reader.due_feeds()
+        while True:
+            if feeds:
+                run_refresh(reader, feeds, aggregated_feed, args.output_dir, timeline_server)
+            if args.once or stop.wait(check_interval):
+                break
+            feeds = reader.due_feeds()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if timeline_server is not None:
+            timeline_server.stop()
+        reader.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Entry records, plus the identity, timestamp and preview helpers shared by the store, the scheduler and the GUI."""
+import sys
+import heapq
+import hashlib
+import calendar
+import itertools
+
+def entry_key(entry):
+    """Return the identifier a feed gives an entry: its guid/ id, else its link, else its title."""
+    return entry.get("id") or entry.get("link") or entry.get("title") or ""
+
+def stable_id(feed_url, key):
+    """Signed 64-bit hash of a feed URL and an entry key (fits an SQLite INTEGER)."""
+    digest = hashlib.blake2b(f"{feed_url}\n{key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+def entry_id(feed_url, entry):
+    """Stable id of an entry, used for read state, storage and diffing; identical titles in different feeds
+    (or different entries with the same title) get different ids."""
+    return stable_id(feed_url, entry_key(entry))
+
+def entry_timestamp(entry):
+    """Return the publication time of an entry as epoch seconds (0 when the feed does not provide one)."""
+    published = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(published) if published else 0
+
+def entry_epoch(entry, fallback):
+    """Integer sort key of an entry: its publication time, else its update time, else fallback (the time it was
+    first fetched), so undated entries still sort and never compare None against a struct_time."""
+    published = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(published) if published else int(fallback)
+
+def entry_preview(entry):
+    """Return the preview text shown under an entry."""
+    return entry.get("summary") or entry.get("description") or "No preview available."
+
+class EntryRecord:
+    """Slim entry kept by the store, the views and the outputs instead of the parsed feedparser tree: only the
+    displayed fields, with the feed name interned so all the records of a feed share one string."""
+    __slots__ = ('id', 'feed', 'title', 'link', 'epoch', 'preview', 'read')
+
+    def __init__(self, id, feed, title, link, epoch, preview, read=False):
+        self.id = id
+        self.feed = sys.intern(feed)
+        self.title = title
+        self.link = link
+        self.epoch = epoch
+        self.preview = preview
+        self.read = read
+
+    @classmethod
+    def from_entry(cls, record_id, feed_name, entry, epoch):
+        """Record of a parsed feedparser entry."""
+        return cls(record_id, feed_name, entry.get("title") or "", entry.get("link") or "", epoch,
+                   entry_preview(entry)[:200])
+
+    def content(self):
+        """The displayed fields, used to detect changed entries."""
+        return self.title, self.link, self.epoch, self.preview
+
+    def fingerprint(self):
+        """Signed 64-bit hash of the displayed fields, stored to detect updated entries across runs."""
+        digest = hashlib.blake2b("\x1f".join((self.title, self.link, str(self.epoch), self.preview)).encode(),
+                                 digest_size=8).digest()
+        return int.from_bytes(digest, 'big', signed=True)
+
+    def __repr__(self):
+        return f"EntryRecord({self.id}, {self.feed!r}, {self.title!r})"
+
+class FeedDelta:
+    """What changed in a feed since its last refresh: the new and updated records (newest first), plus the
+    (epoch, id) of the rows they replace or which vanished from the feed."""
+    __slots__ = ('feed', 'records', 'removed', 'new', 'updated', 'unchanged', 'vanished')
+
+    def __init__(self, feed, records, removed, new=0, updated=0, unchanged=0, vanished=0):
+        self.feed = feed
+        self.records = records
+        self.removed = removed
+        self.new = new
+        self.updated = updated
+        self.unchanged = unchanged
+        self.vanished = vanished
+
+    def __bool__(self):
+        return bool(self.records or self.removed)
+
+    def __repr__(self):
+        return (f"FeedDelta({self.feed!r}, new={self.new}, updated={self.updated}, unchanged={self.unchanged}, "
+                f"vanished={self.vanished})")
+
+def merge_newest(streams, limit=None):
+    """K-way merge of lists of records, each sorted newest first, into one newest-first list; stops after limit
+    records, so only what is kept gets merged."""
+    merged = heapq.merge(*streams, key=lambda record: record.epoch, reverse=True)
+    return list(itertools.islice(merged, limit))
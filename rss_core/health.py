@@ -0,0 +1,48 @@
+"""Per-feed circuit breaker."""
+import json
+import time
+import threading
+
+from .state_files import (load_state,
+                          write_atomic)
+
+class CircuitOpenError(Exception):
+    """Raised instead of fetching a feed whose circuit breaker is open."""
+
+class FeedHealth:
+    """Persistent per-feed circuit breaker: feeds failing too many refreshes in a row are skipped for a cool-down."""
+
+    def __init__(self, health_file='feed_health.json', threshold=5, cooldown=3600):
+        self.health_file = health_file
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._feeds = self.load()
+
+    def load(self):
+        """Load the breaker state from disk; a missing or corrupt file means every circuit is closed."""
+        return load_state(self.health_file)
+
+    def save(self):
+        """Atomically write the breaker state to disk."""
+        with self._lock:
+            payload = json.dumps(self._feeds, indent=2)
+        write_atomic(self.health_file, payload)
+
+    def open_until(self, url):
+        """Return the epoch time until which url must be skipped, or None if its circuit is closed."""
+        with self._lock:
+            open_until = self._feeds.get(url, {}).get('open_until', 0)
+        return open_until if open_until > time.time() else None
+
+    def record_success(self, url):
+        with self._lock:
+            self._feeds.pop(url, None)
+
+    def record_failure(self, url):
+        """Count a failed fetch; once the threshold is reached the circuit opens for the cool-down period."""
+        with self._lock:
+            state = self._feeds.setdefault(url, {'failures': 0, 'open_until': 0})
+            state['failures'] += 1
+            if state['failures'] >= self.threshold:
+                state['open_until'] = time.time() + self.cooldown
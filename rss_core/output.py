@@ -0,0 +1,100 @@
+"""Re-publication of the aggregated timeline as one Atom feed and one JSON Feed.
+
+The newest `window` entries are kept as pre-serialized Atom/ JSON fragments; every update only serializes the entries
+which are new to the window and splices them in, so the output documents are a join of cached bytes.
+"""
+import os
+import json
+import time
+import heapq
+from xml.sax.saxutils import (escape,
+                              quoteattr)
+
+from .state_files import write_atomic
+
+def iso_time(epoch):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+class AggregatedFeed:
+    """Bounded window of the newest timeline entries, serialized once as Atom and JSON Feed fragments."""
+
+    def __init__(self, window=200, title="Aggregated RSS feeds", feed_id="urn:pyaggregatedrssfeedreader:timeline"):
+        self.window = window
+        self.title = title
+        self.feed_id = feed_id
+        self.keys = []  # (-published, -id) of the window rows, ascending = newest first
+        self.contents = []  # Serialized fields of the window rows, to detect edited entries
+        self.atom_fragments = []
+        self.json_fragments = []
+        self.serialized = 0  # Entries serialized so far (the work done by the incremental updates)
+
+    def update(self, entries):
+        """Bring the window up to date with the timeline entries (EntryRecords); returns True if it changed. Only
+        entries new to the window or edited since they were serialized are serialized; entries gone from the timeline
+        are dropped."""
+        candidates = {(-record.epoch, -record.id): record for record in entries}
+        newest = heapq.nsmallest(self.window, candidates)
+        contents = [(candidates[key].feed, *candidates[key].content()) for key in newest]
+        if newest == self.keys and contents == self.contents:
+            return False
+
+        known = dict(zip(self.keys, zip(self.contents, self.atom_fragments, self.json_fragments)))
+        atom_fragments, json_fragments = [], []
+        for key, content in zip(newest, contents):
+            known_content, atom_fragment, json_fragment = known.get(key, (None, None, None))
+            if known_content != content:
+                atom_fragment, json_fragment = self.serialize(candidates[key])
+                self.serialized += 1
+            atom_fragments.append(atom_fragment)
+            json_fragments.append(json_fragment)
+        self.keys, self.contents = newest, contents
+        self.atom_fragments, self.json_fragments = atom_fragments, json_fragments
+        return True
+
+    @staticmethod
+    def serialize(record):
+        """Atom <entry> and JSON Feed item of one timeline entry."""
+        atom_fragment = (f"<entry><id>urn:entry:{record.id}</id>"
+                         f"<title>{escape(record.title)}</title>"
+                         f"<link href={quoteattr(record.link)}/>"
+                         f"<updated>{iso_time(record.epoch)}</updated>"
+                         f"<published>{iso_time(record.epoch)}</published>"
+                         f"<author><name>{escape(record.feed)}</name></author>"
+                         f"<summary type=\"html\">{escape(record.preview)}</summary></entry>\n").encode()
+        json_fragment = json.dumps({'id': str(record.id),
+                                    'url': record.link,
+                                    'title': record.title,
+                                    'content_html': record.preview,
+                                    'date_published': iso_time(record.epoch),
+                                    'authors': [{'name': record.feed}]}).encode()
+        return atom_fragment, json_fragment
+
+    def updated(self):
+        """Publication time of the newest entry (the epoch for an empty window)."""
+        return iso_time(-self.keys[0][0] if self.keys else 0)
+
+    def atom(self):
+        """The Atom document."""
+        return b''.join([f'<?xml version="1.0" encoding="utf-8"?>\n'
+                         f'<feed xmlns="http://www.w3.org/2005/Atom">\n'
+                         f'<id>{escape(self.feed_id)}</id><title>{escape(self.title)}</title>'
+                         f'<updated>{self.updated()}</updated>\n'.encode(),
+                         *self.atom_fragments,
+                         b'</feed>\n'])
+
+    def json_feed(self):
+        """The JSON Feed (version 1.1) document."""
+        return b''.join([b'{"version": "https://jsonfeed.org/version/1.1", ',
+                         f'"title": {json.dumps(self.title)}, "items": ['.encode(),
+                         b', '.join(self.json_fragments),
+                         b']}'])
+
+    def documents(self):
+        """{path: (content type, document)} of the outputs, as served by the HTTP API."""
+        return {'/feed.atom': ('application/atom+xml', self.atom()),
+                '/feed.json': ('application/feed+json', self.json_feed())}
+
+    def write(self, output_dir):
+        """Atomically write aggregated.atom and aggregated.json into output_dir."""
+        for file_name, document in (('aggregated.atom', self.atom()), ('aggregated.json', self.json_feed())):
+            write_atomic(os.path.join(output_dir, file_name), document)
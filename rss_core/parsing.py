@@ -0,0 +1,474 @@
+"""Feed parsing, in the calling thread or in a pool of worker processes.
+
+The "fast" backend stream-parses plain RSS 2.0 and Atom documents, extracting only the fields the reader uses (run
+through feedparser's own text helpers, so the entries and their ids match feedparser's) and stopping at the first entry
+which was already known (and unchanged); anything malformed or exotic is left to feedparser.
+
+feedparser is pure Python, so parsing in threads is serialized on the GIL. ParsePool runs it in worker processes
+instead: every parse has a hard timeout (the worker is killed and replaced), and workers are recycled after a number
+of parses or once their memory grows past a watermark. Only the slim parse result crosses the process boundary.
+"""
+import os
+import re
+import time
+import queue
+import threading
+import email.utils
+import multiprocessing
+import xml.etree.ElementTree as ElementTree
+from datetime import (datetime,
+                      timezone)
+import feedparser
+try:
+    # Internals of feedparser 6.0 (pinned in requirements.txt) the fast parser runs its text through, so its entries
+    # match feedparser's; should they move, every feed is parsed with feedparser
+    from feedparser.encodings import convert_to_utf8
+    from feedparser.html import _cp1252
+    from feedparser.mixin import _FeedParserMixin
+    from feedparser.sanitizer import _sanitize_html
+    from feedparser.urls import (_urljoin,
+                                 resolve_relative_uris)
+except ImportError:
+    convert_to_utf8 = None
+
+from .entries import (entry_key,
+                      entry_epoch,
+                      entry_timestamp,
+                      EntryRecord)
+
+# Entry fields kept by the parsers: what the records, the ids and the schedule are built from
+ENTRY_FIELDS = ('id', 'title', 'link', 'summary', 'published_parsed', 'updated_parsed')
+# Channel elements read by the scheduler (FeedScheduler.publisher_interval)
+CHANNEL_HINTS = ('ttl', 'sy_updateperiod', 'sy_updatefrequency')
+# Channel links kept for WebSub (rel="hub"/ rel="self"), as websub_hub/ websub_self
+WEBSUB_RELS = ('hub', 'self')
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+DC = '{http://purl.org/dc/elements/1.1/}'
+DCTERMS = '{http://purl.org/dc/terms/}'
+SY = '{http://purl.org/rss/1.0/modules/syndication/}'
+ITUNES = '{http://www.itunes.com/dtds/podcast-1.0.dtd}'
+MEDIA = '{http://search.yahoo.com/mrss/}'
+XHTML = '{http://www.w3.org/1999/xhtml}'
+CONTENT_ENCODED = '{http://purl.org/rss/1.0/modules/content/}encoded'
+FAST_CHANNEL_HINTS = {'ttl': 'ttl',
+                      f'{SY}updatePeriod': 'sy_updateperiod',
+                      f'{SY}updateFrequency': 'sy_updatefrequency'}
+
+# Entry elements the fast parser reads (links may repeat, the last one wins as in feedparser)
+RSS_FIELDS = ('guid', 'title', 'description', CONTENT_ENCODED, 'pubDate', f'{DC}date')
+ATOM_FIELDS = (f'{ATOM}id', f'{ATOM}title', f'{ATOM}summary', f'{ATOM}content', f'{ATOM}published', f'{ATOM}updated')
+# Other elements feedparser reads titles, summaries, links or dates from (its names are case insensitive); entries
+# holding any of them are left to feedparser
+FEEDPARSER_ALIASES = {f'{DC}title', f'{DC}description', f'{DCTERMS}issued', f'{DCTERMS}modified', f'{ITUNES}summary',
+                      f'{MEDIA}title', f'{MEDIA}description', f'{XHTML}body', 'abstract', 'body', 'content', 'fullitem',
+                      'id', 'issued', 'modified', 'published', 'summary', 'updated'}
+RSS_NAMES = {'guid', 'title', 'link', 'description', 'pubdate'}
+# Content types of the text elements read, as feedparser.mixin._FeedParserMixin.map_content_type names them
+TEXT_TYPES = ('text/plain', 'text/html', 'application/xhtml+xml')
+# feedparser rewrites document type declarations (and their entities); such documents are left to it
+DOCTYPE = re.compile(rb'<!DOCTYPE', re.IGNORECASE)
+
+class ParseTimeoutError(Exception):
+    """Raised when a parse takes longer than the pool's timeout."""
+
+class UnsupportedFeed(Exception):
+    """Raised by the fast parser for documents it does not handle; they are parsed with feedparser instead."""
+
+def slim_entry(entry):
+    """The kept fields of a parsed entry; the summary is cut to the preview length. The fields are read as stored, not
+    through feedparser's deprecated updated -> published fallback."""
+    slim = {key: dict.get(entry, key) for key in ENTRY_FIELDS if dict.get(entry, key)}
+    summary = entry.get("summary") or entry.get("description")
+    if summary:
+        slim['summary'] = summary[:200]
+    return slim
+
+def entry_state(entry, epoch):
+    """(epoch, fingerprint) of an entry, as the store keeps them to detect updated entries."""
+    return epoch, EntryRecord.from_entry(0, '', entry, epoch).fingerprint()
+
+def known_entries(entries):
+    """(newest publication time, {entry key: entry_state}) of the previously parsed entries of a feed, the stop point
+    of the fast parser; None if there are none."""
+    if not entries:
+        return None
+    return (max(entry_timestamp(entry) for entry in entries),
+            {entry_key(entry): entry_state(entry, entry_epoch(entry, 0)) for entry in entries})
+
+def complete_entries(entries, previous, capped=True):
+    """Entries of a partial parse, followed by the previously parsed entries not in it. If capped (a parse which
+    stopped at the first known entry), the result is no longer than the previous list (or the parsed one), as the
+    publisher drops its oldest entries; uncapped, every previous entry is kept until the next full fetch."""
+    seen = {entry_key(entry) for entry in entries}
+    tail = [entry for entry in previous if entry_key(entry) not in seen]
+    return entries + (tail[:max(len(previous) - len(entries), 0)] if capped else tail)
+
+def rfc822_time(text):
+    parsed = email.utils.parsedate_tz(text)
+    if parsed is None:
+        raise UnsupportedFeed(f"unknown date format: {text!r}")
+    return time.gmtime(email.utils.mktime_tz(parsed))
+
+def iso8601_time(text):
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        raise UnsupportedFeed(f"unknown date format: {text!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.utctimetuple()
+
+def element_text(element):
+    """Stripped text of a text-only element; elements with child elements (inline XHTML) are not supported."""
+    if len(element):
+        raise UnsupportedFeed(f"markup in <{element.tag}>")
+    return (element.text or '').strip()
+
+def repaired_text(text):
+    """feedparser's last step for every text value: UTF-8 text which was decoded as iso-8859-1 is decoded again and
+    windows-1252 characters in the C1 range are mapped to what they stand for."""
+    try:
+        text = text.encode('iso-8859-1').decode('utf-8')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        pass
+    return text.translate(_cp1252)
+
+def resolved_text(element, base_url, resolve=True):
+    """Text of an id/ link element as feedparser stores it: resolved against the base URL unless empty."""
+    text = element_text(element)
+    return repaired_text(_urljoin(base_url, text) if text and resolve else text)
+
+def link_text(element, base_url):
+    """The link feedparser takes from a <link> element, None if none: the href of an alternate HTML link or, without
+    a href, the element's text."""
+    if element.get('url') is not None or element.get('uri') is not None:
+        raise UnsupportedFeed(f"url/ uri attribute in <{element.tag}>")
+    if element.get('href') is None:
+        # feedparser's fix for query strings taken for entity references
+        link = resolved_text(element, base_url).replace('&amp;', '&')
+        return re.sub(r'&([A-Za-z0-9_]+);', r'&\g<1>', link)
+    content_type = _FeedParserMixin.map_content_type(element.get('type', 'text/html'))
+    if element.get('rel', 'alternate') == 'alternate' and content_type in _FeedParserMixin.html_types:
+        return _urljoin(base_url, element.get('href'))
+    return None
+
+def content_text(element, default_type, base_url, rss):
+    """Text of a title/ summary element as feedparser stores it: HTML (and, in RSS, plain text which looks like HTML)
+    gets its relative links resolved and is sanitized, with feedparser's own helpers."""
+    if element.get('mode') or element.get('src'):
+        raise UnsupportedFeed(f"encoded or external <{element.tag}>")
+    content_type = _FeedParserMixin.map_content_type(element.get('type', default_type))
+    if content_type not in TEXT_TYPES:
+        raise UnsupportedFeed(f"{content_type} in <{element.tag}>")
+    text = element_text(element)
+    if rss and content_type == 'text/plain' and _FeedParserMixin.looks_like_html(text):
+        content_type = 'text/html'
+    if content_type in _FeedParserMixin.html_types:
+        text = resolve_relative_uris(text, base_url, 'utf-8', content_type)
+        text = _sanitize_html(text, 'utf-8', content_type)
+    return repaired_text(text)
+
+def check_fields(element, fields, link, alias):
+    """Leave entries to feedparser whose fields it would read differently: repeated or nested field elements and
+    aliases (see FEEDPARSER_ALIASES)."""
+    seen = set()
+    for child in element:
+        if child.tag in fields:
+            if child.tag in seen:
+                raise UnsupportedFeed(f"repeated <{child.tag}>")
+            seen.add(child.tag)
+        for node in child.iter():
+            if alias(node.tag) or (node is not child and (node.tag in fields or node.tag == link)):
+                raise UnsupportedFeed(f"<{node.tag}> in an entry")
+
+def rss_alias(tag):
+    if tag.startswith('{'):
+        return tag in FEEDPARSER_ALIASES or tag.startswith(ATOM)
+    return tag.lower() in FEEDPARSER_ALIASES or (tag.lower() in RSS_NAMES and tag not in RSS_FIELDS + ('link',))
+
+def atom_alias(tag):
+    return tag in FEEDPARSER_ALIASES
+
+def rss_entry(item, base_url):
+    """The reader's fields of an RSS 2.0 <item>, named and processed as feedparser does."""
+    check_fields(item, RSS_FIELDS, 'link', rss_alias)
+    entry = {}
+    for child in item:
+        tag = child.tag
+        if tag == 'guid':
+            # feedparser resolves permalink guids like links and uses them as the link unless one came before
+            attributes = {name.lower(): value for name, value in child.attrib.items()}
+            permalink = attributes.get('ispermalink', 'true') == 'true'
+            entry['id'] = resolved_text(child, base_url, resolve=permalink)
+            if permalink:
+                entry.setdefault('link', entry['id'])
+        elif tag == 'title':
+            entry['title'] = content_text(child, 'text/plain', base_url, rss=True)
+        elif tag == 'link':
+            link = link_text(child, base_url)
+            if link is not None:
+                entry['link'] = link
+        elif tag == 'description' or (tag == CONTENT_ENCODED and 'summary' not in entry):
+            entry['summary'] = content_text(child, 'text/html', base_url, rss=True)
+        elif tag == 'pubDate':
+            entry['published_parsed'] = rfc822_time(element_text(child))
+        elif tag == f'{DC}date':
+            entry['updated_parsed'] = iso8601_time(element_text(child))
+    return entry
+
+def atom_entry(element, base_url):
+    """The reader's fields of an Atom <entry>, named and processed as feedparser does."""
+    check_fields(element, ATOM_FIELDS, f'{ATOM}link', atom_alias)
+    entry = {}
+    for child in element:
+        tag = child.tag
+        if tag == f'{ATOM}id':
+            # Used as the link, like a permalink guid, unless an alternate link came before
+            entry['id'] = resolved_text(child, base_url)
+            entry.setdefault('link', entry['id'])
+        elif tag == f'{ATOM}title':
+            entry['title'] = content_text(child, 'text/plain', base_url, rss=False)
+        elif tag == f'{ATOM}link':
+            link = link_text(child, base_url)
+            if link is not None:
+                entry['link'] = link
+        elif tag == f'{ATOM}summary' or (tag == f'{ATOM}content' and 'summary' not in entry):
+            entry['summary'] = content_text(child, 'text/plain', base_url, rss=False)
+        elif tag == f'{ATOM}published':
+            entry['published_parsed'] = iso8601_time(element_text(child))
+        elif tag == f'{ATOM}updated':
+            entry['updated_parsed'] = iso8601_time(element_text(child))
+    return entry
+
+def fast_parse(body, url, known=None, headers=None, chunk_size=64 * 1024):
+    """Stream-parse a plain RSS 2.0/ Atom document into the slim parse result (see parse_body), with the same entries
+    feedparser would give. With known (see known_entries) and a newest first document, parsing stops at the first known
+    and unchanged entry not newer than the newest known one and the result is marked truncated. Raises UnsupportedFeed
+    for anything else, including malformed XML."""
+    if convert_to_utf8 is None:
+        raise UnsupportedFeed("feedparser internals unavailable")
+    # The body is decoded (by the headers, the XML declaration or a BOM) and re-encoded to UTF-8 as feedparser does it
+    result = {}
+    body = convert_to_utf8({**(headers or {}), 'content-location': url}, body, result)
+    if not result.get('encoding'):
+        raise UnsupportedFeed("unknown character encoding")
+    if DOCTYPE.search(body, 0, 4096):
+        raise UnsupportedFeed("DOCTYPE")
+    newest_known, known_keys = known or (None, {})
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    channel, entries, path = {}, [], []
+    previous_timestamp, newest_first, truncated = None, False, False
+    try:
+        for offset in range(0, max(len(body), 1), chunk_size):
+            parser.feed(body[offset:offset + chunk_size])
+            for event, element in parser.read_events():
+                if event == 'start':
+                    if not path and element.tag not in ('rss', f'{ATOM}feed'):
+                        raise UnsupportedFeed(f"unsupported document type <{element.tag}>")
+                    if element.get('{http://www.w3.org/XML/1998/namespace}base'):
+                        raise UnsupportedFeed("xml:base")
+                    path.append(element.tag)
+                    continue
+                path.pop()
+                parent = path[-1] if path else None
+                if (element.tag, parent) in (('item', 'channel'), (f'{ATOM}entry', f'{ATOM}feed')):
+                    entry_fields = rss_entry if element.tag == 'item' else atom_entry
+                    entry = slim_entry(entry_fields(element, url))
+                    element.clear()
+                    timestamp = entry_timestamp(entry)
+                    if timestamp:
+                        # Only stop in newest first documents which start at or above the newest known entry
+                        if previous_timestamp is None:
+                            newest_first = known is not None and timestamp >= newest_known
+                        elif timestamp > previous_timestamp:
+                            newest_first = False
+                        previous_timestamp = timestamp
+                        if (newest_first and timestamp <= newest_known
+                                and known_keys.get(entry_key(entry)) == entry_state(entry, timestamp)):
+                            truncated = True
+                            break
+                    entries.append(feedparser.FeedParserDict(entry))
+                elif element.tag in FAST_CHANNEL_HINTS and parent in ('channel', f'{ATOM}feed'):
+                    channel[FAST_CHANNEL_HINTS[element.tag]] = element_text(element)
+                elif element.tag == f'{ATOM}link' and parent in ('channel', f'{ATOM}feed'):
+                    if element.get('rel') in WEBSUB_RELS and element.get('href'):
+                        channel.setdefault(f"websub_{element.get('rel')}",
+                                           _urljoin(url, element.get('href')))
+            if truncated:
+                break
+        else:
+            parser.close()
+    except ElementTree.ParseError as e:
+        raise UnsupportedFeed(f"malformed XML: {e}")
+    return feedparser.FeedParserDict(feed=feedparser.FeedParserDict(channel),
+                                     entries=entries,
+                                     bozo=bool(result.get('bozo')),
+                                     bozo_exception=str(result.get('bozo_exception', '')),
+                                     truncated=truncated,
+                                     parser='fast')
+
+def parse_body(body, headers, url, backend='feedparser', known=None):
+    """Parse a feed body and keep only what the reader uses: the slim entries, the channel scheduling hints and the
+    bozo flag (with the error as text, so the result can be pickled). The "fast" backend tries fast_parse first."""
+    if backend == 'fast':
+        try:
+            return fast_parse(body, url, known, headers)
+        except UnsupportedFeed:
+            pass
+    parsed = feedparser.parse(body, response_headers={**headers, 'content-location': url})
+    channel = parsed.get('feed', {})
+    hints = {key: channel[key] for key in CHANNEL_HINTS if key in channel}
+    for link in channel.get('links', []):
+        if link.get('rel') in WEBSUB_RELS and link.get('href'):
+            hints.setdefault(f"websub_{link['rel']}", link['href'])
+    return feedparser.FeedParserDict(
+        feed=feedparser.FeedParserDict(hints),
+        entries=[feedparser.FeedParserDict(slim_entry(entry)) for entry in parsed.entries],
+        bozo=bool(parsed.get('bozo')),
+        bozo_exception=str(parsed.get('bozo_exception', '')),
+        truncated=False,
+        parser='feedparser')
+
+def current_rss_mb():
+    """Resident memory of this process in MB: current RSS on Linux, else the peak RSS where the platform reports
+    it, else None (then only the parse count recycles the workers)."""
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if os.uname().sysname == 'Darwin' else peak / 2 ** 10
+
+def _worker_main(connection, max_parses, memory_watermark_mb):
+    """Worker process loop: parse the jobs received on connection until told to stop or due for recycling."""
+    for parses in range(1, max_parses + 1):
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        try:
+            result = ('ok', parse_body(*job))
+        except Exception as e:
+            result = ('error', f"{type(e).__name__}: {e}")
+        rss = current_rss_mb()
+        recycle = parses == max_parses or (rss is not None and rss > memory_watermark_mb)
+        connection.send((*result, recycle))
+        if recycle:
+            return
+
+class ParseWorker:
+    """One worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, max_parses, memory_watermark_mb):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main,
+                                       args=(child_connection, max_parses, memory_watermark_mb),
+                                       name='ParseWorker',
+                                       daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.connection.send(None)
+            except OSError:
+                pass
+        self.process.join(5)
+        self.connection.close()
+
+class ParsePool:
+    """Pool of parse worker processes, callable from any number of threads; parse() blocks until a worker is free."""
+
+    def __init__(self, workers=0, timeout=30, max_parses_per_worker=200, memory_watermark_mb=512):
+        self.workers = workers or os.cpu_count() or 2
+        self.timeout = timeout
+        self.max_parses_per_worker = max_parses_per_worker
+        self.memory_watermark_mb = memory_watermark_mb
+        self.context = multiprocessing.get_context()
+        self.recycled = 0  # Workers replaced so far (recycling, timeouts and crashes)
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._live = set()  # Idle and busy workers; close() waits for these only
+        self._closed = False
+        for _ in range(self.workers):
+            self._idle.put(self._new_worker())
+
+    def _new_worker(self):
+        worker = ParseWorker(self.context, self.max_parses_per_worker, self.memory_watermark_mb)
+        with self._lock:
+            self._live.add(worker)
+        return worker
+
+    def _replace(self, worker, kill=False):
+        worker.stop(kill=kill)
+        with self._lock:
+            self._live.discard(worker)
+            self.recycled += 1
+            closed = self._closed
+        if not closed:
+            self._idle.put(self._new_worker())
+
+    def _take_worker(self):
+        """Wait for an idle worker; raises ValueError once the pool is closed."""
+        while True:
+            if self._closed:
+                raise ValueError("parse pool closed")
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                pass
+
+    def parse(self, body, headers, url, backend='feedparser', known=None):
+        """parse_body in a worker process; raises ParseTimeoutError after the timeout, ValueError on parse errors."""
+        worker = self._take_worker()
+        try:
+            worker.connection.send((body, headers, url, backend, known))
+            if not worker.connection.poll(self.timeout):
+                self._replace(worker, kill=True)
+                raise ParseTimeoutError(f"parsing took longer than {self.timeout} s")
+            status, result, recycle = worker.connection.recv()
+        except (OSError, EOFError) as e:
+            self._replace(worker, kill=True)  # The worker died (e.g. ran out of memory)
+            raise ValueError(f"parse worker failed: {e}") from e
+        if recycle:
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+        if status == 'error':
+            raise ValueError(result)
+        return result
+
+    def close(self):
+        """Stop every worker; parses still running get up to the parse timeout to finish, then their workers are
+        killed."""
+        with self._lock:
+            self._closed = True
+        deadline = time.monotonic() + self.timeout + 1
+        while True:
+            with self._lock:
+                if not self._live:
+                    return
+            try:
+                worker = self._idle.get(timeout=0.1)  # Short, as busy workers may also be stopped by a timeout
+            except queue.Empty:
+                if time.monotonic() > deadline:
+                    break
+                continue
+            worker.stop()
+            with self._lock:
+                self._live.discard(worker)
+        with self._lock:
+            busy, self._live = self._live, set()
+        for worker in busy:
+            worker.stop(kill=True)
@@ -0,0 +1,128 @@
+"""Persistent read state: snapshot plus append-only journal of the viewed entry ids."""
+import os
+import time
+import json
+import struct
+import threading
+
+from .state_files import write_atomic
+
+class ReadStateJournal:
+    """Read state (the set of viewed entry ids) kept as a JSON snapshot plus an append-only journal of 8-byte ids.
+    Marking an entry read costs O(1): the id is buffered and a background thread appends the batch to the journal,
+    compacting it into a new snapshot (written atomically) once it grows past compact_threshold records. The titles of
+    a snapshot written by older versions are kept for legacy_days, for the entries they were read from to arrive."""
+    record = struct.Struct('<q')
+
+    def __init__(self, snapshot_file='viewed_entries.json', journal_file='viewed_entries.journal',
+                 flush_interval=1.0, compact_threshold=10000, legacy_days=30):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.flush_interval = flush_interval
+        self.compact_threshold = compact_threshold
+        self.legacy_days = legacy_days
+        # Titles of a snapshot written by older versions which no entry has been migrated from yet; kept in the snapshot
+        # until then, or until legacy_until (epoch seconds)
+        self.legacy_titles = set()
+        self.legacy_until = 0
+        self._lock = threading.Lock()  # Guards ids, legacy_titles and _pending
+        self._io_lock = threading.RLock()  # Serializes the journal/ snapshot writes
+        self._pending = []
+        self._compact_due = False
+        self.ids = self.load()
+        self._journal_records = os.path.getsize(self.journal_file) // self.record.size \
+            if os.path.isfile(self.journal_file) else 0
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name='ReadStateJournal', daemon=True)
+        self._flusher.start()
+
+    def load(self):
+        """Load the snapshot, then replay the journal (a torn record at its end is ignored)."""
+        ids = set()
+        try:
+            with open(self.snapshot_file, "r") as file:
+                snapshot = json.load(file)
+            if isinstance(snapshot, dict):
+                ids.update(snapshot.get("ids", []))
+                self.legacy_titles = set(snapshot.get("legacy_titles", []))
+                self.legacy_until = snapshot.get("legacy_until", 0)
+            else:
+                # Title based snapshot: rewritten in the current format, with the deadline of its titles
+                self.legacy_titles = set(snapshot)
+                self.legacy_until = time.time() + self.legacy_days * 86400
+                self._compact_due = True
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        if self.legacy_titles and time.time() >= self.legacy_until:
+            # The entries of the titles still left are no longer in the feeds
+            self.legacy_titles = set()
+            self._compact_due = True
+        try:
+            with open(self.journal_file, "rb") as file:
+                data = file.read()
+            usable = len(data) - len(data) % self.record.size
+            ids.update(read_id for (read_id,) in self.record.iter_unpack(data[:usable]))
+            if usable != len(data):
+                # Drop the torn record so the next appends stay aligned
+                with open(self.journal_file, "r+b") as file:
+                    file.truncate(usable)
+        except FileNotFoundError:
+            pass
+        return ids
+
+    def add(self, ids):
+        """Mark ids as read; they are persisted by the background flush."""
+        with self._lock:
+            new_ids = [read_id for read_id in ids if read_id not in self.ids]
+            self.ids.update(new_ids)
+            self._pending.extend(new_ids)
+
+    def migrated_titles(self, titles):
+        """Forget legacy titles which entries have been migrated from; the next flush writes them out of the
+        snapshot."""
+        with self._lock:
+            titles = self.legacy_titles & set(titles)
+            if titles:
+                self.legacy_titles = self.legacy_titles - titles  # Readers may be iterating the old set
+                self._compact_due = True
+
+    def flush(self):
+        """Append the buffered ids to the journal, compacting it if it grew too large."""
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if pending:
+                with open(self.journal_file, "ab") as file:
+                    file.write(b''.join(self.record.pack(read_id) for read_id in pending))
+                    file.flush()
+                    os.fsync(file.fileno())
+                self._journal_records += len(pending)
+            if self._journal_records >= self.compact_threshold or self._compact_due:
+                self.compact()
+
+    def compact(self):
+        """Atomically write every known id (and the legacy titles not migrated yet) into a new snapshot, then empty
+        the journal."""
+        with self._io_lock:
+            with self._lock:
+                snapshot = {"version": 2, "ids": list(self.ids)}
+                if self.legacy_titles:
+                    snapshot["legacy_titles"] = sorted(self.legacy_titles)
+                    snapshot["legacy_until"] = self.legacy_until
+                payload = json.dumps(snapshot)
+                self._compact_due = False
+            write_atomic(self.snapshot_file, payload, fsync=True)
+            # A crash before the truncation only leaves journal records that are already in the snapshot
+            with open(self.journal_file, "wb") as file:
+                os.fsync(file.fileno())
+            self._journal_records = 0
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and flush what is still buffered."""
+        self._stop.set()
+        self._flusher.join()
+        self.flush()
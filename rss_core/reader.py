@@ -0,0 +1,205 @@
+"""Programmatic API of the reader: the feed list, the settings and the persistent state, plus the refreshes."""
+import os
+import json
+
+from .cache import FeedCache
+from .store import EntryStore
+from .health import FeedHealth
+from .parsing import ParsePool
+from .refresh import FeedRefresher
+from .settings import (Settings,
+                       boostrap_rss_feeds,
+                       load_rss_feeds)
+from .scheduler import FeedScheduler
+from .websub import WebSubClient
+from .transport import (FetchPool,
+                        AsyncFetchEngine)
+from .read_state import ReadStateJournal
+from .state_files import write_atomic
+
+class FeedReader:
+    """Headless feed reader owning the feed list, the settings and every persistent store (all files in data_dir).
+    The GUI is one client of it; the headless CLI/ daemon (python -m rss_core) is another. websub=False keeps the
+    WebSub receiver off even if it is enabled in the settings (one-shot runs)."""
+
+    def __init__(self, data_dir='.', feeds=None, websub=True):
+        self.data_dir = data_dir
+        if feeds is None:
+            boostrap_rss_feeds(self.path('rss_feeds.json'))
+            feeds = load_rss_feeds(self.path('rss_feeds.json'))
+        self.feeds = feeds
+
+        # Local database with the last known entries of every feed
+        self.store = EntryStore(self.path('entries.db'))
+
+        # Read state: ids of the viewed entries, persisted as a snapshot plus an append-only journal
+        self.read_state = ReadStateJournal(self.path('viewed_entries.json'), self.path('viewed_entries.journal'))
+        self.viewed_entries = self.read_state.ids
+        if self.read_state.legacy_titles:
+            # Older versions stored the titles of the viewed entries; map them to the ids of the stored entries. The
+            # titles no entry is stored for yet stay in the snapshot, and get migrated once their entries arrive
+            stored = self.store.ids_with_titles(self.read_state.legacy_titles)
+            if stored:
+                self.mark_read([stored_id for stored_id, _ in stored])
+                self.read_state.migrated_titles([title for _, title in stored])
+
+        # Fetch settings (timeouts, retries, circuit breaker) and the persistent per-feed breaker state
+        self.settings = Settings(self.path('settings.json'))
+        self.health = FeedHealth(self.path('feed_health.json'),
+                                 threshold=self.settings.fetch['breaker_threshold'],
+                                 cooldown=self.settings.fetch['breaker_cooldown'])
+
+        # Per-feed polling schedule, so every check only fetches the feeds that are due
+        self.scheduler = FeedScheduler(self.path('feed_schedule.json'),
+                                       min_interval=self.settings.schedule['min_interval'],
+                                       max_interval=self.settings.schedule['max_interval'],
+                                       default_interval=self.settings.schedule['default_interval'],
+                                       push_interval=self.settings.websub['fallback_interval'])
+
+        # Download engine: a long-lived pool of fetch threads, or one long-lived asyncio loop with a shared connection
+        # pool; both limit the concurrent downloads overall and per host
+        self.engine = None
+        self.fetch_pool = None
+        if self.settings.engine['type'] == 'asyncio':
+            try:
+                self.engine = AsyncFetchEngine(self.settings.engine['max_connections'],
+                                               self.settings.engine['max_connections_per_host'])
+            except ImportError:
+                print("The asyncio engine requires aiohttp (pip install aiohttp), using the threads engine instead.")
+        if self.engine is None:
+            self.fetch_pool = FetchPool(self.settings.engine['max_connections'],
+                                        self.settings.engine['max_connections_per_host'])
+
+        # Parsing: in the fetching threads, or in a pool of worker processes with a per-parse timeout
+        self.parse_pool = None
+        if self.settings.parser['mode'] == 'processes':
+            self.parse_pool = ParsePool(self.settings.parser['workers'],
+                                        self.settings.parser['timeout'],
+                                        self.settings.parser['max_parses_per_worker'],
+                                        self.settings.parser['memory_watermark_mb'])
+
+        # Conditional GET cache (ETag/ Last-Modified, body hash, channel hints), shared by all refreshes
+        self.cache = FeedCache(self.store)
+
+        # WebSub: the feeds advertising a hub get pushed to a local callback receiver; on_push listeners are called
+        # with (feed_name, FeedDelta) of every delivery, from a receiver thread
+        self.push_listeners = []
+        self.websub = None
+        if websub and self.settings.websub['enabled']:
+            self.websub = WebSubClient(self.path('websub.json'),
+                                       self.settings.websub['listen'],
+                                       self.settings.websub['callback_url'],
+                                       self.settings.websub['lease_seconds'],
+                                       on_push=self.ingest_push).start()
+
+    def path(self, file_name):
+        """Path of a state file in the data directory."""
+        return os.path.join(self.data_dir, file_name)
+
+    def entries(self, limit=None):
+        """The stored records of the current feeds, newest first (only the newest limit ones)."""
+        return self.apply_read_state(self.store.load_entries(self.feeds, limit))
+
+    def due_feeds(self):
+        """The subset of the feeds whose next-due time has passed."""
+        return self.scheduler.due_feeds(self.feeds)
+
+    def refresh(self, feeds=None, on_feed=None, limit=None, cancel=None):
+        """Refresh the given feeds (all by default) in the calling thread and return (entries, diagnostics), the
+        entries being the newest limit (all by default) new or updated ones.
+        on_feed(feed_name, delta) streams the FeedDelta of every feed as soon as it has been processed (see
+        FeedRefresher.run); setting the cancel threading.Event skips the feeds which are not being fetched yet. The
+        diagnostics are also dumped to refresh_diagnostics.json."""
+        def handle_feed(feed_name, delta):
+            self.apply_read_state(delta.records)
+            on_feed(feed_name, delta)
+
+        feeds = self.feeds if feeds is None else feeds
+        if self.websub is not None:
+            self.scheduler.pushed = self.websub.active_feeds()
+        refresher = self.new_refresher(feeds, cancel)
+        entries = refresher.run(on_feed=handle_feed if on_feed is not None else None, limit=limit)
+        self.apply_read_state(entries)
+        write_atomic(self.path('refresh_diagnostics.json'), json.dumps(refresher.diagnostics, indent=2))
+        if self.websub is not None:
+            self.subscribe_hubs(feeds)
+        return entries, refresher.diagnostics
+
+    def new_refresher(self, feeds, cancel=None):
+        return FeedRefresher(feeds,
+                             self.cache,
+                             self.store,
+                             self.health,
+                             self.scheduler,
+                             self.settings,
+                             engine=self.engine,
+                             parse_pool=self.parse_pool,
+                             cancel=cancel,
+                             fetch_pool=self.fetch_pool)
+
+    def subscribe_hubs(self, feeds):
+        """Subscribe (or renew the subscriptions of) the feeds whose last fetch advertised a WebSub hub. Renewals are
+        sent at least two fallback polls before the lease expires."""
+        for url in feeds.values():
+            channel = self.cache.channel(url)
+            if channel.get('websub_hub'):
+                self.websub.ensure_subscribed(url,
+                                              channel['websub_hub'],
+                                              channel.get('websub_self') or url,
+                                              renew_before=2 * self.settings.websub['fallback_interval'])
+
+    def ingest_push(self, feed_url, body, headers):
+        """Run a WebSub delivery through the entry pipeline and pass its FeedDelta to the push listeners."""
+        feed_name = next((name for name, url in self.feeds.items() if url == feed_url), None)
+        if feed_name is None:
+            return  # No longer in the feed list
+        with self.store.delta_lock:
+            delta = self.new_refresher({feed_name: feed_url}).ingest(feed_name, body, headers)
+            self.apply_read_state(delta.records)
+            for listener in self.push_listeners:
+                listener(feed_name, delta)
+        self.cache.save()
+
+    def mark_read(self, ids):
+        """Mark entries as read by id; the read state is persisted in the background (the journal only, so marking
+        never waits for the database)."""
+        self.read_state.add(ids)
+
+    def mark_records_read(self, records):
+        """Mark records as read, setting their read flag."""
+        for record in records:
+            record.read = True
+        self.mark_read([record.id for record in records])
+
+    def apply_read_state(self, records):
+        """Set the read flag of records from the read state (migrating the legacy title based read state on the way);
+        returns records."""
+        legacy_titles = self.read_state.legacy_titles
+        if legacy_titles:
+            migrated = [record for record in records
+                        if record.title in legacy_titles and record.id not in self.viewed_entries]
+            if migrated:
+                self.mark_read([record.id for record in migrated])
+                self.read_state.migrated_titles([record.title for record in migrated])
+        for record in records:
+            record.read = record.id in self.viewed_entries
+        return records
+
+    @staticmethod
+    def unread_count(records):
+        """Number of the given records which have not been read."""
+        return sum(1 for record in records if not record.read)
+
+    def close(self):
+        """Flush the read state, then release the WebSub receiver, the download engine/ fetch threads, the parse workers
+        and the database."""
+        self.read_state.close()
+        if self.websub is not None:
+            self.websub.stop()
+        if self.engine is not None:
+            self.engine.close()
+        if self.fetch_pool is not None:
+            self.fetch_pool.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+        self.store.connection.close()
@@ -0,0 +1,393 @@
+"""Refresh of a set of feeds: concurrent download, parsing, persistence and per-feed timings."""
+import time
+import asyncio
+import hashlib
+import http.client
+import urllib.parse
+import feedparser
+from concurrent.futures import (ThreadPoolExecutor,
+                                as_completed)
+from datetime import datetime
+
+from .entries import (entry_id,
+                      entry_epoch,
+                      merge_newest,
+                      EntryRecord,
+                      FeedDelta)
+from .health import CircuitOpenError
+from .parsing import (WEBSUB_RELS,
+                      parse_body,
+                      known_entries,
+                      complete_entries)
+from .scheduler import parse_skip_rules
+from .websub import parse_link_header
+from .transport import (HttpResponse,
+                        RetryableHttpError,
+                        add_timing,
+                        http_get,
+                        backoff_delay)
+
+class RefreshCancelled(Exception):
+    """Raised instead of fetching (or retrying) a feed once its refresh has been cancelled."""
+
+FEED_PHASES = ('dns', 'connect', 'tls', 'ttfb', 'download', 'backoff', 'parse', 'process')
+
+def refresh_diagnostics(started_at, duration, engine, feed_stats):
+    """Summary of a refresh: per-feed stats sorted by start, totals and the critical path. The refresh lasts until
+    its last feed is done, so that feed's queue wait plus its own phases are the critical path."""
+    feed_stats = sorted(feed_stats, key=lambda stats: stats['start'])
+    totals = {'feeds': len(feed_stats),
+              'bytes': sum(stats.get('bytes', 0) for stats in feed_stats),
+              'entries': sum(stats.get('entries', 0) for stats in feed_stats),
+              'parses_skipped': sum(1 for stats in feed_stats if stats.get('parse_skipped')),
+              'new': sum(stats.get('new', 0) for stats in feed_stats),
+              'updated': sum(stats.get('updated', 0) for stats in feed_stats),
+              'vanished': sum(stats.get('vanished', 0) for stats in feed_stats)}
+    for stats in feed_stats:
+        totals[stats['outcome']] = totals.get(stats['outcome'], 0) + 1
+
+    critical_path = None
+    if feed_stats:
+        last = max(feed_stats, key=lambda stats: stats.get('end', 0))
+        critical_path = {'feed': last['feed'],
+                         'phases': [['queued', last['start']]] + [[phase, last[phase]] for phase in FEED_PHASES
+                                                                  if last.get(phase)]}
+    return {'started_at': datetime.fromtimestamp(started_at).isoformat(timespec='seconds'),
+            'duration': duration,
+            'engine': engine,
+            'totals': totals,
+            'critical_path': critical_path,
+            'feeds': feed_stats}
+
+class FeedRefresher:
+    """One refresh of a set of feeds ({name: url}); Qt-free, the results are reported through callbacks."""
+
+    def __init__(self, feeds, cache, store, health, scheduler, settings, engine=None, parse_pool=None, cancel=None,
+                 fetch_pool=None):
+        self.feeds = feeds
+        self.cache = cache
+        self.store = store
+        self.health = health
+        self.scheduler = scheduler
+        self.settings = settings
+        self.engine = engine  # AsyncFetchEngine, or None to download with a thread pool
+        self.fetch_pool = fetch_pool  # Shared FetchPool of the threads engine, or None for a pool of this refresh only
+        self.parse_pool = parse_pool  # ParsePool, or None to parse in the fetching thread
+        # threading.Event; once set, the feeds not being downloaded yet are skipped (the in-flight ones still finish
+        # and are persisted, so their validators never get ahead of the stored entries)
+        self.cancel = cancel
+        self.feed_stats = {}
+        self.diagnostics = None
+
+    def run(self, on_feed=None, limit=None):
+        """Fetch every feed and return their new and updated EntryRecords, newest first (only the newest limit ones).
+        If on_feed is given, it is called with (feed_name, FeedDelta) as soon as each feed has been processed instead
+        (streaming; returns [])."""
+        streams = []
+        started_at = time.time()
+        self.refresh_started = time.perf_counter()
+        self.feed_stats = {}
+
+        if self.engine is not None:
+            futures = {self.engine.submit(self.fetch_feed_async(name, url)): name for name, url in self.feeds.items()}
+            self.collect_feeds(futures, streams, on_feed)
+        elif self.fetch_pool is not None:
+            futures = {self.fetch_pool.submit(url, self.fetch_feed, name, url): name
+                       for name, url in self.feeds.items()}
+            self.collect_feeds(futures, streams, on_feed)
+        else:
+            with ThreadPoolExecutor() as executor:
+                futures = {executor.submit(self.fetch_feed, name, url): name for name, url in self.feeds.items()}
+                self.collect_feeds(futures, streams, on_feed)
+
+        self.cache.save()
+        self.health.save()
+        self.scheduler.save()
+        entries = merge_newest(streams, limit)  # Each feed is sorted already, so k-way merge them
+        self.diagnostics = refresh_diagnostics(started_at,
+                                               time.perf_counter() - self.refresh_started,
+                                               'asyncio' if self.engine is not None else 'threads',
+                                               list(self.feed_stats.values()))
+        return entries
+
+    def collect_feeds(self, futures, streams, on_feed=None):
+        """Handle every feed as soon as its future completes: diff its entries against the stored ones (dropping the
+        parsed feed), persist the delta and pass it on."""
+        for future in as_completed(futures):
+            feed_name = futures[future]
+            try:
+                feed = future.result()
+                started = time.perf_counter()
+                with self.store.delta_lock:
+                    delta = self.feed_delta(feed_name, feed)  # Persists each feed as soon as it arrives
+                    del feed  # Only the changed records are kept
+                    if on_feed is not None:
+                        on_feed(feed_name, delta)
+                    else:
+                        streams.append(delta.records)
+                stats = self.feed_stats[feed_name]
+                stats.update(new=delta.new, updated=delta.updated, unchanged=delta.unchanged, vanished=delta.vanished)
+                stats['process'] = time.perf_counter() - started
+                stats['end'] += stats['process']
+            except RefreshCancelled:
+                pass
+            except CircuitOpenError as e:
+                print(f"Skipped {feed_name}: {e}")
+            except Exception as e:
+                print(f"Failed to fetch {feed_name}: {e}")
+
+    def feed_delta(self, feed_name, feed):
+        """Classify the entries of a parsed feed against the stored ones by id and fingerprint as new, updated or
+        unchanged (stored entries missing from the feed have vanished), persist the changes and return them as a
+        FeedDelta."""
+        feed_url = self.feeds[feed_name]
+        fetched_at = time.time()
+        stored = self.store.stored_state(feed_name)
+        records, removed, entries = [], [], {}
+        new = unchanged = 0
+        for entry in feed.entries:
+            record_id = entry_id(feed_url, entry)
+            if record_id in entries:
+                continue
+            entries[record_id] = entry
+            previous = stored.get(record_id)
+            # Undated entries keep their first fetch time
+            record = EntryRecord.from_entry(record_id, feed_name, entry,
+                                            entry_epoch(entry, previous[0] if previous else fetched_at))
+            if previous is None:
+                new += 1
+                records.append(record)
+            elif record.fingerprint() != previous[1]:
+                records.append(record)
+                removed.append((previous[0], record_id))  # The row of the previous version
+            else:
+                unchanged += 1
+        vanished = [(epoch, stored_id) for stored_id, (epoch, _) in stored.items() if stored_id not in entries]
+        records.sort(key=lambda record: record.epoch, reverse=True)
+        self.store.apply_delta(feed_name, records, [stored_id for _, stored_id in vanished], entries)
+        if feed.get('body_hash'):
+            # Freshly parsed: its validators are cached once the entries they stand for are stored
+            self.cache.update(feed_url, feed)
+        return FeedDelta(feed_name, records, removed + vanished,
+                         new=new,
+                         updated=len(records) - new,
+                         unchanged=unchanged,
+                         vanished=len(vanished))
+
+    def ingest(self, feed_name, body, headers):
+        """Ingest a feed body pushed by a WebSub hub (hubs usually deliver only the new entries, so the cached ones
+        complete it) and return its FeedDelta."""
+        url = self.feeds[feed_name]
+        feed = self.parse_response(feed_name, url, HttpResponse(url, 200, headers, body), {}, partial=True)
+        return self.feed_delta(feed_name, feed)
+
+    def start_stats(self, name, url):
+        """Create the timing record of a feed; durations are in seconds, start/ end relative to the refresh start."""
+        stats = {'feed': name,
+                 'url': url,
+                 'start': time.perf_counter() - self.refresh_started,
+                 'attempts': 0,
+                 'outcome': 'pending'}
+        self.feed_stats[name] = stats
+        return stats
+
+    def finish_stats(self, stats, feed=None, error=None):
+        stats['end'] = time.perf_counter() - self.refresh_started
+        if isinstance(error, CircuitOpenError):
+            stats['outcome'] = 'skipped'
+        elif isinstance(error, RefreshCancelled):
+            stats['outcome'] = 'cancelled'
+        elif error is not None:
+            stats['outcome'] = 'failed'
+            stats['error'] = str(error) or type(error).__name__
+        else:
+            stats['outcome'] = 'not_modified' if feed.get('status') == 304 else 'ok'
+            stats['entries'] = len(feed.entries)
+
+    def check_cancelled(self):
+        """Raise RefreshCancelled if the refresh has been cancelled."""
+        if self.cancel is not None and self.cancel.is_set():
+            raise RefreshCancelled("refresh cancelled")
+
+    def check_circuit(self, url):
+        """Raise CircuitOpenError if the circuit breaker of url is open."""
+        open_until = self.health.open_until(url)
+        if open_until:
+            self.scheduler.record_failure(url, retry_at=open_until)
+            raise CircuitOpenError(f"too many failures, retrying after "
+                                   f"{datetime.fromtimestamp(open_until).strftime("%d-%b-%Y %H:%M:%S")}")
+
+    def record_success(self, url, feed):
+        self.health.record_success(url)
+        self.scheduler.record_success(url, feed, feed.get('headers'), feed.get('skip_rules'))
+
+    def record_failure(self, url):
+        self.health.record_failure(url)
+        self.scheduler.record_failure(url)
+
+    def fetch_feed(self, name, url):
+        """Conditionally fetch a feed through the circuit breaker; on 304 Not Modified the cached entries are reused."""
+        stats = self.start_stats(name, url)
+        try:
+            self.check_cancelled()
+            self.check_circuit(url)
+            try:
+                options = self.settings.fetch_options(name)
+                feed = self.parse_response(name, url, self.download(url, options, stats), stats)
+            except RefreshCancelled:
+                raise
+            except Exception:
+                self.record_failure(url)
+                raise
+        except Exception as e:
+            self.finish_stats(stats, error=e)
+            raise
+        self.record_success(url, feed)
+        self.finish_stats(stats, feed)
+        return feed
+
+    async def fetch_feed_async(self, name, url):
+        """fetch_feed for the asyncio engine; the download runs on the engine loop, the parsing in a worker thread."""
+        stats = self.start_stats(name, url)
+        try:
+            self.check_cancelled()
+            self.check_circuit(url)
+            try:
+                options = self.settings.fetch_options(name)
+                response = await self.download_async(url, options, stats)
+                feed = await asyncio.get_running_loop().run_in_executor(None, self.parse_response, name, url, response,
+                                                                        stats)
+            except RefreshCancelled:
+                raise
+            except Exception:
+                self.record_failure(url)
+                raise
+        except Exception as e:
+            self.finish_stats(stats, error=e)
+            raise
+        self.record_success(url, feed)
+        self.finish_stats(stats, feed)
+        return feed
+
+    def conditional_headers(self, url):
+        """If-None-Match/ If-Modified-Since headers built from the cached validators of url."""
+        etag, modified = self.cache.validators(url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if modified:
+            headers['If-Modified-Since'] = modified
+        return headers
+
+    def download(self, url, options, stats):
+        """Download a feed with bounded, jittered exponential backoff retries."""
+        headers = self.conditional_headers(url)
+        for attempt in range(options['retries'] + 1):
+            stats['attempts'] += 1
+            try:
+                response = http_get(url,
+                                    headers=headers,
+                                    connect_timeout=options['connect_timeout'],
+                                    read_timeout=options['read_timeout'],
+                                    timings=stats)
+                if response.status == 429 or response.status >= 500:
+                    raise RetryableHttpError(f"HTTP {response.status}")
+                return response
+            except (OSError, http.client.HTTPException, RetryableHttpError):
+                if attempt == options['retries']:
+                    raise
+                delay = backoff_delay(options, attempt)
+                add_timing(stats, 'backoff', delay)
+                if self.cancel is not None:
+                    self.cancel.wait(delay)
+                else:
+                    time.sleep(delay)
+                self.check_cancelled()
+
+    async def download_async(self, url, options, stats):
+        """Async counterpart of download, using the shared connection pool of the engine."""
+        headers = self.conditional_headers(url)
+        for attempt in range(options['retries'] + 1):
+            stats['attempts'] += 1
+            try:
+                response = await self.engine.get(url,
+                                                 headers=headers,
+                                                 connect_timeout=options['connect_timeout'],
+                                                 read_timeout=options['read_timeout'],
+                                                 timings=stats)
+                if response.status == 429 or response.status >= 500:
+                    raise RetryableHttpError(f"HTTP {response.status}")
+                return response
+            except (OSError, RetryableHttpError):
+                if attempt == options['retries']:
+                    raise
+                delay = backoff_delay(options, attempt)
+                add_timing(stats, 'backoff', delay)
+                await asyncio.sleep(delay)
+                self.check_cancelled()
+
+    def stored_feed(self, name, url):
+        """The feed as of its last fetch: the stored entries (as slim parsed entries, newest first) and the cached
+        channel hints (ttl, sy:updatePeriod, WebSub links), which still apply to the schedule."""
+        entries = []
+        for key, title, link, epoch, dated, preview in self.store.feed_entries(name):
+            entry = feedparser.FeedParserDict(id=key, title=title, link=link, summary=preview)
+            if dated:
+                entry['published_parsed'] = time.gmtime(epoch)
+            entries.append(entry)
+        return feedparser.FeedParserDict(feed=self.cache.channel(url), entries=entries)
+
+    def parse_response(self, name, url, response, stats, partial=False):
+        """Turn a downloaded response into a parsed feed; on 304 Not Modified the stored entries are reused. A partial
+        body (e.g. a WebSub delivery of the new entries only) is completed with the stored entries."""
+        stats['status'] = response.status
+        if response.status == 304:
+            feed = self.stored_feed(name, url)
+            feed['status'] = 304
+            feed['headers'] = response.headers
+            return feed
+        if response.status >= 400:
+            raise http.client.HTTPException(f"HTTP {response.status}")
+
+        started = time.perf_counter()
+        body_hash = hashlib.blake2b(response.body, digest_size=16).hexdigest()
+        if self.cache.unchanged(url, body_hash):
+            # Byte-identical to the last fetch (servers ignoring conditional requests): reuse the stored entries
+            stats['parse_skipped'] = True
+            feed = self.stored_feed(name, url)
+            feed['status'] = response.status
+            feed['headers'] = response.headers
+            add_timing(stats, 'parse', time.perf_counter() - started)
+            return feed
+
+        backend = self.settings.parser['backend']
+        previous = self.stored_feed(name, url).entries if backend == 'fast' or partial else []
+        known = known_entries(previous) if backend == 'fast' else None  # The fast parser stops at the first of these
+        if self.parse_pool is not None:
+            feed = self.parse_pool.parse(response.body, response.headers, response.url, backend, known)
+        else:
+            feed = parse_body(response.body, response.headers, response.url, backend, known)
+        if feed.truncated and not feed.entries:
+            # The body changed, yet it starts with the known, unchanged entries: an entry further down was edited (or
+            # removed), which only a full parse finds
+            if self.parse_pool is not None:
+                feed = self.parse_pool.parse(response.body, response.headers, response.url, backend)
+            else:
+                feed = parse_body(response.body, response.headers, response.url, backend)
+        if feed.truncated or partial:
+            feed['entries'] = complete_entries(feed.entries, previous, capped=not partial)
+        # WebSub hub/ self links may also come in the Link header (which takes precedence)
+        for rel, link in parse_link_header(response.headers.get('link')).items():
+            if rel in WEBSUB_RELS:
+                feed['feed'][f'websub_{rel}'] = urllib.parse.urljoin(response.url, link)
+        stats['parser'] = feed.parser
+        add_timing(stats, 'parse', time.perf_counter() - started)
+        if feed.bozo and not feed.entries:
+            raise ValueError(f"unparsable feed: {feed.get('bozo_exception')}")
+        feed['status'] = response.status
+        feed['headers'] = response.headers  # Cache-Control/ Expires, read by the scheduler
+        feed['etag'] = response.headers.get('etag')
+        feed['modified'] = response.headers.get('last-modified')
+        feed['body_hash'] = body_hash
+        feed['skip_rules'] = parse_skip_rules(response.body)
+        return feed
@@ -0,0 +1,128 @@
+"""Per-feed polling schedule."""
+import re
+import json
+import time
+import threading
+import email.utils
+
+from .entries import entry_timestamp
+from .state_files import (load_state,
+                          write_atomic)
+
+SYNDICATION_PERIODS = {'hourly': 3600,
+                       'daily': 86400,
+                       'weekly': 7 * 86400,
+                       'monthly': 30 * 86400,
+                       'yearly': 365 * 86400}
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def parse_skip_rules(body):
+    """Extract the RSS <skipHours>/ <skipDays> lists from a raw feed body (feedparser keeps only their last item)."""
+    skip_hours = []
+    skip_days = []
+    match = re.search(rb"<skipHours>(.*?)</skipHours>", body, re.S | re.I)
+    if match:
+        skip_hours = [int(hour) % 24 for hour in re.findall(rb"<hour>\s*(\d+)\s*</hour>", match.group(1), re.I)]
+    match = re.search(rb"<skipDays>(.*?)</skipDays>", body, re.S | re.I)
+    if match:
+        skip_days = [day.decode().capitalize() for day in re.findall(rb"<day>\s*(\w+)\s*</day>", match.group(1), re.I)]
+    return skip_hours, skip_days
+
+class FeedScheduler:
+    """Persistent per-feed polling schedule; each feed gets its own next-due time derived from how often it
+    actually posts and from the hints published with it (ttl, sy:updatePeriod, Cache-Control, Expires, skipHours)."""
+
+    def __init__(self, schedule_file='feed_schedule.json', min_interval=15 * 60, max_interval=24 * 3600,
+                 default_interval=30 * 60, push_interval=24 * 3600):
+        self.schedule_file = schedule_file
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.push_interval = push_interval
+        self.pushed = set()  # URLs of the feeds delivered by WebSub, only polled every push_interval as a fallback
+        self._lock = threading.Lock()
+        self._feeds = self.load()
+
+    def load(self):
+        """Load the schedule from disk; a missing or corrupt file makes every feed due."""
+        return load_state(self.schedule_file)
+
+    def save(self):
+        """Atomically write the schedule to disk."""
+        with self._lock:
+            payload = json.dumps(self._feeds, indent=2)
+        write_atomic(self.schedule_file, payload)
+
+    def due_feeds(self, feeds, now=None):
+        """Return the subset of feeds ({name: url}) whose next-due time has passed."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return {name: url for name, url in feeds.items()
+                    if self._feeds.get(url, {}).get('next_due', 0) <= now}
+
+    @staticmethod
+    def observed_interval(feed):
+        """Half the median gap between the most recent entries, or None with fewer than two dated entries."""
+        timestamps = sorted((entry_timestamp(entry) for entry in feed.entries if entry_timestamp(entry)),
+                            reverse=True)[:11]
+        gaps = sorted(newer - older for newer, older in zip(timestamps, timestamps[1:]))
+        return gaps[len(gaps) // 2] / 2 if gaps else None
+
+    @staticmethod
+    def publisher_interval(feed, headers):
+        """The longest interval the publisher asks us to wait (ttl, sy:updatePeriod, Cache-Control, Expires)."""
+        hints = [0]
+        channel = feed.get('feed', {})
+        try:
+            hints.append(int(channel.get('ttl', 0)) * 60)
+        except ValueError:
+            pass
+        period = SYNDICATION_PERIODS.get(channel.get('sy_updateperiod', '').strip().lower())
+        if period:
+            try:
+                hints.append(period / max(int(channel.get('sy_updatefrequency', 1)), 1))
+            except ValueError:
+                hints.append(period)
+        cache_control = headers.get('cache-control', '')
+        match = re.search(r"max-age=(\d+)", cache_control)
+        if match and 'no-cache' not in cache_control and 'no-store' not in cache_control:
+            hints.append(int(match.group(1)))
+        elif headers.get('expires'):
+            try:
+                hints.append(email.utils.parsedate_to_datetime(headers['expires']).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+        return max(hints)
+
+    @staticmethod
+    def skip_forward(next_due, skip_hours, skip_days):
+        """Move next_due past the hours (GMT) and days the publisher asked readers to skip."""
+        for _ in range(7 * 24):
+            moment = time.gmtime(next_due)
+            if moment.tm_hour not in skip_hours and WEEKDAYS[moment.tm_wday] not in skip_days:
+                break
+            next_due = next_due - next_due % 3600 + 3600  # start of the next hour
+        return next_due
+
+    def record_success(self, url, feed, headers=None, skip_rules=None):
+        """Compute the next-due time of a successfully fetched feed."""
+        now = time.time()
+        interval = self.observed_interval(feed) or self.default_interval
+        interval = max(interval, self.publisher_interval(feed, headers or {}))
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        if url in self.pushed:
+            interval = max(interval, self.push_interval)
+        with self._lock:
+            state = self._feeds.setdefault(url, {})
+            if skip_rules is not None:
+                state['skip_hours'], state['skip_days'] = skip_rules
+            state['interval'] = interval
+            state['next_due'] = self.skip_forward(now + interval,
+                                                  state.get('skip_hours', []),
+                                                  state.get('skip_days', []))
+
+    def record_failure(self, url, retry_at=None):
+        """Retry a failed feed after the minimum interval (or at retry_at, e.g. when its circuit closes)."""
+        with self._lock:
+            state = self._feeds.setdefault(url, {})
+            state['next_due'] = retry_at or time.time() + self.min_interval
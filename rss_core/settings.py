@@ -0,0 +1,94 @@
+"""Reader settings and the feed list."""
+import os
+import json
+
+DEFAULT_FETCH_OPTIONS = {
+    "connect_timeout": 10,  # seconds
+    "read_timeout": 30,  # seconds
+    "retries": 2,  # extra attempts after the first one
+    "backoff_base": 1.0,  # seconds, doubled on every retry
+    "backoff_max": 30.0,  # seconds
+    "breaker_threshold": 5,  # failed refreshes in a row before a feed gets skipped
+    "breaker_cooldown": 3600  # seconds a failing feed is skipped for
+}
+
+DEFAULT_SCHEDULE_OPTIONS = {
+    "check_interval": 60,  # seconds between two checks for due feeds
+    "min_interval": 15 * 60,  # seconds, shortest polling interval of a feed
+    "max_interval": 24 * 3600,  # seconds, longest polling interval of a feed
+    "default_interval": 30 * 60  # seconds, used while a feed's posting frequency is unknown
+}
+
+DEFAULT_ENGINE_OPTIONS = {
+    "type": "threads",  # "threads" (thread pool + http.client) or "asyncio" (requires aiohttp, else threads)
+    "max_connections": 100,  # concurrent downloads overall (threads engine: fetch threads)
+    "max_connections_per_host": 6  # concurrent downloads from a single host
+}
+
+DEFAULT_PARSER_OPTIONS = {
+    "backend": "fast",  # "fast" (streaming parser for plain RSS 2.0/ Atom, feedparser for the rest) or "feedparser"
+    "mode": "threads",  # "threads" (parse in the fetching threads) or "processes" (pool of worker processes)
+    "workers": 0,  # processes mode: worker processes, 0 = one per CPU
+    "timeout": 30,  # seconds a single parse may take before its worker gets killed
+    "max_parses_per_worker": 200,  # parses after which a worker process is replaced
+    "memory_watermark_mb": 512  # resident memory above which a worker process is replaced
+}
+
+DEFAULT_WEBSUB_OPTIONS = {
+    "enabled": False,  # subscribe to the feeds which advertise a WebSub hub
+    "listen": "127.0.0.1:8081",  # [HOST:]PORT of the callback receiver; "0.0.0.0:PORT" to let remote hubs reach it
+    "callback_url": "",  # URL the hubs reach the receiver at (default: http://<listen>)
+    "lease_seconds": 10 * 24 * 3600,  # requested subscription lifetime
+    "fallback_interval": 24 * 3600  # seconds between the fallback polls of a pushed feed
+}
+
+def parse_address(address):
+    """[HOST:]PORT -> (host, port); the host defaults to localhost."""
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+class Settings:
+    """Reader settings from settings.json; missing keys fall back to the defaults."""
+
+    def __init__(self, settings_file='settings.json'):
+        self.settings_file = settings_file
+        self.values = self.load()
+        self.fetch = {**DEFAULT_FETCH_OPTIONS, **self.values.get("fetch", {})}
+        self.schedule = {**DEFAULT_SCHEDULE_OPTIONS, **self.values.get("schedule", {})}
+        self.engine = {**DEFAULT_ENGINE_OPTIONS, **self.values.get("engine", {})}
+        self.parser = {**DEFAULT_PARSER_OPTIONS, **self.values.get("parser", {})}
+        self.websub = {**DEFAULT_WEBSUB_OPTIONS, **self.values.get("websub", {})}
+        self.feed_overrides = self.values.get("feed_overrides", {})
+
+    def load(self):
+        """Load settings.json, writing it with the default values if it does not exist yet."""
+        if not os.path.isfile(self.settings_file):
+            with open(self.settings_file, 'w') as file_out_handle:
+                file_out_handle.write(json.dumps({"fetch": DEFAULT_FETCH_OPTIONS,
+                                                  "schedule": DEFAULT_SCHEDULE_OPTIONS,
+                                                  "engine": DEFAULT_ENGINE_OPTIONS,
+                                                  "parser": DEFAULT_PARSER_OPTIONS,
+                                                  "websub": DEFAULT_WEBSUB_OPTIONS,
+                                                  "feed_overrides": {}},
+                                                 indent=2))
+        try:
+            with open(self.settings_file, "r") as file:
+                return json.load(file)
+        except json.JSONDecodeError:
+            print(f"Error reading {self.settings_file}, using the default settings.")
+            return {}
+
+    def fetch_options(self, feed_name):
+        """Fetch options of a feed: the global ones, overridden by its entry in feed_overrides."""
+        return {**self.fetch, **self.feed_overrides.get(feed_name, {})}
+
+def boostrap_rss_feeds(rss_feeds_file='rss_feeds.json'):
+    if not os.path.isfile(rss_feeds_file):
+        with open(rss_feeds_file, 'w') as file_out_handle:
+            file_out_handle.write(json.dumps({"New On Steam": "https://store.steampowered.com/feeds/newreleases.xml"},
+                                             indent=2))
+
+def load_rss_feeds(rss_feeds_file='rss_feeds.json'):
+    """Load the {feed name: url} map; a missing or corrupt file raises FileNotFoundError/ json.JSONDecodeError."""
+    with open(rss_feeds_file, "r") as file:
+        return json.load(file)
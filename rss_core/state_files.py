@@ -0,0 +1,23 @@
+"""State files of the core (breaker, schedule, WebSub subscriptions, read state, outputs): tolerant loading, atomic
+saving."""
+import os
+import json
+
+def load_state(path):
+    """Load a JSON state file; a missing or corrupt file gives an empty state."""
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def write_atomic(path, payload, fsync=False):
+    """Write payload (text or bytes) to path through a temporary file, so readers never see a partially written file.
+    fsync=True also flushes it to the disk before the rename, so a crash cannot leave an empty file behind."""
+    tmp_file = path + '.tmp'
+    with open(tmp_file, "wb" if isinstance(payload, bytes) else "w") as file:
+        file.write(payload)
+        if fsync:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(tmp_file, path)
@@ -0,0 +1,120 @@
+"""SQLite store of the last known entries of every feed, and of the conditional GET state of their URLs."""
+import json
+import sqlite3
+import threading
+
+from .entries import (entry_key,
+                      entry_timestamp,
+                      EntryRecord)
+
+class EntryStore:
+    """SQLite database holding the last known entries of every feed, so a client can show them at startup."""
+
+    def __init__(self, db_file='entries.db'):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        # Held by whoever diffs a feed against its stored entries and passes the delta on (refreshes and WebSub
+        # pushes), so the deltas of a feed are computed and delivered in order
+        self.delta_lock = threading.Lock()
+        # The connection is shared between the client thread and the refresh thread, guarded by _lock
+        self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        # WAL with synchronous=NORMAL keeps the per-feed commits of the refreshes cheap
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        with self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    feed TEXT NOT NULL,
+                    key TEXT NOT NULL,  -- entry_key of the entry, the id being derived from it
+                    title TEXT,
+                    link TEXT,
+                    published INTEGER NOT NULL,
+                    dated INTEGER NOT NULL,  -- 0 if published is the first fetch time of an undated entry
+                    preview TEXT,
+                    fingerprint INTEGER
+                )""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS entries_feed ON entries (feed)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS entries_published ON entries (published DESC)")
+            # Rows of the FeedCache: validators, body hash and channel hints (a JSON object) of every feed URL
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS feed_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    modified TEXT,
+                    body_hash TEXT,
+                    channel TEXT NOT NULL
+                )""")
+
+    def apply_delta(self, feed_name, records, vanished_ids, entries):
+        """Write the new/ updated records of feed_name (entries maps their ids to their parsed entries) and delete its
+        vanished entries; unchanged entries are not touched."""
+        with self._lock, self.connection:
+            self.connection.executemany("DELETE FROM entries WHERE id = ?", [(stale_id,) for stale_id in vanished_ids])
+            self.connection.executemany("""
+                INSERT INTO entries (id, feed, key, title, link, published, dated, preview, fingerprint)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    feed = excluded.feed,
+                    key = excluded.key,
+                    title = excluded.title,
+                    link = excluded.link,
+                    published = excluded.published,
+                    dated = excluded.dated,
+                    preview = excluded.preview,
+                    fingerprint = excluded.fingerprint""",
+                                        [(record.id, feed_name, entry_key(entries[record.id]), record.title,
+                                          record.link, record.epoch, bool(entry_timestamp(entries[record.id])),
+                                          record.preview, record.fingerprint()) for record in records])
+
+    def load_entries(self, feed_names, limit=None):
+        """Return the stored records of the given feeds, newest first (only the newest limit ones); their read flag is
+        set from the read state by the caller."""
+        feed_names = list(feed_names)
+        with self._lock:
+            rows = self.connection.execute(f"""
+                SELECT id, feed, title, link, published, preview FROM entries
+                WHERE feed IN ({', '.join('?' * len(feed_names))})
+                ORDER BY published DESC, id DESC
+                LIMIT ?""", (*feed_names, -1 if limit is None else limit)).fetchall()
+        return [EntryRecord(stored_id, feed, title or "", link or "", published, preview or "")
+                for stored_id, feed, title, link, published, preview in rows]
+
+    def feed_entries(self, feed_name):
+        """Return (key, title, link, epoch, dated, preview) of the stored entries of feed_name, newest first."""
+        with self._lock:
+            return self.connection.execute("""
+                SELECT key, title, link, published, dated, preview FROM entries
+                WHERE feed = ?
+                ORDER BY published DESC, id DESC""", (feed_name,)).fetchall()
+
+    def stored_state(self, feed_name):
+        """Return {id: (epoch, fingerprint)} of the stored entries of feed_name."""
+        with self._lock:
+            return {stored_id: (published, fingerprint) for stored_id, published, fingerprint in
+                    self.connection.execute("SELECT id, published, fingerprint FROM entries WHERE feed = ?",
+                                            (feed_name,))}
+
+    def ids_with_titles(self, titles):
+        """Return (id, title) of the stored entries with one of the given titles."""
+        with self._lock:
+            # One query, whatever the number of titles: they are passed as a JSON array
+            return self.connection.execute("""
+                SELECT id, title FROM entries
+                WHERE title IN (SELECT value FROM json_each(?))""", (json.dumps(list(titles)),)).fetchall()
+
+    def load_feed_cache(self):
+        """Return the FeedCache rows: {url: {'etag', 'modified', 'body_hash', 'channel'}}."""
+        with self._lock:
+            rows = self.connection.execute("SELECT url, etag, modified, body_hash, channel FROM feed_cache").fetchall()
+        return {url: {'etag': etag, 'modified': modified, 'body_hash': body_hash, 'channel': json.loads(channel)}
+                for url, etag, modified, body_hash, channel in rows}
+
+    def save_feed_cache(self, feeds):
+        """Write the FeedCache rows of the given {url: {'etag', 'modified', 'body_hash', 'channel'}} feeds."""
+        with self._lock, self.connection:
+            self.connection.executemany("""
+                INSERT OR REPLACE INTO feed_cache (url, etag, modified, body_hash, channel)
+                VALUES (?, ?, ?, ?, ?)""",
+                                        [(url, cached['etag'], cached['modified'], cached['body_hash'],
+                                          json.dumps(cached['channel'])) for url, cached in feeds.items()])
@@ -0,0 +1,254 @@
+"""Feed downloads: the blocking http.client transport with its shared fetch thread pool, and the asyncio/ aiohttp
+engine."""
+import ssl
+import time
+import zlib
+import random
+import socket
+import asyncio
+import threading
+import http.client
+import urllib.parse
+import feedparser
+from collections import deque
+from concurrent.futures import (Future,
+                                ThreadPoolExecutor)
+
+class HttpResponse:
+    """Status, headers (lower-cased names) and decoded body of a downloaded feed."""
+
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+class RetryableHttpError(Exception):
+    """HTTP status worth retrying (5xx, 429)."""
+
+def add_timing(timings, phase, seconds):
+    """Accumulate a phase duration (redirects and retries add up) if timings are being collected."""
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0) + seconds
+
+def open_socket(parts, connect_timeout, timings=None):
+    """Resolve, connect and (for https) TLS-handshake separately, so each phase can be timed."""
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    started = time.perf_counter()
+    addresses = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    add_timing(timings, 'dns', time.perf_counter() - started)
+
+    started = time.perf_counter()
+    last_error = None
+    for family, socket_type, protocol, _, address in addresses:
+        sock = socket.socket(family, socket_type, protocol)
+        sock.settimeout(connect_timeout)
+        try:
+            sock.connect(address)
+            break
+        except OSError as e:
+            sock.close()
+            last_error = e
+    else:
+        raise last_error or OSError(f"Cannot connect to {parts.hostname}")
+    add_timing(timings, 'connect', time.perf_counter() - started)
+
+    if parts.scheme == 'https':
+        started = time.perf_counter()
+        sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+        add_timing(timings, 'tls', time.perf_counter() - started)
+    return sock
+
+def http_get(url, headers=None, connect_timeout=10, read_timeout=30, max_redirects=5, timings=None):
+    """Download url with separate connect and read timeouts, following redirects and decoding gzip/ deflate.
+    If a timings dict is given, the dns/ connect/ tls/ ttfb/ download durations and the wire bytes are added to it."""
+    request_headers = {'User-Agent': feedparser.USER_AGENT,
+                       'Accept-Encoding': 'gzip, deflate'}
+    request_headers.update(headers or {})
+
+    for _ in range(max_redirects + 1):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme == 'https':
+            connection = http.client.HTTPSConnection(parts.hostname, parts.port)
+        elif parts.scheme == 'http':
+            connection = http.client.HTTPConnection(parts.hostname, parts.port)
+        else:
+            raise ValueError(f"Unsupported URL scheme: {url}")
+
+        try:
+            connection.sock = open_socket(parts, connect_timeout, timings)
+            connection.sock.settimeout(read_timeout)
+            path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+            started = time.perf_counter()
+            connection.request('GET', path, headers=request_headers)
+            response = connection.getresponse()
+            add_timing(timings, 'ttfb', time.perf_counter() - started)
+            started = time.perf_counter()
+            body = response.read()
+            add_timing(timings, 'download', time.perf_counter() - started)
+            add_timing(timings, 'bytes', len(body))
+            response_headers = {name.lower(): value for name, value in response.getheaders()}
+        finally:
+            connection.close()
+
+        if response.status in (301, 302, 303, 307, 308) and 'location' in response_headers:
+            url = urllib.parse.urljoin(url, response_headers['location'])
+            continue
+
+        encoding = response_headers.get('content-encoding', '').lower()
+        if encoding == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                body = zlib.decompress(body, -zlib.MAX_WBITS)
+        return HttpResponse(url, response.status, response_headers, body)
+
+    raise http.client.HTTPException(f"Too many redirects for {url}")
+
+class FetchPool:
+    """Long-lived pool of fetch threads shared by every refresh (and any other scheduler), with a global and a
+    per-host concurrency limit. Jobs are single-feed downloads: a job waits in a FIFO queue until both a thread and
+    a slot of its host are free, so a host with many feeds never occupies threads the other hosts could use."""
+
+    def __init__(self, max_workers=100, max_workers_per_host=6):
+        self.max_workers = max_workers
+        self.max_workers_per_host = max_workers_per_host
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='FetchPool')
+        self._lock = threading.Lock()
+        self._queue = deque()  # Waiting (host, future, fn, args) jobs
+        self._running = {}  # Running jobs per host
+        self._active = 0
+
+    def submit(self, url, fn, *args):
+        """Queue fn(*args), a job fetching url, from any thread; returns a concurrent.futures.Future. Cancelling the
+        future drops the job if it has not started yet."""
+        future = Future()
+        with self._lock:
+            self._queue.append((urllib.parse.urlsplit(url).hostname, future, fn, args))
+            self._dispatch()
+        return future
+
+    def _dispatch(self):
+        """Start the oldest waiting jobs whose host has a free slot, while threads are free; called under _lock."""
+        for job in list(self._queue):
+            if self._active >= self.max_workers:
+                break
+            host = job[0]
+            if self._running.get(host, 0) >= self.max_workers_per_host:
+                continue
+            self._queue.remove(job)
+            self._active += 1
+            self._running[host] = self._running.get(host, 0) + 1
+            self.executor.submit(self._run, *job)
+
+    def _run(self, host, future, fn, args):
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._running[host] -= 1
+                if not self._running[host]:
+                    del self._running[host]
+                self._dispatch()
+
+    def close(self):
+        """Cancel the waiting jobs and stop the threads once the running ones are done."""
+        with self._lock:
+            waiting, self._queue = self._queue, deque()
+        for job in waiting:
+            job[1].cancel()
+        self.executor.shutdown(wait=True)
+
+class AsyncFetchEngine:
+    """Long-lived asyncio event loop (in its own thread) downloading feeds through one shared aiohttp connection
+    pool, with per-host keep-alive, a global and a per-host concurrency limit; no OS thread per in-flight request."""
+
+    def __init__(self, max_connections=100, max_connections_per_host=6):
+        import aiohttp  # Optional dependency, only needed when the asyncio engine is selected
+        self.aiohttp = aiohttp
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='AsyncFetchEngine', daemon=True)
+        self.thread.start()
+        self.session = self.submit(self._create_session()).result()
+
+    async def _create_session(self):
+        connector = self.aiohttp.TCPConnector(limit=self.max_connections,
+                                              limit_per_host=self.max_connections_per_host,
+                                              keepalive_timeout=60,
+                                              ttl_dns_cache=300)
+        return self.aiohttp.ClientSession(connector=connector,
+                                          headers={'User-Agent': feedparser.USER_AGENT},
+                                          trace_configs=[self._trace_config()])
+
+    def _trace_config(self):
+        """aiohttp tracing hooks adding the dns/ connect (including TLS)/ ttfb durations to the request timings."""
+        async def on_request_start(session, context, params):
+            context.started = time.perf_counter()
+            context.setup = 0
+
+        async def on_phase_start(session, context, params):
+            context.phase_started = time.perf_counter()
+
+        def on_phase_end(phase):
+            async def handler(session, context, params):
+                duration = time.perf_counter() - context.phase_started
+                context.setup += duration
+                add_timing(context.trace_request_ctx, phase, duration)
+            return handler
+
+        async def on_connection_reused(session, context, params):
+            add_timing(context.trace_request_ctx, 'reused_connections', 1)
+
+        async def on_request_end(session, context, params):
+            add_timing(context.trace_request_ctx, 'ttfb', time.perf_counter() - context.started - context.setup)
+
+        trace_config = self.aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_dns_resolvehost_start.append(on_phase_start)
+        trace_config.on_dns_resolvehost_end.append(on_phase_end('dns'))
+        trace_config.on_connection_create_start.append(on_phase_start)
+        trace_config.on_connection_create_end.append(on_phase_end('connect'))
+        trace_config.on_connection_reuseconn.append(on_connection_reused)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the engine loop from any thread; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    async def get(self, url, headers=None, connect_timeout=10, read_timeout=30, timings=None):
+        """Async counterpart of http_get; client errors are raised as ConnectionError so both engines retry alike."""
+        timeout = self.aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        try:
+            async with self.session.get(url, headers=headers, timeout=timeout, trace_request_ctx=timings) as response:
+                started = time.perf_counter()
+                body = await response.read()
+                add_timing(timings, 'download', time.perf_counter() - started)
+                add_timing(timings, 'bytes', len(body))
+                return HttpResponse(str(response.url),
+                                    response.status,
+                                    {name.lower(): value for name, value in response.headers.items()},
+                                    body)
+        except self.aiohttp.ClientError as e:
+            raise ConnectionError(str(e) or type(e).__name__) from e
+
+    def close(self):
+        """Close the connection pool and stop the event loop."""
+        self.submit(self.session.close()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+def backoff_delay(options, attempt):
+    """Full jitter: a random time up to the exponentially growing backoff."""
+    return random.uniform(0, min(options['backoff_max'], options['backoff_base'] * 2 ** attempt))
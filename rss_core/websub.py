@@ -0,0 +1,343 @@
+"""WebSub (PubSubHubbub) push subscriptions: hub discovery, the local callback receiver and a stand-in hub.
+
+Feeds advertising a hub (a rel="hub" link in the feed or in its Link header) are subscribed to with their own
+callback path and HMAC secret. The hub verifies the intent with a GET on the callback, then POSTs new content, which
+is checked against its X-Hub-Signature and handed to on_push. Pushed feeds are only polled as a fallback.
+
+LocalHub is a minimal in-process hub, for development and for testing the push path without a public hub.
+"""
+import re
+import hmac
+import json
+import time
+import secrets
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import (BaseHTTPRequestHandler,
+                         ThreadingHTTPServer)
+
+from .settings import parse_address
+from .state_files import (load_state,
+                          write_atomic)
+
+SIGNATURE_METHODS = ('sha1', 'sha256', 'sha384', 'sha512')
+MAX_DELIVERY_BYTES = 16 * 2 ** 20  # Larger deliveries are refused without reading them
+
+def parse_link_header(value):
+    """{rel: url} of an HTTP Link header (RFC 8288), e.g.
+    '<https://hub.example>; rel="hub", <https://feed>; rel=self'."""
+    links = {}
+    for match in re.finditer(r'<([^>]*)>([^<]*)', value or ''):
+        rel = re.search(r';\s*rel\s*=\s*"?([^";,]*)"?', match.group(2))
+        if rel:
+            for name in rel.group(1).split():
+                links.setdefault(name.lower(), match.group(1).strip())
+    return links
+
+def sign(secret, body, method='sha256'):
+    """X-Hub-Signature value of body."""
+    return f"{method}={hmac.new(secret.encode(), body, method).hexdigest()}"
+
+def valid_signature(secret, body, signature):
+    """Check an X-Hub-Signature header ('<method>=<hex HMAC of the body>') against the subscription secret."""
+    method, _, digest = (signature or '').partition('=')
+    if method not in SIGNATURE_METHODS or not digest:
+        return False
+    return hmac.compare_digest(sign(secret, body, method), f"{method}={digest.lower()}")
+
+def post_form(url, fields, timeout=10):
+    """POST fields form encoded to url; returns the response status (HTTP errors included)."""
+    request = urllib.request.Request(url,
+                                     data=urllib.parse.urlencode(fields).encode(),
+                                     headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                                     method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+class WebSubClient:
+    """Persistent WebSub subscriptions of the feeds, plus the callback receiver the hubs deliver to. on_push(feed_url,
+    body, headers) is called from a receiver thread for every correctly signed delivery."""
+
+    def __init__(self, subscriptions_file='websub.json', listen='127.0.0.1:8081', callback_url='',
+                 lease_seconds=10 * 24 * 3600, on_push=None):
+        self.subscriptions_file = subscriptions_file
+        self.lease_seconds = lease_seconds
+        self.on_push = on_push
+        self._lock = threading.Lock()
+        self._feeds = self.load()  # {feed url: {hub, topic, token, secret, state, requested_at, expires}}
+        host, port = parse_address(listen)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        if not callback_url:
+            if host in ('', '0.0.0.0', '::'):
+                print(f"WebSub: no callback_url set, hubs are given http://127.0.0.1:{self.httpd.server_address[1]}, "
+                      f"which only a hub on this machine can reach; set websub.callback_url to the public address")
+            callback_url = f"http://{host if host not in ('', '0.0.0.0', '::') else '127.0.0.1'}:" \
+                           f"{self.httpd.server_address[1]}"
+        self.callback_url = callback_url.rstrip('/')
+        self.thread = None
+
+    def load(self):
+        """Load the subscriptions from disk; a missing or corrupt file means no subscriptions."""
+        return load_state(self.subscriptions_file)
+
+    def save(self):
+        """Atomically write the subscriptions to disk."""
+        with self._lock:
+            payload = json.dumps(self._feeds, indent=2)
+        write_atomic(self.subscriptions_file, payload)
+
+    def callback(self, subscription):
+        return f"{self.callback_url}/websub/{subscription['token']}"
+
+    def active_feeds(self, now=None):
+        """URLs of the feeds with a verified, unexpired subscription (their content is pushed)."""
+        now = now or time.time()
+        with self._lock:
+            return {url for url, subscription in self._feeds.items()
+                    if subscription['state'] == 'verified' and subscription['expires'] > now}
+
+    def ensure_subscribed(self, feed_url, hub, topic, renew_before):
+        """Subscribe feed_url to topic at hub, unless it is subscribed for longer than renew_before seconds or a
+        request is still waiting for the hub's verification; returns True if a request was sent."""
+        now = time.time()
+        with self._lock:
+            subscription = self._feeds.get(feed_url)
+            if subscription and (subscription['hub'], subscription['topic']) == (hub, topic):
+                if subscription['state'] == 'verified' and subscription['expires'] - now > renew_before:
+                    return False
+                if subscription['state'] in ('pending', 'denied') and now - subscription['requested_at'] < renew_before:
+                    return False
+        self.subscribe(feed_url, hub, topic)
+        return True
+
+    def subscribe(self, feed_url, hub, topic, mode='subscribe'):
+        """Send a (un)subscription request to hub; the hub confirms it asynchronously by verifying the intent on the
+        callback."""
+        with self._lock:
+            subscription = self._feeds.get(feed_url)
+            if not subscription or (subscription['hub'], subscription['topic']) != (hub, topic):
+                subscription = {'hub': hub,
+                                'topic': topic,
+                                'token': secrets.token_urlsafe(16),
+                                'secret': secrets.token_hex(32),
+                                'expires': 0}
+                self._feeds[feed_url] = subscription
+            # Set before the request, as hubs may verify before replying
+            subscription.update(state='pending', mode=mode, requested_at=time.time())
+            fields = {'hub.callback': self.callback(subscription),
+                      'hub.mode': mode,
+                      'hub.topic': topic,
+                      'hub.lease_seconds': self.lease_seconds,
+                      'hub.secret': subscription['secret']}
+        try:
+            status = post_form(hub, fields)
+            if status >= 300:
+                raise OSError(f"HTTP {status}")
+        except OSError as e:
+            print(f"WebSub {mode} of {topic} at {hub} failed: {e}")
+            with self._lock:
+                subscription['state'] = 'failed'
+        self.save()
+
+    def subscription_of(self, token):
+        with self._lock:
+            for feed_url, subscription in self._feeds.items():
+                if subscription['token'] == token:
+                    return feed_url, subscription
+        return None, None
+
+    def verify_intent(self, subscription, query):
+        """Answer the hub's verification GET: the challenge if it matches the pending request, else None. Raises
+        ValueError for a malformed hub.lease_seconds."""
+        mode = query.get('hub.mode', [''])[0]
+        topic = query.get('hub.topic', [''])[0]
+        lease = int(query.get('hub.lease_seconds', [self.lease_seconds])[0])
+        with self._lock:
+            if mode == 'denied':
+                subscription['state'] = 'denied'
+                challenge = ''
+            elif mode == subscription.get('mode') and topic == subscription['topic'] and 'hub.challenge' in query:
+                if mode == 'subscribe':
+                    subscription.update(state='verified', expires=time.time() + lease)
+                else:
+                    subscription.update(state='unsubscribed', expires=0)
+                challenge = query['hub.challenge'][0]
+            else:
+                return None
+        self.save()
+        return challenge
+
+    def _handler_class(self):
+        client = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def subscription(self):
+                path = urllib.parse.urlsplit(self.path).path
+                if not path.startswith('/websub/'):
+                    return None, None
+                return client.subscription_of(path[len('/websub/'):])
+
+            def do_GET(self):
+                _, subscription = self.subscription()
+                challenge = None
+                if subscription is not None:
+                    try:
+                        challenge = client.verify_intent(subscription,
+                                                         urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query))
+                    except ValueError:
+                        return self.reply(400)
+                if challenge is None:
+                    return self.reply(404)
+                self.reply(200, challenge.encode())
+
+            def do_POST(self):
+                # The body is only read for a verified subscription, and only up to MAX_DELIVERY_BYTES; the connection
+                # is closed whenever a body is left unread
+                feed_url, subscription = self.subscription()
+                if subscription is None or subscription['state'] != 'verified':
+                    self.close_connection = True
+                    return self.reply(410)  # Gone: tells the hub to drop the subscription
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_DELIVERY_BYTES:
+                    self.close_connection = True
+                    return self.reply(413 if length > MAX_DELIVERY_BYTES else 400)
+                body = self.rfile.read(length)
+                # Deliveries with a wrong signature are acknowledged but ignored, as the spec requires
+                self.reply(202)
+                if valid_signature(subscription['secret'], body, self.headers.get('X-Hub-Signature')):
+                    if client.on_push is not None:
+                        headers = {name.lower(): value for name, value in self.headers.items()}
+                        try:
+                            client.on_push(feed_url, body, headers)
+                        except Exception as e:
+                            print(f"Failed to ingest the WebSub delivery of {feed_url}: {e}")
+                else:
+                    print(f"Ignored a WebSub delivery of {feed_url} with an invalid signature")
+
+            def reply(self, status, body=b''):
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='WebSubReceiver', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class LocalHub:
+    """Minimal stand-in WebSub hub for development and tests: accepts (un)subscription requests, verifies the intent
+    on the subscriber's callback, and publish() delivers content to the verified subscribers, signed."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.subscriptions = {}  # {(topic, callback): {secret, expires}}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def verify(self, fields):
+        """Verify a request's intent on its callback and apply it if the callback echoes the challenge."""
+        challenge = secrets.token_urlsafe(16)
+        query = {'hub.mode': fields['hub.mode'],
+                 'hub.topic': fields['hub.topic'],
+                 'hub.challenge': challenge,
+                 'hub.lease_seconds': fields.get('hub.lease_seconds', 86400)}
+        separator = '&' if '?' in fields['hub.callback'] else '?'
+        try:
+            with urllib.request.urlopen(fields['hub.callback'] + separator + urllib.parse.urlencode(query),
+                                        timeout=10) as response:
+                confirmed = response.status == 200 and response.read().decode() == challenge
+        except OSError:
+            confirmed = False
+        if not confirmed:
+            return
+        key = (fields['hub.topic'], fields['hub.callback'])
+        with self._lock:
+            if fields['hub.mode'] == 'subscribe':
+                self.subscriptions[key] = {'secret': fields.get('hub.secret'),
+                                           'expires': time.time() + int(query['hub.lease_seconds'])}
+            else:
+                self.subscriptions.pop(key, None)
+
+    def publish(self, topic, body, content_type='application/atom+xml'):
+        """Deliver body to every verified subscriber of topic; returns the number of accepted deliveries."""
+        with self._lock:
+            subscribers = [(callback, subscription) for (subscribed_topic, callback), subscription
+                           in self.subscriptions.items() if subscribed_topic == topic]
+        delivered = 0
+        for callback, subscription in subscribers:
+            headers = {'Content-Type': content_type,
+                       'Link': f'<{self.url}>; rel="hub", <{topic}>; rel="self"'}
+            if subscription['secret']:
+                headers['X-Hub-Signature'] = sign(subscription['secret'], body)
+            request = urllib.request.Request(callback, data=body, headers=headers, method='POST')
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    delivered += 200 <= response.status < 300
+            except urllib.error.HTTPError as e:
+                if e.code == 410:
+                    with self._lock:
+                        self.subscriptions.pop((topic, callback), None)
+            except OSError:
+                pass
+        return delivered
+
+    def _handler_class(self):
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                fields = {name: values[0] for name, values in urllib.parse.parse_qs(body.decode()).items()}
+                if fields.get('hub.mode') not in ('subscribe', 'unsubscribe') or not fields.get('hub.callback') \
+                        or not fields.get('hub.topic'):
+                    return self.reply(400)
+                self.reply(202)
+                hub.verify(fields)  # After replying: the intent is verified asynchronously
+
+            def reply(self, status):
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='LocalHub', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,86 @@
+"""TimelineSnapshot paging and ETags, and the generations of TimelineServer.publish."""
+import json
+import unittest
+
+from rss_core.api import (TimelineServer,
+                          TimelineSnapshot,
+                          parse_cursor)
+from rss_core.entries import EntryRecord
+
+def records(count, feeds=('a', 'b')):
+    """count records of alternating feeds, one minute apart; record i is the i-th oldest."""
+    return [EntryRecord(index + 1, feeds[index % len(feeds)], f"title {index}", f"http://example.com/{index}",
+                        1700000000 + index * 60, f"preview {index}")
+            for index in range(count)]
+
+class TimelineSnapshotTest(unittest.TestCase):
+
+    def page(self, snapshot, **query):
+        _, _, body = snapshot.response('/timeline', {name: [str(value)] if not isinstance(value, list) else value
+                                                     for name, value in query.items()})
+        return json.loads(body)
+
+    def test_paging(self):
+        snapshot = TimelineSnapshot(1, records(7), 0)
+        first = self.page(snapshot, limit=3)
+        self.assertEqual([entry['title'] for entry in first['entries']], ['title 6', 'title 5', 'title 4'])
+        self.assertEqual(first['latest'], first['entries'][0]['cursor'])
+        second = self.page(snapshot, limit=3, before=first['next'])
+        self.assertEqual([entry['title'] for entry in second['entries']], ['title 3', 'title 2', 'title 1'])
+        last = self.page(snapshot, limit=3, before=second['next'])
+        self.assertEqual([entry['title'] for entry in last['entries']], ['title 0'])
+        self.assertIsNone(last['next'])
+
+    def test_since(self):
+        snapshot = TimelineSnapshot(1, records(5), 0)
+        cursor = self.page(snapshot, limit=3)['entries'][2]['cursor']
+        newer = self.page(snapshot, since=cursor)
+        self.assertEqual([entry['title'] for entry in newer['entries']], ['title 4', 'title 3'])
+        self.assertIsNone(newer['next'])
+
+    def test_feed_filter(self):
+        snapshot = TimelineSnapshot(1, records(6), 0)
+        page = self.page(snapshot, feed='b', limit=2)
+        self.assertEqual([entry['title'] for entry in page['entries']], ['title 5', 'title 3'])
+        page = self.page(snapshot, feed='b', limit=2, before=page['next'])
+        self.assertEqual([entry['title'] for entry in page['entries']], ['title 1'])
+        both = self.page(snapshot, feed=['a', 'b'])
+        self.assertEqual(len(both['entries']), 6)
+
+    def test_invalid_parameters(self):
+        snapshot = TimelineSnapshot(1, records(2), 0)
+        for query in ({'limit': ['many']}, {'before': ['no-cursor']}):
+            with self.subTest(query=query):
+                with self.assertRaises(ValueError):
+                    snapshot.response('/timeline', query)
+        with self.assertRaises(ValueError):
+            parse_cursor('1700000000')
+
+    def test_etag(self):
+        snapshot = TimelineSnapshot(1, records(4), 0)
+        etag, _, body = snapshot.response('/timeline', {'limit': ['2']})
+        self.assertEqual(snapshot.response('/timeline', {'limit': ['2']}), (etag, 'application/json', body))
+        self.assertNotEqual(snapshot.response('/timeline', {'limit': ['3']})[0], etag)
+        # The same entries give the same ETags in a later generation; an edited entry changes them
+        self.assertEqual(TimelineSnapshot(1, records(4), 0).response('/timeline', {'limit': ['2']})[0], etag)
+        edited = records(4)
+        edited[3].title = "edited"
+        self.assertNotEqual(TimelineSnapshot(1, edited, 0).response('/timeline', {'limit': ['2']})[0], etag)
+
+class TimelineServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TimelineServer(port=0)
+
+    def tearDown(self):
+        self.server.httpd.server_close()
+
+    def test_unchanged_timeline_keeps_its_generation(self):
+        self.assertEqual(self.server.publish(records(3)), 1)
+        etag = self.server.snapshot.response('/feeds', {})[0]
+        self.assertEqual(self.server.publish(records(3)), 1)
+        self.assertEqual(self.server.snapshot.response('/feeds', {})[0], etag)
+        self.assertEqual(self.server.publish(records(4)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""FeedEntriesModel data roles, diffing (set_entries), progressive loading and per-feed deltas (merge_delta), with an
+offscreen Qt platform."""
+import os
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtWidgets import (QApplication,
+                               QListView)
+
+from main import (FeedEntriesModel,
+                  FeedEntryDelegate,
+                  RenderScheduler)
+from rss_core.entries import (EntryRecord,
+                              FeedDelta)
+
+def record(record_id, epoch, title=None, feed='feed', read=False):
+    return EntryRecord(record_id, feed, title or f"title {record_id}", f"http://example.com/{record_id}", epoch,
+                       "preview", read)
+
+class FeedEntriesModelTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.model = FeedEntriesModel()
+        self.signals = []
+        self.model.rowsInserted.connect(lambda parent, first, last: self.signals.append(('insert', first, last)))
+        self.model.rowsRemoved.connect(lambda parent, first, last: self.signals.append(('remove', first, last)))
+        self.model.dataChanged.connect(lambda first, last, roles=(): self.signals.append(('change', first.row(),
+                                                                                           last.row())))
+        self.model.modelReset.connect(lambda: self.signals.append(('reset',)))
+
+    def titles(self):
+        return [entry.title for entry in self.model.entries]
+
+    def test_data_roles(self):
+        self.model.set_entries([record(2, 1700000000, "AT&T", read=True), record(1, 10)])
+        index = self.model.index(0)
+        self.assertEqual(index.data(), "AT&T")
+        self.assertEqual(index.data(FeedEntriesModel.TitleRole), "AT&T")
+        self.assertEqual(index.data(FeedEntriesModel.FeedNameRole), "feed")
+        self.assertEqual(index.data(FeedEntriesModel.LinkRole), "http://example.com/2")
+        self.assertEqual(index.data(FeedEntriesModel.DateRole), "2023-11-14 22:13:20")
+        self.assertEqual(index.data(FeedEntriesModel.PreviewRole), "preview<br>...")
+        self.assertTrue(index.data(FeedEntriesModel.ReadRole))
+        self.assertFalse(self.model.index(1).data(FeedEntriesModel.ReadRole))
+        self.assertIsNone(self.model.data(self.model.index(5)))
+
+    def test_read_state_changed_repaints_the_shown_rows(self):
+        self.model.set_entries([record(3, 30), record(2, 20), record(1, 10)])
+        self.signals.clear()
+        self.model.read_state_changed(1)
+        self.assertEqual(self.signals, [('change', 1, 2)])
+
+    def test_set_entries_diffs_by_id(self):
+        self.model.set_entries([record(3, 30), record(2, 20), record(1, 10)])
+        self.assertEqual(self.signals, [('insert', 0, 2)])
+        self.signals.clear()
+
+        self.model.set_entries([record(5, 50), record(4, 40), record(3, 30, "edited"), record(1, 10), record(1, 10)])
+        self.assertEqual(self.titles(), ['title 5', 'title 4', 'edited', 'title 1'])
+        self.assertEqual(self.signals, [('remove', 1, 1), ('insert', 0, 1), ('change', 2, 2)])
+        self.assertEqual(self.model.rowCount(), 4)
+
+    def test_reordered_entries_reset_the_model(self):
+        self.model.set_entries([record(2, 20), record(1, 10)])
+        self.signals.clear()
+        self.model.set_entries([record(1, 30), record(2, 20)])
+        self.assertEqual(self.signals, [('reset',)])
+        self.assertEqual(self.titles(), ['title 1', 'title 2'])
+
+    def test_progressive_first_load(self):
+        self.model.set_entries([record(3, 30), record(2, 20), record(1, 10)], progressive=True)
+        self.assertEqual(self.model.rowCount(), 0)
+        self.assertEqual(self.model.show_more(2), (0, 1))
+        self.assertEqual(self.model.rowCount(), 2)
+        # Rows inserted below the shown ones are not announced to the view
+        self.model.set_entries([record(3, 30), record(2, 20), record(1, 10), record(0, 5)], progressive=True)
+        self.assertEqual(self.model.rowCount(), 2)
+        self.assertEqual(self.model.show_more(10), (2, 3))
+        self.assertIsNone(self.model.shown_rows)
+
+    def test_render_scheduler_loads_in_batches(self):
+        view = QListView()
+        view.setModel(self.model)
+        view.setItemDelegate(FeedEntryDelegate(view))
+        scheduler = RenderScheduler(self.model, view)
+        scheduler.max_batch = 10
+        summaries = []
+        scheduler.render_finished.connect(summaries.append)
+        scheduler.set_entries([record(index, index) for index in range(35, 0, -1)])
+        self.assertTrue(scheduler.is_rendering())
+        while scheduler.is_rendering():
+            self.app.processEvents()
+        self.assertEqual(self.model.rowCount(), 35)
+        self.assertEqual(summaries[0]['entries'], 35)
+        self.assertGreaterEqual(summaries[0]['batches'], 4)
+
+    def test_merge_delta(self):
+        self.model.set_entries([record(4, 40), record(3, 30, read=True), record(2, 20), record(1, 10)])
+        self.signals.clear()
+        delta = FeedDelta('feed',
+                          [record(6, 60), record(5, 25), record(3, 30, "edited", read=True), record(2, 35)],
+                          [(30, 3), (20, 2), (10, 1)])
+        # Two new unread rows, minus the vanished unread one; the edited and the moved rows keep their state
+        self.assertEqual(self.model.merge_delta(delta), 1)
+        self.assertEqual(self.titles(), ['title 6', 'title 4', 'title 2', 'edited', 'title 5'])
+        self.assertEqual([entry.epoch for entry in self.model.entries], [60, 40, 35, 30, 25])
+        self.assertIn(('change', 1, 1), self.signals)
+        self.assertNotIn(('reset',), self.signals)
+
+    def test_merge_delta_skips_rows_not_displayed(self):
+        self.model.set_entries([record(2, 20)])
+        delta = FeedDelta('feed', [record(3, 30)], [(10, 1)])
+        self.assertEqual(self.model.merge_delta(delta), 1)
+        self.assertEqual(self.titles(), ['title 3', 'title 2'])
+
+if __name__ == '__main__':
+    unittest.main()
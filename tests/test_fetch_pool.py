@@ -0,0 +1,83 @@
+"""FetchPool: the global and per-host limits on concurrent jobs."""
+import time
+import threading
+import unittest
+from concurrent.futures import (CancelledError,
+                                wait)
+
+from rss_core.transport import FetchPool
+
+class FetchPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self._lock = threading.Lock()
+        self.running = {}
+        self.peaks = {}
+        self.peak = 0
+        self.started = []
+
+    def pool(self, max_workers, max_workers_per_host):
+        pool = FetchPool(max_workers, max_workers_per_host)
+        self.addCleanup(pool.close)
+        return pool
+
+    def job(self, host, seconds=0.02):
+        """Record how many jobs run at once, overall and per host."""
+        with self._lock:
+            self.started.append(host)
+            self.running[host] = self.running.get(host, 0) + 1
+            self.peaks[host] = max(self.peaks.get(host, 0), self.running[host])
+            self.peak = max(self.peak, sum(self.running.values()))
+        time.sleep(seconds)
+        with self._lock:
+            self.running[host] -= 1
+        return host
+
+    def submit(self, pool, host, seconds=0.02):
+        return pool.submit(f'http://{host}/feed', self.job, host, seconds)
+
+    def test_per_host_limit(self):
+        pool = self.pool(10, 2)
+        futures = [self.submit(pool, 'a.example.com') for _ in range(8)] + \
+                  [self.submit(pool, 'b.example.com') for _ in range(4)]
+        wait(futures)
+        self.assertEqual([future.result() for future in futures], ['a.example.com'] * 8 + ['b.example.com'] * 4)
+        self.assertEqual(self.peaks, {'a.example.com': 2, 'b.example.com': 2})
+        self.assertEqual(self.peak, 4)
+
+    def test_global_limit(self):
+        pool = self.pool(3, 6)
+        wait([self.submit(pool, f'{index % 5}.example.com') for index in range(15)])
+        self.assertEqual(self.peak, 3)
+
+    def test_busy_host_does_not_hold_up_the_others(self):
+        pool = self.pool(4, 1)
+        futures = [self.submit(pool, 'slow.example.com', 0.2) for _ in range(3)]
+        fast = self.submit(pool, 'fast.example.com')
+        fast.result(timeout=5)
+        self.assertEqual(self.started, ['slow.example.com', 'fast.example.com'])
+        wait(futures)
+
+    def test_cancel_and_errors(self):
+        pool = self.pool(1, 1)
+        first = self.submit(pool, 'a.example.com', 0.1)
+        queued = self.submit(pool, 'a.example.com')
+        self.assertTrue(queued.cancel())
+        failing = pool.submit('http://a.example.com/feed', int, 'not a number')
+        first.result(timeout=5)
+        with self.assertRaises(ValueError):
+            failing.result(timeout=5)
+        with self.assertRaises(CancelledError):
+            queued.result()
+        self.assertEqual(self.started, ['a.example.com'])
+
+    def test_close_cancels_the_waiting_jobs(self):
+        pool = FetchPool(1, 1)
+        running = self.submit(pool, 'a.example.com', 0.1)
+        waiting = self.submit(pool, 'b.example.com')
+        pool.close()
+        self.assertEqual(running.result(), 'a.example.com')
+        self.assertTrue(waiting.cancelled())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""FeedHealth: the per-feed circuit breaker and its persistence."""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from rss_core.health import FeedHealth
+
+URL = 'http://example.com/feed'
+
+class FeedHealthTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.health_file = os.path.join(self.directory, 'feed_health.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_opens_after_threshold_failures(self):
+        health = FeedHealth(self.health_file, threshold=3, cooldown=600)
+        with mock.patch('rss_core.health.time.time', return_value=1000):
+            health.record_failure(URL)
+            health.record_failure(URL)
+            self.assertIsNone(health.open_until(URL))
+            health.record_failure(URL)
+            self.assertEqual(health.open_until(URL), 1600)
+            self.assertIsNone(health.open_until('http://example.com/other'))
+        with mock.patch('rss_core.health.time.time', return_value=1600):
+            self.assertIsNone(health.open_until(URL))  # Cooled down: the next fetch is a trial
+
+    def test_success_closes_the_circuit(self):
+        health = FeedHealth(self.health_file, threshold=2, cooldown=600)
+        health.record_failure(URL)
+        health.record_success(URL)
+        health.record_failure(URL)
+        self.assertIsNone(health.open_until(URL))
+        health.record_failure(URL)
+        self.assertIsNotNone(health.open_until(URL))
+        health.record_success(URL)
+        self.assertIsNone(health.open_until(URL))
+
+    def test_state_is_persisted(self):
+        health = FeedHealth(self.health_file, threshold=1, cooldown=600)
+        health.record_failure(URL)
+        health.save()
+        self.assertIsNotNone(FeedHealth(self.health_file).open_until(URL))
+
+    def test_corrupt_file_closes_every_circuit(self):
+        with open(self.health_file, 'w') as file:
+            file.write('{"http://example.com/feed": {"failures"')
+        self.assertIsNone(FeedHealth(self.health_file).open_until(URL))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""AggregatedFeed: the Atom and JSON Feed outputs of the timeline and their incremental updates."""
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from rss_core.output import AggregatedFeed
+from rss_core.entries import EntryRecord
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+def record(record_id, epoch, title=None, feed='feed'):
+    return EntryRecord(record_id, feed, title or f"title {record_id}", f"http://example.com/{record_id}?a=1&b=2",
+                       epoch, "<p>preview</p>")
+
+class AggregatedFeedTest(unittest.TestCase):
+
+    def test_atom(self):
+        output = AggregatedFeed(window=2, title="Mine & yours")
+        output.update([record(1, 1700000000), record(2, 1700000060, "AT&T <b>"), record(3, 1699999940)])
+        document = ElementTree.fromstring(output.atom())
+        self.assertEqual(document.find(f'{ATOM}title').text, "Mine & yours")
+        self.assertEqual(document.find(f'{ATOM}updated').text, '2023-11-14T22:14:20Z')
+        entries = document.findall(f'{ATOM}entry')
+        self.assertEqual([entry.find(f'{ATOM}title').text for entry in entries], ["AT&T <b>", "title 1"])
+        self.assertEqual(entries[0].find(f'{ATOM}id').text, 'urn:entry:2')
+        self.assertEqual(entries[0].find(f'{ATOM}link').get('href'), 'http://example.com/2?a=1&b=2')
+        self.assertEqual(entries[0].find(f'{ATOM}author/{ATOM}name').text, 'feed')
+        self.assertEqual(entries[0].find(f'{ATOM}summary').text, '<p>preview</p>')
+
+    def test_json_feed(self):
+        output = AggregatedFeed(window=2)
+        self.assertEqual(json.loads(output.json_feed())['items'], [])
+        output.update([record(1, 1700000000), record(2, 1700000060, 'quote " title')])
+        document = json.loads(output.json_feed())
+        self.assertEqual(document['version'], 'https://jsonfeed.org/version/1.1')
+        self.assertEqual(document['items'][0], {'id': '2',
+                                                'url': 'http://example.com/2?a=1&b=2',
+                                                'title': 'quote " title',
+                                                'content_html': '<p>preview</p>',
+                                                'date_published': '2023-11-14T22:14:20Z',
+                                                'authors': [{'name': 'feed'}]})
+        self.assertEqual(len(document['items']), 2)
+
+    def test_only_new_and_edited_entries_are_serialized(self):
+        output = AggregatedFeed(window=3)
+        entries = [record(3, 30), record(2, 20), record(1, 10)]
+        self.assertTrue(output.update(entries))
+        self.assertEqual(output.serialized, 3)
+        self.assertFalse(output.update(entries))
+        self.assertEqual(output.serialized, 3)
+
+        # One new entry pushes the oldest out of the window; one edited entry is serialized again
+        self.assertTrue(output.update([record(4, 40), record(3, 30), record(2, 20, "edited"), record(1, 10)]))
+        self.assertEqual(output.serialized, 5)
+        titles = [item['title'] for item in json.loads(output.json_feed())['items']]
+        self.assertEqual(titles, ['title 4', 'title 3', 'edited'])
+
+        # Entries gone from the timeline leave the window
+        self.assertTrue(output.update([record(4, 40), record(2, 20, "edited")]))
+        self.assertEqual(output.serialized, 5)
+        self.assertEqual(len(output.atom_fragments), 2)
+
+    def test_write(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        output = AggregatedFeed()
+        output.update([record(1, 1700000000)])
+        output.write(directory)
+        self.assertEqual(sorted(os.listdir(directory)), ['aggregated.atom', 'aggregated.json'])
+        with open(os.path.join(directory, 'aggregated.atom'), 'rb') as file:
+            self.assertEqual(file.read(), output.atom())
+        with open(os.path.join(directory, 'aggregated.json'), 'rb') as file:
+            self.assertEqual(file.read(), output.json_feed())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""ParsePool: parsing in worker processes, the per-parse timeout and the recycling of the workers."""
+import time
+import unittest
+
+from rss_core.parsing import (ParsePool,
+                              ParseTimeoutError)
+
+URL = 'http://example.com/feed'
+HEADERS = {'content-type': 'application/rss+xml'}
+
+def rss(count):
+    return ('<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel><title>c</title>'
+            + ''.join(f'<item><title>item {index}</title><guid>g-{index}</guid>'
+                      f'<description>{"text " * 50}</description></item>' for index in range(count))
+            + '</channel></rss>').encode()
+
+class ParsePoolTest(unittest.TestCase):
+
+    def pool(self, **options):
+        pool = ParsePool(**options)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_parse(self):
+        pool = self.pool(workers=2)
+        result = pool.parse(rss(3), HEADERS, URL, 'fast')
+        self.assertEqual([entry['title'] for entry in result.entries], ['item 0', 'item 1', 'item 2'])
+        self.assertEqual(result.parser, 'fast')
+        self.assertEqual(pool.recycled, 0)
+
+    def test_timeout_replaces_the_worker(self):
+        pool = self.pool(workers=1, timeout=0.01)
+        started = time.monotonic()
+        with self.assertRaises(ParseTimeoutError):
+            pool.parse(rss(5000), HEADERS, URL, 'feedparser')
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(pool.recycled, 1)
+        # The replacement worker takes the next parse
+        pool.timeout = 30
+        self.assertEqual(len(pool.parse(rss(2), HEADERS, URL).entries), 2)
+
+    def test_workers_are_recycled_after_max_parses(self):
+        pool = self.pool(workers=1, max_parses_per_worker=2)
+        for expected in (0, 1, 1, 2):
+            pool.parse(rss(1), HEADERS, URL)
+            self.assertEqual(pool.recycled, expected)
+
+    def test_workers_are_recycled_above_the_memory_watermark(self):
+        pool = self.pool(workers=1, memory_watermark_mb=0)
+        pool.parse(rss(1), HEADERS, URL)
+        pool.parse(rss(1), HEADERS, URL)
+        self.assertEqual(pool.recycled, 2)
+
+    def test_closed_pool(self):
+        pool = self.pool(workers=1)
+        pool.close()
+        with self.assertRaises(ValueError):
+            pool.parse(rss(1), HEADERS, URL)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""The fast parser against feedparser: same entries, early stop at known entries, fallback for what it does not
+handle."""
+import unittest
+import warnings
+from unittest import mock
+
+from rss_core import parsing
+from rss_core.parsing import (UnsupportedFeed,
+                              fast_parse,
+                              parse_body,
+                              known_entries)
+
+URL = 'http://example.com/feed'
+HEADERS = {'content-type': 'application/rss+xml'}
+
+def rss(*items):
+    return ('<?xml version="1.0" encoding="utf-8"?>'
+            '<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/" '
+            'xmlns:content="http://purl.org/rss/1.0/modules/content/">'
+            '<channel><title>c</title><link>http://example.com/</link><ttl>30</ttl>'
+            + ''.join(f'<item>{item}</item>' for item in items) + '</channel></rss>').encode()
+
+def atom(*entries):
+    return ('<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom"><title>c</title>'
+            '<id>urn:feed</id><link rel="hub" href="http://hub.example.com/"/>'
+            + ''.join(f'<entry>{entry}</entry>' for entry in entries) + '</feed>').encode()
+
+def item(index, title=None, description='d'):
+    return (f'<title>{title or f"item {index}"}</title><link>/{index}</link><guid>g-{index}</guid>'
+            f'<description>{description}</description>'
+            f'<pubDate>Tue, 14 Nov 2023 {10 + index:02}:00:00 +0000</pubDate>')
+
+def entries(result):
+    return [dict(entry) for entry in result.entries]
+
+class FastParseTest(unittest.TestCase):
+
+    def setUp(self):
+        # Catches reads through feedparser's deprecated updated -> published fallback
+        self.enterContext(warnings.catch_warnings())
+        warnings.simplefilter('error', DeprecationWarning)
+
+    def assertSameAsFeedparser(self, body, headers=HEADERS):
+        fast = fast_parse(body, URL, headers=headers)
+        slow = parse_body(body, headers, URL, 'feedparser')
+        self.assertEqual(entries(fast), entries(slow))
+        self.assertEqual(dict(fast.feed), dict(slow.feed))
+        self.assertEqual(fast.bozo, slow.bozo)
+        return fast
+
+    def test_rss_fields(self):
+        result = self.assertSameAsFeedparser(rss(
+            item(2), item(1),
+            '<title>permalink</title><guid>/p</guid><dc:date>2023-11-14T09:00:00Z</dc:date>'
+            '<content:encoded>&lt;p&gt;full&lt;/p&gt;</content:encoded>',
+            '<guid isPermaLink="false">g</guid><link>/q?a=1&amp;b=2</link>'))
+        self.assertEqual(result.parser, 'fast')
+        self.assertEqual(result.feed, {'ttl': '30'})
+        self.assertEqual(result.entries[2]['link'], 'http://example.com/p')
+
+    def test_rss_title_text(self):
+        for title in ('AT&amp;T', '&lt;b&gt;x&lt;/b&gt; AT&amp;T', '<![CDATA[AT&T <i>x</i>]]>', '<![CDATA[x<br>y]]>',
+                      'a &lt; b', '&#169; 2024', '<![CDATA[<a href="/r">l</a>]]>', 'café', '\u0093q\u0094'):
+            with self.subTest(title=title):
+                self.assertSameAsFeedparser(rss(item(1, title=title, description=title)))
+
+    def test_sanitized_summary(self):
+        result = self.assertSameAsFeedparser(rss(item(1, description='&lt;script&gt;x&lt;/script&gt;'
+                                                                     '&lt;p onclick="y"&gt;z&lt;/p&gt;')))
+        self.assertEqual(result.entries[0]['summary'], '<p>z</p>')
+
+    def test_atom_fields(self):
+        for title_type in ('', ' type="text"', ' type="html"'):
+            with self.subTest(title_type=title_type):
+                self.assertSameAsFeedparser(atom(
+                    f'<id>urn:1</id><title{title_type}>A &amp;lt;b&amp;gt; &lt;i&gt;x&lt;/i&gt;</title>'
+                    '<updated>2023-11-14T20:13:20Z</updated><summary>s</summary>',
+                    '<id>/2</id><link href="a"/><link href="b"/><link rel="enclosure" href="e"/>'
+                    '<published>2023-11-14T20:13:20+02:00</published>'
+                    '<content type="html">&lt;p&gt;c&lt;/p&gt;</content>',
+                    '<id>urn:3</id><title>no link</title>'), headers={'content-type': 'application/atom+xml'})
+
+    def test_encoding(self):
+        body = rss(item(1, title='café')).replace(b'encoding="utf-8"', b'encoding="iso-8859-1"')
+        for headers in ({}, HEADERS, {'content-type': 'text/xml'}, {'content-type': 'text/xml; charset=utf-8'}):
+            with self.subTest(headers=headers):
+                self.assertSameAsFeedparser(body, headers)
+
+    def test_unsupported(self):
+        for body in (b'<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"/>',
+                     b'<rss><channel><item><title>&nbsp;</title></item></channel></rss>',
+                     b'<rss><channel><item>',
+                     rss('<title>a</title><title>b</title>'),
+                     rss('<dc:title>alias</dc:title>'),
+                     atom('<title type="xhtml"><div xmlns="http://www.w3.org/1999/xhtml">x</div></title>')):
+            with self.subTest(body=body):
+                with self.assertRaises(UnsupportedFeed):
+                    fast_parse(body, URL, headers=HEADERS)
+                self.assertEqual(parse_body(body, HEADERS, URL, 'fast').parser, 'feedparser')
+
+    def test_fallback_without_feedparser_internals(self):
+        body = rss(item(1))
+        with mock.patch.object(parsing, 'convert_to_utf8', None):
+            with self.assertRaises(UnsupportedFeed):
+                fast_parse(body, URL, headers=HEADERS)
+            result = parse_body(body, HEADERS, URL, 'fast')
+        self.assertEqual(result.parser, 'feedparser')
+        self.assertEqual(entries(result), entries(parse_body(body, HEADERS, URL, 'feedparser')))
+
+    def test_stop_at_known_entry(self):
+        previous = fast_parse(rss(item(3), item(2), item(1)), URL, headers=HEADERS).entries
+        result = fast_parse(rss(item(4), item(3), item(2), item(1)), URL, known_entries(previous), HEADERS)
+        self.assertTrue(result.truncated)
+        self.assertEqual([entry['title'] for entry in result.entries], ['item 4'])
+
+    def test_edited_entry_is_no_stop_point(self):
+        previous = fast_parse(rss(item(3), item(2), item(1)), URL, headers=HEADERS).entries
+        body = rss(item(3, title='item 3 edited'), item(2), item(1))
+        result = fast_parse(body, URL, known_entries(previous), HEADERS)
+        self.assertTrue(result.truncated)
+        self.assertEqual([entry['title'] for entry in result.entries], ['item 3 edited'])
+
+    def test_unchanged_feed_stops_at_once(self):
+        previous = fast_parse(rss(item(3), item(2), item(1)), URL, headers=HEADERS).entries
+        result = fast_parse(rss(item(3), item(2), item(1)), URL, known_entries(previous), HEADERS)
+        self.assertTrue(result.truncated)
+        self.assertEqual(result.entries, [])
+
+    def test_ascending_feed_is_parsed_in_full(self):
+        previous = fast_parse(rss(item(1), item(2)), URL, headers=HEADERS).entries
+        result = fast_parse(rss(item(1), item(2), item(3)), URL, known_entries(previous), HEADERS)
+        self.assertFalse(result.truncated)
+        self.assertEqual(len(result.entries), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""ReadStateJournal: journal replay, torn records, compaction and the migration of old title snapshots."""
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+
+from rss_core.store import EntryStore
+from rss_core.entries import EntryRecord
+from rss_core.read_state import ReadStateJournal
+
+class ReadStateJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.snapshot_file = os.path.join(self.directory, 'viewed_entries.json')
+        self.journal_file = os.path.join(self.directory, 'viewed_entries.journal')
+        self.journals = []
+
+    def tearDown(self):
+        for journal in self.journals:
+            journal.close()
+        shutil.rmtree(self.directory)
+
+    def journal(self, compact_threshold=10000, legacy_days=30):
+        # The background flush never runs on its own during a test; flush() is called explicitly
+        journal = ReadStateJournal(self.snapshot_file, self.journal_file, flush_interval=3600,
+                                   compact_threshold=compact_threshold, legacy_days=legacy_days)
+        self.journals.append(journal)
+        return journal
+
+    def snapshot(self):
+        with open(self.snapshot_file) as file:
+            return json.load(file)
+
+    def test_flush_appends_records(self):
+        journal = self.journal()
+        journal.add([1, -2, 3])
+        journal.add([3])
+        journal.flush()
+        self.assertEqual(os.path.getsize(self.journal_file), 3 * ReadStateJournal.record.size)
+        self.assertFalse(os.path.exists(self.snapshot_file))
+        self.assertEqual(self.journal().ids, {1, -2, 3})
+
+    def test_torn_record_is_dropped(self):
+        journal = self.journal()
+        journal.add([1, 2])
+        journal.flush()
+        with open(self.journal_file, 'ab') as file:
+            file.write(b'\x01\x02\x03')  # A crash in the middle of an append
+        reopened = self.journal()
+        self.assertEqual(reopened.ids, {1, 2})
+        self.assertEqual(os.path.getsize(self.journal_file), 2 * ReadStateJournal.record.size)
+        # Appends after the truncation stay aligned
+        reopened.add([3])
+        reopened.flush()
+        self.assertEqual(self.journal().ids, {1, 2, 3})
+
+    def test_compaction(self):
+        journal = self.journal(compact_threshold=3)
+        journal.add([1, 2])
+        journal.flush()
+        self.assertFalse(os.path.exists(self.snapshot_file))
+        journal.add([3])
+        journal.flush()
+        self.assertEqual(self.snapshot()['version'], 2)
+        self.assertEqual(set(self.snapshot()['ids']), {1, 2, 3})
+        self.assertEqual(os.path.getsize(self.journal_file), 0)
+        journal.add([4])
+        journal.flush()
+        self.assertEqual(self.journal().ids, {1, 2, 3, 4})
+
+    def test_legacy_titles_are_kept_until_migrated(self):
+        with open(self.snapshot_file, 'w') as file:
+            json.dump(['old title', 'gone title'], file)
+        journal = self.journal()
+        self.assertEqual(journal.ids, set())
+        self.assertEqual(journal.legacy_titles, {'old title', 'gone title'})
+        journal.flush()  # The title based snapshot is rewritten once, with the deadline of its titles
+        self.assertEqual(self.snapshot()['legacy_titles'], ['gone title', 'old title'])
+        self.assertAlmostEqual(self.snapshot()['legacy_until'], time.time() + 30 * 86400, delta=60)
+        self.assertEqual(self.journal().legacy_titles, {'old title', 'gone title'})
+
+        journal.add([7])
+        journal.migrated_titles(['old title', 'unknown title'])
+        journal.flush()
+        self.assertEqual(self.snapshot()['legacy_titles'], ['gone title'])
+        self.assertEqual(set(self.snapshot()['ids']), {7})
+        journal.migrated_titles(['gone title'])
+        journal.flush()
+        self.assertNotIn('legacy_titles', self.snapshot())
+
+    def test_legacy_titles_expire(self):
+        with open(self.snapshot_file, 'w') as file:
+            json.dump({'version': 2, 'ids': [7], 'legacy_titles': ['gone title'], 'legacy_until': time.time() - 1},
+                      file)
+        journal = self.journal()
+        self.assertEqual(journal.legacy_titles, set())
+        journal.flush()
+        self.assertEqual(self.snapshot(), {'version': 2, 'ids': [7]})
+
+    def test_pending_legacy_titles_are_not_rewritten(self):
+        with open(self.snapshot_file, 'w') as file:
+            json.dump(['gone title'], file)
+        self.journal().flush()
+        modified = os.path.getmtime(self.snapshot_file)
+        os.utime(self.snapshot_file, (modified - 10, modified - 10))
+        journal = self.journal()
+        journal.migrated_titles(['unknown title'])
+        journal.flush()
+        self.assertEqual(os.path.getmtime(self.snapshot_file), modified - 10)
+        self.assertEqual(journal.legacy_titles, {'gone title'})
+
+    def test_ids_with_titles(self):
+        store = EntryStore(os.path.join(self.directory, 'entries.db'))
+        self.addCleanup(store.connection.close)
+        store.apply_delta('feed', [EntryRecord(1, 'feed', 'old title', '', 10, ''),
+                                   EntryRecord(2, 'feed', 'other title', '', 20, '')], [],
+                          {1: {'id': 'old'}, 2: {'id': 'other'}})
+        self.assertEqual(store.ids_with_titles({'old title', 'gone title'}), [(1, 'old title')])
+        self.assertEqual(store.ids_with_titles(set()), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""FeedRefresher.feed_delta: consecutive parses of a feed classified against the stored entries; parse_response:
+the reuse of the stored entries for unchanged bodies and 304 Not Modified."""
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import feedparser
+
+from rss_core.cache import FeedCache
+from rss_core.store import EntryStore
+from rss_core.entries import entry_id
+from rss_core.refresh import FeedRefresher
+from rss_core.settings import Settings
+from rss_core.transport import HttpResponse
+
+URL = 'http://example.com/feed'
+
+def rss(*titles):
+    return ('<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel><title>c</title><ttl>60</ttl>'
+            + ''.join(f'<item><title>{title}</title><guid>{title}</guid>'
+                      f'<pubDate>Tue, 14 Nov 2023 {10 + index:02}:00:00 +0000</pubDate></item>'
+                      for index, title in enumerate(reversed(titles)))
+            + '</channel></rss>').encode()
+
+class FeedDeltaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = self.open_store()
+
+    def tearDown(self):
+        self.store.connection.close()
+        shutil.rmtree(self.directory)
+
+    def open_store(self):
+        return EntryStore(os.path.join(self.directory, 'entries.db'))
+
+    def delta(self, entries):
+        refresher = FeedRefresher({'feed': URL}, FeedCache(self.store), self.store, None, None, None)
+        return refresher.feed_delta('feed', feedparser.FeedParserDict(entries=entries))
+
+    def test_new_unchanged_updated_vanished(self):
+        first = [{'id': 'a', 'title': 'A', 'link': 'http://example.com/a', 'summary': 's',
+                  'published_parsed': time.gmtime(300)},
+                 {'id': 'b', 'title': 'B', 'link': 'http://example.com/b', 'summary': 's',
+                  'published_parsed': time.gmtime(200)},
+                 {'id': 'c', 'title': 'C', 'link': 'http://example.com/c', 'summary': 's',
+                  'published_parsed': time.gmtime(100)}]
+        delta = self.delta(first)
+        self.assertEqual((delta.new, delta.updated, delta.unchanged, delta.vanished), (3, 0, 0, 0))
+        self.assertEqual([record.title for record in delta.records], ['A', 'B', 'C'])
+        self.assertEqual(delta.removed, [])
+
+        delta = self.delta(first)
+        self.assertEqual((delta.new, delta.updated, delta.unchanged, delta.vanished), (0, 0, 3, 0))
+        self.assertFalse(delta)
+
+        second = [{'id': 'd', 'title': 'D', 'link': 'http://example.com/d', 'summary': 's',
+                   'published_parsed': time.gmtime(400)},
+                  {'id': 'a', 'title': 'A', 'link': 'http://example.com/a', 'summary': 's',
+                   'published_parsed': time.gmtime(300)},
+                  {'id': 'b', 'title': 'B edited', 'link': 'http://example.com/b', 'summary': 's',
+                   'published_parsed': time.gmtime(200)}]
+        delta = self.delta(second)
+        self.assertEqual((delta.new, delta.updated, delta.unchanged, delta.vanished), (1, 1, 1, 1))
+        self.assertEqual([record.title for record in delta.records], ['D', 'B edited'])
+        self.assertEqual(sorted(delta.removed), [(100, entry_id(URL, {'id': 'c'})), (200, entry_id(URL, {'id': 'b'}))])
+        self.assertEqual([record.title for record in self.store.load_entries(['feed'])], ['D', 'A', 'B edited'])
+
+    def test_fingerprint_detects_updates_across_runs(self):
+        entries = [{'id': 'a', 'title': 'A', 'link': 'http://example.com/a', 'summary': 'first',
+                    'published_parsed': time.gmtime(100)}]
+        self.delta(entries)
+        self.store.connection.close()
+        self.store = self.open_store()
+        delta = self.delta(entries)
+        self.assertEqual((delta.new, delta.updated, delta.unchanged), (0, 0, 1))
+
+        # Only the displayed fields count: a new update time alone changes nothing
+        delta = self.delta([{**entries[0], 'updated_parsed': time.gmtime(500)}])
+        self.assertEqual((delta.new, delta.updated, delta.unchanged), (0, 0, 1))
+        delta = self.delta([{**entries[0], 'summary': 'second'}])
+        self.assertEqual((delta.new, delta.updated, delta.unchanged), (0, 1, 0))
+        self.assertEqual(delta.records[0].preview, 'second')
+        delta = self.delta([{**entries[0], 'summary': 'second', 'published_parsed': time.gmtime(200)}])
+        self.assertEqual((delta.updated, delta.removed), (1, [(100, entry_id(URL, entries[0]))]))
+
+    def test_undated_entries_keep_their_first_fetch_time(self):
+        entries = [{'link': 'http://example.com/undated', 'title': 'undated'}]
+        epoch = self.delta(entries).records[0].epoch
+        self.assertAlmostEqual(epoch, time.time(), delta=60)
+        delta = self.delta(entries)
+        self.assertEqual((delta.new, delta.updated, delta.unchanged), (0, 0, 1))
+        self.assertEqual(self.store.load_entries(['feed'])[0].epoch, epoch)
+
+    def test_duplicate_entries_count_once(self):
+        entry = {'id': 'a', 'title': 'A', 'published_parsed': time.gmtime(100)}
+        delta = self.delta([entry, dict(entry, title='A again')])
+        self.assertEqual((delta.new, delta.updated, delta.unchanged), (1, 0, 0))
+        self.assertEqual([record.title for record in delta.records], ['A'])
+
+class ParseResponseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = EntryStore(os.path.join(self.directory, 'entries.db'))
+
+    def tearDown(self):
+        self.store.connection.close()
+        shutil.rmtree(self.directory)
+
+    def refresher(self, backend):
+        settings = Settings(os.path.join(self.directory, 'settings.json'))
+        settings.parser['backend'] = backend
+        return FeedRefresher({'feed': URL}, FeedCache(self.store), self.store, None, None, settings)
+
+    def fetch(self, refresher, body, status=200):
+        stats = {}
+        feed = refresher.parse_response('feed', URL, HttpResponse(URL, status, {'etag': '"1"'}, body), stats)
+        return feed, stats, refresher.feed_delta('feed', feed)
+
+    def test_identical_body_is_not_parsed(self):
+        for backend in ('feedparser', 'fast'):
+            with self.subTest(backend=backend):
+                refresher = self.refresher(backend)
+                feed, stats, delta = self.fetch(refresher, rss(f'{backend} 2', f'{backend} 1'))
+                self.assertNotIn('parse_skipped', stats)
+                self.assertEqual(delta.new, 2)
+                self.assertEqual(refresher.cache.validators(URL), ('"1"', None))
+
+                feed, stats, delta = self.fetch(refresher, rss(f'{backend} 2', f'{backend} 1'))
+                self.assertTrue(stats['parse_skipped'])
+                self.assertEqual(feed.feed, {'ttl': '60'})
+                self.assertEqual([entry['title'] for entry in feed.entries], [f'{backend} 2', f'{backend} 1'])
+                self.assertEqual((delta.new, delta.updated, delta.unchanged, delta.vanished), (0, 0, 2, 0))
+
+                feed, stats, delta = self.fetch(refresher, rss(f'{backend} 3', f'{backend} 2', f'{backend} 1'))
+                self.assertNotIn('parse_skipped', stats)
+                self.assertEqual((delta.new, delta.unchanged), (1, 2))
+
+    def test_not_modified_reuses_the_stored_entries(self):
+        refresher = self.refresher('feedparser')
+        self.fetch(refresher, rss('2', '1'))
+        feed, stats, delta = self.fetch(refresher, b'', status=304)
+        self.assertEqual(feed.status, 304)
+        self.assertEqual(feed.feed, {'ttl': '60'})
+        self.assertEqual([entry['title'] for entry in feed.entries], ['2', '1'])
+        self.assertEqual((delta.new, delta.updated, delta.unchanged, delta.vanished), (0, 0, 2, 0))
+
+    def test_cache_is_persisted_per_feed(self):
+        refresher = self.refresher('feedparser')
+        self.fetch(refresher, rss('1'))
+        refresher.cache.save()
+        cache = FeedCache(self.store)
+        self.assertEqual(cache.validators(URL), ('"1"', None))
+        self.assertEqual(cache.channel(URL), {'ttl': '60'})
+        self.assertEqual(self.store.load_feed_cache()[URL]['etag'], '"1"')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""RefreshCoordinator: merged refresh requests, generations and cancellation, with an offscreen Qt platform."""
+import os
+import time
+import threading
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtWidgets import QApplication
+
+from main import RefreshCoordinator
+from rss_core.entries import FeedDelta
+
+class BlockingReader:
+    """Stands in for FeedReader: every refresh waits for the test to release it, then reports its feeds."""
+
+    def __init__(self, feeds):
+        self.feeds = feeds
+        self.refreshes = []
+        self.releases = threading.Semaphore(0)
+
+    def refresh(self, feeds=None, on_feed=None, limit=None, cancel=None):
+        self.refreshes.append(dict(feeds))
+        self.releases.acquire()
+        for index, name in enumerate(feeds):
+            if index and cancel.is_set():
+                break  # The first feed was in flight already, and still gets reported
+            on_feed(name, FeedDelta(name, [], []))
+        return [], {'feeds': sorted(feeds)}
+
+class RefreshCoordinatorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.reader = BlockingReader({'a': 'http://example.com/a', 'b': 'http://example.com/b'})
+        self.coordinator = RefreshCoordinator(self.reader)
+        self.addCleanup(self.shutdown)
+        self.events = []
+        self.coordinator.feed_fetched.connect(lambda name, delta: self.events.append(('feed', name)))
+        self.coordinator.diagnostics_ready.connect(lambda diagnostics: self.events.append(('diagnostics',
+                                                                                           diagnostics['feeds'])))
+        self.coordinator.refresh_complete.connect(lambda: self.events.append(('complete',)))
+        self.coordinator.discarded.connect(lambda: self.events.append(('discarded',)))
+
+    def shutdown(self):
+        self.reader.releases.release(10)
+        self.coordinator.shutdown()
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            self.app.processEvents()
+            time.sleep(0.001)
+
+    def test_requests_are_merged_into_one_follow_up(self):
+        self.coordinator.request()
+        self.wait_for(lambda: len(self.reader.refreshes) == 1)
+        self.coordinator.request({'a': 'http://example.com/a', 'c': 'http://example.com/c'})
+        self.coordinator.request({'d': 'http://example.com/d'})
+        self.assertEqual(self.coordinator.pending, {'c': 'http://example.com/c', 'd': 'http://example.com/d'})
+
+        self.reader.releases.release()
+        self.wait_for(lambda: ('complete',) in self.events)
+        self.assertTrue(self.coordinator.is_busy())  # The follow-up refresh already runs
+        self.reader.releases.release()
+        self.wait_for(lambda: self.events.count(('complete',)) == 2)
+        self.assertEqual(self.reader.refreshes, [{'a': 'http://example.com/a', 'b': 'http://example.com/b'},
+                                                 {'c': 'http://example.com/c', 'd': 'http://example.com/d'}])
+        self.assertEqual(self.events, [('feed', 'a'), ('feed', 'b'), ('diagnostics', ['a', 'b']), ('complete',),
+                                       ('feed', 'c'), ('feed', 'd'), ('diagnostics', ['c', 'd']), ('complete',)])
+        self.assertFalse(self.coordinator.is_busy())
+
+    def test_cancelled_refresh_is_discarded(self):
+        self.coordinator.request()
+        self.wait_for(lambda: len(self.reader.refreshes) == 1)
+        self.coordinator.request({'c': 'http://example.com/c'})
+        self.assertTrue(self.coordinator.cancel())
+        self.assertEqual(self.coordinator.pending, {})
+        self.assertTrue(self.coordinator.fetcher.cancel.is_set())
+
+        self.reader.releases.release()
+        self.wait_for(lambda: not self.coordinator.is_busy())
+        self.assertEqual(self.events, [('discarded',)])  # Its in-flight feed and diagnostics were not passed on
+        self.assertEqual(len(self.reader.refreshes), 1)
+        self.assertFalse(self.coordinator.cancel())
+
+    def test_requests_after_a_cancel_start_a_new_generation(self):
+        self.coordinator.request()
+        self.wait_for(lambda: len(self.reader.refreshes) == 1)
+        self.coordinator.cancel()
+        # The cancelled refresh fetches nothing more, so every requested feed goes to the follow-up refresh
+        self.coordinator.request({'a': 'http://example.com/a'})
+        self.assertEqual(self.coordinator.pending, {'a': 'http://example.com/a'})
+        self.reader.releases.release(2)
+        self.wait_for(lambda: ('complete',) in self.events)
+        self.assertEqual(self.events, [('discarded',), ('feed', 'a'), ('diagnostics', ['a']), ('complete',)])
+        self.assertIsNone(self.coordinator.fetcher)
+
+if __name__ == '__main__':
+    unittest.main()
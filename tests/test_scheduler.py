@@ -0,0 +1,94 @@
+"""FeedScheduler: the per-feed polling intervals and next-due times."""
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import feedparser
+from unittest import mock
+
+from rss_core.scheduler import (FeedScheduler,
+                                parse_skip_rules)
+
+URL = 'http://example.com/feed'
+NOW = 1700000000  # Tue, 14 Nov 2023 22:13:20 GMT
+
+def feed(timestamps=(), **channel):
+    return feedparser.FeedParserDict(feed=channel,
+                                     entries=[{'published_parsed': time.gmtime(timestamp)} for timestamp in timestamps])
+
+class FeedSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.scheduler = FeedScheduler(os.path.join(self.directory, 'feed_schedule.json'), min_interval=900,
+                                       max_interval=86400, default_interval=1800, push_interval=43200)
+        patcher = mock.patch('rss_core.scheduler.time.time', return_value=NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def interval(self, parsed, headers=None, skip_rules=None):
+        self.scheduler.record_success(URL, parsed, headers, skip_rules)
+        return self.scheduler._feeds[URL]['interval']
+
+    def test_observed_interval(self):
+        # Half the median gap between the entries
+        self.assertEqual(self.interval(feed([NOW - 3 * 7200, NOW - 2 * 7200, NOW - 7200, NOW])), 3600)
+        self.assertEqual(self.interval(feed([NOW])), 1800)  # Too few dated entries: the default interval
+        self.assertEqual(self.interval(feed([NOW - 60, NOW])), 900)  # Clamped to the minimum
+        self.assertEqual(self.interval(feed([NOW - 30 * 86400, NOW])), 86400)  # Clamped to the maximum
+
+    def test_publisher_hints(self):
+        self.assertEqual(self.interval(feed(ttl='60')), 3600)
+        self.assertEqual(self.interval(feed(ttl='soon')), 1800)
+        self.assertEqual(self.interval(feed(sy_updateperiod='daily', sy_updatefrequency='2')), 43200)
+        self.assertEqual(self.interval(feed(), {'cache-control': 'public, max-age=7200'}), 7200)
+        self.assertEqual(self.interval(feed(), {'cache-control': 'no-cache, max-age=7200'}), 1800)
+        self.assertEqual(self.interval(feed(), {'expires': 'Wed, 15 Nov 2023 00:13:20 GMT'}), 7200)
+        # The hints only lengthen the observed interval
+        self.assertEqual(self.interval(feed([NOW - 4 * 3600, NOW], ttl='30')), 7200)
+
+    def test_pushed_feeds_are_polled_as_a_fallback(self):
+        self.scheduler.pushed = {URL}
+        self.assertEqual(self.interval(feed()), 43200)
+
+    def test_next_due_skips_hours_and_days(self):
+        self.assertEqual(self.interval(feed(), skip_rules=([22, 23], [])), 1800)
+        # 22:43:20 and 23:xx are skipped
+        self.assertEqual(self.scheduler._feeds[URL]['next_due'], 1700006400)  # Wed, 15 Nov 2023 00:00:00 GMT
+        self.scheduler.record_success(URL, feed(), skip_rules=([], ['Tuesday', 'Wednesday']))
+        self.assertEqual(time.gmtime(self.scheduler._feeds[URL]['next_due'])[:4], (2023, 11, 16, 0))
+
+    def test_skip_rules_are_kept_from_the_last_full_fetch(self):
+        self.scheduler.record_success(URL, feed(), skip_rules=([22, 23], []))
+        self.scheduler.record_success(URL, feed())  # e.g. 304 Not Modified, no body to read them from
+        self.assertEqual(self.scheduler._feeds[URL]['next_due'], 1700006400)
+
+    def test_parse_skip_rules(self):
+        body = (b'<rss><channel><skipHours><hour>0</hour><hour> 24 </hour><hour>7</hour></skipHours>'
+                b'<skipDays><day>saturday</day><day>Sunday</day></skipDays></channel></rss>')
+        self.assertEqual(parse_skip_rules(body), ([0, 0, 7], ['Saturday', 'Sunday']))
+        self.assertEqual(parse_skip_rules(b'<rss/>'), ([], []))
+
+    def test_due_feeds(self):
+        feeds = {'fetched': URL, 'failed': 'http://example.com/failed', 'new': 'http://example.com/new'}
+        self.scheduler.record_success(URL, feed())
+        self.scheduler.record_failure('http://example.com/failed')
+        self.assertEqual(self.scheduler.due_feeds(feeds), {'new': 'http://example.com/new'})
+        self.assertEqual(self.scheduler.due_feeds(feeds, now=NOW + 900), {'failed': 'http://example.com/failed',
+                                                                          'new': 'http://example.com/new'})
+        self.assertEqual(self.scheduler.due_feeds(feeds, now=NOW + 1800), feeds)
+        self.scheduler.record_failure(URL, retry_at=NOW + 60)
+        self.assertIn('fetched', self.scheduler.due_feeds(feeds, now=NOW + 60))
+
+    def test_schedule_is_persisted(self):
+        self.scheduler.record_success(URL, feed())
+        self.scheduler.save()
+        reloaded = FeedScheduler(self.scheduler.schedule_file)
+        self.assertEqual(reloaded.due_feeds({'feed': URL}), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""WebSub push path against LocalHub: the subscription of a feed advertising a hub, the verification of the intent,
+the signed delivery and the FeedDelta it produces."""
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import (BaseHTTPRequestHandler,
+                         ThreadingHTTPServer)
+
+from rss_core.reader import FeedReader
+from rss_core.websub import LocalHub
+
+def atom(hub_url, *entries):
+    """Atom feed advertising hub_url, of (title, hour) entries."""
+    return ('<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom"><title>c</title>'
+            f'<link rel="hub" href="{hub_url}"/>'
+            + ''.join(f'<entry><id>urn:{title}</id><title>{title}</title>'
+                      f'<updated>2023-11-14T{hour:02}:00:00Z</updated></entry>' for title, hour in entries)
+            + '</feed>').encode()
+
+class FeedServer:
+    """Serves one Atom feed on a local port."""
+
+    def __init__(self, body):
+        self.body = body
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/atom+xml')
+                self.send_header('Content-Length', str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/feed"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class LocalHubTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.hub = LocalHub().start()
+        self.addCleanup(self.hub.stop)
+        self.server = FeedServer(atom(self.hub.url, ('first', 10)))
+        self.addCleanup(self.server.stop)
+        with open(os.path.join(self.directory, 'settings.json'), 'w') as file:
+            json.dump({'websub': {'enabled': True, 'listen': '127.0.0.1:0'}}, file)
+        self.reader = FeedReader(self.directory, {'feed': self.server.url})
+        self.addCleanup(self.reader.close)
+        self.pushed = []
+        self.reader.push_listeners.append(lambda name, delta: self.pushed.append((name, delta)))
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.01)
+
+    def test_subscribe_verify_deliver(self):
+        self.assertEqual(self.reader.websub.httpd.server_address[0], '127.0.0.1')
+        entries, _ = self.reader.refresh()
+        self.assertEqual([entry.title for entry in entries], ['first'])
+
+        # The refresh found the hub link and subscribed; the hub verifies the intent on the callback
+        self.wait_for(lambda: self.reader.websub.active_feeds() == {self.server.url})
+        self.assertEqual([topic for topic, _ in self.hub.subscriptions], [self.server.url])
+
+        # Hubs deliver only the new entries: the stored one is neither vanished nor new
+        self.assertEqual(self.hub.publish(self.server.url, atom(self.hub.url, ('second', 11))), 1)
+        self.wait_for(lambda: self.pushed)
+        [(name, delta)] = self.pushed
+        self.assertEqual(name, 'feed')
+        self.assertEqual((delta.new, delta.updated, delta.vanished), (1, 0, 0))
+        self.assertEqual([record.title for record in delta.records], ['second'])
+        self.assertEqual([record.title for record in self.reader.store.load_entries(['feed'])], ['second', 'first'])
+
+    def test_unsigned_delivery_is_ignored(self):
+        self.reader.refresh()
+        self.wait_for(lambda: self.reader.websub.active_feeds())
+        for subscription in self.hub.subscriptions.values():
+            subscription['secret'] = None
+        # Acknowledged anyway, as the spec requires
+        self.assertEqual(self.hub.publish(self.server.url, atom(self.hub.url, ('forged', 11))), 1)
+        time.sleep(0.1)
+        self.assertEqual(self.pushed, [])
+
+if __name__ == '__main__':
+    unittest.main()